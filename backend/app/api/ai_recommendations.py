@@ -1,13 +1,29 @@
 # backend/app/api/ai_recommendations.py
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
 from pydantic import BaseModel
 import os
-import psycopg2
+import json
+import asyncio
 from psycopg2.extras import RealDictCursor
-import cohere
 import logging
-from typing import Dict, Any
+import threading
+import numpy as np
+from typing import Dict, Any, AsyncIterator, Optional
 from dotenv import load_dotenv
+from app.core.config import get_settings
+from app.core.database import get_conn
+from app.core.metrics import span, timed
+from app.core.readiness import readiness
+from app.services.job_queue import JobQueue, QueueFull, RateLimiter
+from app.services.result_cache import ResultCache, content_key, normalize_geometry
+from app.services.rule_engine import get_rule_engine
+from app.services.dem_service import get_elevation_service
+from app.services.terrain_features import TerrainFeatures, extract_terrain_features, geodesic_length_m
+from app.services.route_sampling import sample_route_lonlat
+from app.services.zone_index import get_zone_index
 
 # Cargar .env ANTES de usarlo
 load_dotenv()
@@ -15,39 +31,58 @@ load_dotenv()
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Inicializar cliente Cohere
-cohere_client = cohere.Client(os.getenv("COHERE_API_KEY", ""))
+# Cliente Cohere: el SDK se importa y el cliente se crea al primer uso (o en el warm-up)
+_cohere_client = None
+_cohere_lock = threading.Lock()
+readiness.declare("cohere_client", lazy=True)
+
+def get_cohere_client():
+    global _cohere_client
+    if _cohere_client is None:
+        with _cohere_lock:
+            if _cohere_client is None:
+                with readiness.track("cohere_client"):
+                    import cohere
+                    _cohere_client = cohere.Client(os.getenv("COHERE_API_KEY", ""), base_url=settings.COHERE_BASE_URL or None)
+    return _cohere_client
+
+AI_MODEL = 'command-r-08-2024'
+AI_PREAMBLE = "Eres un ingeniero experto en telecomunicaciones especializado en redes FTTH."
+AI_FALLBACK_MESSAGE = "No se pudieron generar recomendaciones con IA. Verifica la configuración de la API key y la conectividad."
+
+# Cola de generación: workers acotados
+settings = get_settings()
+ai_jobs = JobQueue(
+    "ai",
+    workers=settings.AI_WORKERS,
+    max_pending=settings.AI_QUEUE_MAX,
+    ttl_s=settings.AI_JOB_TTL_S,
+)
+
+# Cuota de Cohere: solo la consumen las llamadas reales (no los aciertos de caché)
+cohere_limiter = RateLimiter(settings.COHERE_CALLS_PER_MINUTE) if settings.COHERE_CALLS_PER_MINUTE else None
+
+# Caché de análisis y textos generados, direccionada por contenido
+ai_cache = ResultCache(max_entries=settings.AI_CACHE_MAX_ENTRIES, ttl_s=settings.AI_CACHE_TTL_S)
 
 class AIAnalysisRequest(BaseModel):
     data_id: int
+    no_cache: bool = False  # ignorar resultados cacheados y regenerar
 
 
-def _get_conn():
-    return psycopg2.connect(
-        host=os.environ.get("POSTGRES_HOST"),
-        port=int(os.environ.get("POSTGRES_PORT", 5432)),
-        dbname=os.environ.get("POSTGRES_DB"),
-        user=os.environ.get("POSTGRES_USER"),
-        password=os.environ.get("POSTGRES_PASSWORD"),
-        sslmode='require'
-    )
+@timed("db.get_environment_data")
 def get_environment_data(data_id: int) -> Dict[str, Any]:
     """Obtener datos del entorno y configuración desde la base de datos"""
     try:
-        conn = _get_conn()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute(
-            "SELECT geojson, step_m, metadata, created_at FROM collected_data WHERE id = %s",
-            (data_id,)
-        )
-        
-        result = cur.fetchone()
-        if not result:
-            raise ValueError("Datos no encontrados")
+        with get_conn() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(
+                "SELECT geojson, step_m, metadata, created_at FROM collected_data WHERE id = %s",
+                (data_id,)
+            )
             
-        cur.close()
-        conn.close()
+            result = cur.fetchone()
+            if not result:
+                raise ValueError("Datos no encontrados")
         
         return dict(result)
         
@@ -55,6 +90,7 @@ def get_environment_data(data_id: int) -> Dict[str, Any]:
         logger.error(f"Error obteniendo datos: {e}")
         raise
 
+@timed("analyze_route_basic")
 def analyze_route_basic(geojson_data: Dict) -> Dict[str, Any]:
     """Análisis básico de la ruta sin APIs externas"""
     from shapely.geometry import shape
@@ -66,28 +102,21 @@ def analyze_route_basic(geojson_data: Dict) -> Dict[str, Any]:
         # Análisis simple de la ruta
         total_points = len(coordinates)
         
-        # Estimación de longitud en km (conversión aproximada)
-        length_km = round(geom.length * 111, 2)
+        # Longitud geodésica real (WGS84) en km
+        lon, lat = np.asarray(coordinates, dtype=float)[:, :2].T
+        length_km = round(geodesic_length_m(lat, lon) / 1000.0, 3)
         
-        # Análisis de coordenadas para determinar zona urbana aproximada
+        # Centro de la ruta
         center_lat = sum(coord[1] for coord in coordinates) / total_points
         center_lon = sum(coord[0] for coord in coordinates) / total_points
         
-        # Centro aproximado de Guayaquil
-        guayaquil_center = (-2.1709, -79.9224)
-        
-        # Distancia al centro para clasificar zona
-        dist_to_center = ((center_lat - guayaquil_center[0])**2 + 
-                         (center_lon - guayaquil_center[1])**2)**0.5
-        
-        if dist_to_center < 0.05:
-            zone_type = "centro_urbano"
-        elif dist_to_center < 0.1:
-            zone_type = "urbano"
-        elif dist_to_center < 0.2:
-            zone_type = "suburbano"
-        else:
-            zone_type = "rural"
+        # Clasificar cada muestra de la ruta con el índice de zonas (polígonos)
+        _, _, sample_lat, sample_lon = sample_route_lonlat(coordinates, settings.ZONES_SAMPLE_STEP_M)
+        if not len(sample_lat):
+            # ruta de longitud cero o un Point: se clasifican sus vértices
+            sample_lat, sample_lon = lat, lon
+        zones = get_zone_index().breakdown(sample_lon, sample_lat)
+        zone_type = zones["zona_dominante"]
         
         # Análisis de dispersión para estimar complejidad del terreno
         lat_range = max(coord[1] for coord in coordinates) - min(coord[1] for coord in coordinates)
@@ -104,6 +133,7 @@ def analyze_route_basic(geojson_data: Dict) -> Dict[str, Any]:
             "length_km": length_km,
             "total_points": total_points,
             "zone_type": zone_type,
+            "zonas": zones,
             "terrain_complexity": terrain_complexity,
             "center_coordinates": (round(center_lat, 4), round(center_lon, 4))
         }
@@ -125,6 +155,24 @@ def build_ai_prompt(route_data: Dict, metadata: Dict, analysis: Dict) -> str:
     subconfig = config.get('subconfig_label', config.get('subconfig', 'No especificado'))
     num_clients = config.get('estudio_factibilidad', 'No especificado')
     
+    # Alertas del sistema experto (reglas ITU-T/ARCOTEL que se cumplen)
+    rules = analysis.get('reglas') or {}
+    rule_lines = "\n".join(
+        f"- [{r['nivel']}] {r['id']} {r['nombre']}: {r.get('mensaje') or ''}"
+        for r in rules.get('matched', [])
+    ) or "- Sin alertas"
+    
+    # Perfil de elevación (si se pudo obtener)
+    terrain = analysis.get('terreno') or {}
+    
+    # Reparto de la ruta por zona y tipo de cliente (índice de polígonos)
+    zones = analysis.get('zonas') or {}
+    zone_breakdown = ", ".join(
+        f"{name} {info['pct']}%"
+        for attr in ('zone_type', 'tipo_cliente')
+        for name, info in (zones.get(attr) or {}).items()
+    ) or "N/A"
+    
     prompt = f"""
 Eres un ingeniero experto en telecomunicaciones especializado en despliegue de redes FTTH (Fiber to the Home). 
 Analiza los siguientes datos y genera recomendaciones técnicas específicas y detalladas.
@@ -139,10 +187,16 @@ DATOS DEL PROYECTO:
 ANÁLISIS DE LA RUTA:
 - Longitud total: {analysis.get('length_km', 'N/A')} km
 - Zona geográfica: {analysis.get('zone_type', 'N/A')}
+- Reparto por zonas: {zone_breakdown}
 - Complejidad del terreno: {analysis.get('terrain_complexity', 'N/A')}
+- Pendiente promedio: {terrain.get('pendiente_promedio', 'N/A')}% (desnivel total {terrain.get('desnivel_total', 'N/A')} m)
 - Ubicación central: {analysis.get('center_coordinates', 'N/A')}
 - Puntos de muestreo: {analysis.get('total_points', 'N/A')}
 
+ALERTAS DEL SISTEMA EXPERTO (ITU-T / ARCOTEL):
+{rule_lines}
+- Incremento de costo estimado por reglas: {rules.get('impacto', {}).get('incremento_costo_pct', 'N/A')}%
+
 CONTEXTO:
 La ruta se encuentra en Guayaquil, Ecuador. Considera las características climáticas tropicales, 
 normativas locales de telecomunicaciones, y condiciones urbanas típicas de la ciudad.
@@ -181,82 +235,318 @@ Utiliza terminología profesional de telecomunicaciones y considera las mejores
     
     return prompt
 
-@router.post("/generate")
-async def generate_ai_recommendations(request: AIAnalysisRequest):
-    """Generar recomendaciones usando IA de Cohere"""
+def evaluate_route_rules(analysis: Dict, metadata: Dict, terrain: Optional[TerrainFeatures] = None) -> Dict[str, Any]:
+    """Reglas del sistema experto que aplican a la ruta (sin los arreglos por segmento)
+
+    Con el perfil de elevación, la pendiente se evalúa por segmento y el
+    impacto se pondera por la longitud de cada uno.
+    """
+    features = {}
+    weights = None
+    if terrain is not None and len(terrain.seg_len_m):
+        features = terrain.rule_features()
+        weights = terrain.seg_len_m
+    features.update({
+        "longitud_total_km": analysis.get('length_km'),
+        "split": metadata.get('split'),
+    })
+    result = get_rule_engine().evaluate(features, weights=weights)
+    result.pop("segmentos", None)
+    return result
+
+async def route_terrain_features(route_data: Dict, no_cache: bool = False) -> Optional[TerrainFeatures]:
+    """Perfil de elevación de la ruta (una muestra cada step_m) y sus features
+
+    Se cachea por geometría y step_m. Devuelve None si la ruta no es una
+    LineString o no se obtuvo ninguna elevación: las reglas de pendiente
+    simplemente no se evalúan.
+    """
+    geometry = normalize_geometry(route_data['geojson'])
+    if geometry['type'] != 'LineString':
+        return None
+    terrain_key = content_key("terrain", geometry, route_data.get('step_m'))
+    terrain = None if no_cache else ai_cache.get(terrain_key)
+    if terrain is not None:
+        return terrain
     
     try:
-        # Verificar que tenemos la API key
-        if not os.getenv("COHERE_API_KEY"):
-            raise HTTPException(
-                status_code=500, 
-                detail="API key de Cohere no configurada. Añade COHERE_API_KEY al entorno."
-            )
-        
-        # Obtener datos de la base de datos
-        route_data = get_environment_data(request.data_id)
-        
-        # Análisis básico de la ruta
-        analysis = analyze_route_basic(route_data['geojson'])
-        
-        if 'error' in analysis:
-            raise HTTPException(status_code=500, detail=f"Error en análisis: {analysis['error']}")
-        
-        # Construir prompt para la IA
-        prompt = build_ai_prompt(route_data, route_data['metadata'], analysis)
+        step_m = route_data.get('step_m') or 20
+        _, _, lat, lon = await run_in_threadpool(sample_route_lonlat, geometry['coordinates'], step_m)
+        profile = await get_elevation_service().get_elevation_profile(
+            list(zip(lat.tolist(), lon.tolist())), with_stats=False
+        )
+        elevations = profile.get("elevations") or []
+        if len(elevations) != len(lat) or all(e is None for e in elevations):
+            logger.warning("Sin elevaciones para la ruta: reglas de pendiente omitidas")
+            return None
+        terrain = await run_in_threadpool(extract_terrain_features, lat, lon, elevations)
+    except Exception as e:
+        logger.warning(f"Error obteniendo el perfil de elevación: {e}")
+        return None
+    
+    ai_cache.set(terrain_key, terrain)
+    return terrain
+
+def route_cache_keys(route_data: Dict, prompt: str = None):
+    """Claves de caché (análisis, texto IA) a partir de geometría normalizada, step_m, metadata y modelo"""
+    geometry = normalize_geometry(route_data['geojson'])
+    analysis_key = content_key("analysis", geometry, route_data.get('step_m'))
+    llm_key = content_key("llm", geometry, route_data.get('step_m'), route_data.get('metadata'), AI_MODEL, prompt)
+    return analysis_key, llm_key
+
+def _analyze_or_raise(geojson: Dict) -> Dict[str, Any]:
+    """analyze_route_basic, pero un resultado con 'error' se lanza (y no queda en caché)"""
+    analysis = analyze_route_basic(geojson)
+    if 'error' in analysis:
+        raise ValueError(f"Error en análisis: {analysis['error']}")
+    return analysis
+
+def _build_analysis(route_data: Dict, terrain: Optional[TerrainFeatures], no_cache: bool):
+    # Análisis básico de la ruta (cacheado por contenido)
+    analysis_key, _ = route_cache_keys(route_data)
+    analysis, _ = ai_cache.get_or_compute(
+        analysis_key, lambda: _analyze_or_raise(route_data['geojson']), bypass=no_cache
+    )
+    if terrain is not None:
+        analysis = {**analysis, "terreno": terrain.summary()}
+    
+    # Evaluar la base de reglas con las variables disponibles de la ruta
+    analysis = {**analysis, "reglas": evaluate_route_rules(analysis, route_data['metadata'] or {}, terrain)}
+    
+    # Construir prompt para la IA
+    prompt = build_ai_prompt(route_data, route_data['metadata'], analysis)
+    return analysis, prompt
+
+async def prepare_ai_request(data_id: int, no_cache: bool = False):
+    """Datos de la BD + perfil de elevación + análisis de la ruta + prompt, listos para enviar a Cohere"""
+    # Verificar que tenemos la API key
+    if not os.getenv("COHERE_API_KEY"):
+        raise ValueError("API key de Cohere no configurada. Añade COHERE_API_KEY al entorno.")
+    
+    # Obtener datos de la base de datos
+    route_data = await run_in_threadpool(get_environment_data, data_id)
+    
+    # Pendiente por segmento para las reglas de topografía
+    terrain = await route_terrain_features(route_data, no_cache)
+    
+    analysis, prompt = await run_in_threadpool(_build_analysis, route_data, terrain, no_cache)
+    return route_data, analysis, prompt
+
+@timed("cohere.chat")
+def _call_cohere(prompt: str) -> str:
+    if cohere_limiter is not None:
+        cohere_limiter.acquire_blocking()
+    # Llamar a la API de Chat de Cohere (NUEVA API)
+    response = get_cohere_client().chat(
+        model=AI_MODEL,
+        message=prompt,
+        max_tokens=1500,
+        temperature=0.3,
+        preamble=AI_PREAMBLE
+    )
+    return response.text.strip()
+
+async def run_ai_generation(data_id: int, no_cache: bool = False) -> Dict[str, Any]:
+    """Pipeline completo (BD + elevación + análisis + Cohere); corre en un worker de la cola
+
+    Las partes bloqueantes (BD, análisis, llamada a Cohere) van al threadpool.
+
+    Los fallos se propagan para que el trabajo termine en estado "error".
+    """
+    
+    try:
+        route_data, analysis, prompt = await prepare_ai_request(data_id, no_cache)
+        _, llm_key = route_cache_keys(route_data, prompt)
         
-        logger.info(f"Enviando prompt a Cohere para data_id: {request.data_id}")
+        logger.info(f"Enviando prompt a Cohere para data_id: {data_id}")
         
-        # Llamar a la API de Chat de Cohere (NUEVA API)
-        response = cohere_client.chat(
-            model='command-r-08-2024',
-            message=prompt,
-            max_tokens=1500,
-            temperature=0.3,
-            preamble="Eres un ingeniero experto en telecomunicaciones especializado en redes FTTH."
+        # Peticiones idénticas simultáneas comparten una sola llamada a Cohere
+        ai_recommendations, cached = await run_in_threadpool(
+            ai_cache.get_or_compute, llm_key, lambda: _call_cohere(prompt), bypass=no_cache
         )
         
-        ai_recommendations = response.text.strip()
-        
         # Procesar y estructurar la respuesta
         structured_response = {
             "success": True,
-            "data_id": request.data_id,
+            "data_id": data_id,
             "route_analysis": analysis,
             "configuration": route_data['metadata'],
             "ai_recommendations": ai_recommendations,
             "timestamp": route_data['created_at'].isoformat() if route_data['created_at'] else None,
-            "model_used": "command-r-08-2024",
-            "prompt_length": len(prompt)
+            "model_used": AI_MODEL,
+            "prompt_length": len(prompt),
+            "cached": cached
         }
         
-        logger.info(f"Recomendaciones generadas exitosamente para data_id: {request.data_id}")
+        logger.info(f"Recomendaciones generadas exitosamente para data_id: {data_id}")
         
         return structured_response
         
     except Exception as e:
+        # Se propaga: la cola marca el trabajo como "error" con este mensaje
         logger.error(f"Error generando recomendaciones con IA: {e}")
-        
-        # Respuesta de fallback si falla la IA
-        fallback_response = {
-            "success": False,
-            "error": str(e),
-            "fallback_recommendations": "No se pudieron generar recomendaciones con IA. Verifica la configuración de la API key y la conectividad.",
-            "data_id": request.data_id
-        }
-        
-        return fallback_response
+        raise
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+async def stream_ai_generation(data_id: int, no_cache: bool = False) -> AsyncIterator[str]:
+    """Eventos SSE: 'analysis' (primero), 'chunk' por cada fragmento, 'done' o 'error'"""
+    try:
+        route_data, analysis, prompt = await prepare_ai_request(data_id, no_cache)
+    except Exception as e:
+        logger.error(f"Error preparando streaming para data_id {data_id}: {e}")
+        yield _sse("error", {"success": False, "error": str(e), "fallback_recommendations": AI_FALLBACK_MESSAGE, "data_id": data_id})
+        return
+    
+    # El análisis estructurado sale antes de llamar al modelo
+    yield _sse("analysis", {
+        "success": True,
+        "data_id": data_id,
+        "route_analysis": analysis,
+        "configuration": route_data['metadata'],
+        "model_used": AI_MODEL,
+    })
+    
+    _, llm_key = route_cache_keys(route_data, prompt)
+    done = {
+        "data_id": data_id,
+        "timestamp": route_data['created_at'].isoformat() if route_data['created_at'] else None,
+        "prompt_length": len(prompt),
+    }
+    
+    # Texto ya generado para el mismo contenido: se envía de una vez
+    cached_text = None if no_cache else ai_cache.get(llm_key)
+    if cached_text is not None:
+        yield _sse("chunk", {"text": cached_text})
+        yield _sse("done", {**done, "finish_reason": "CACHED", "cached": True})
+        return
+    
+    # Mismo contenido ya generándose (stream o cola): se espera ese resultado
+    future, leader = ai_cache.begin(llm_key)
+    if not leader:
+        try:
+            shared_text = await asyncio.wrap_future(future)
+        except Exception as e:
+            logger.error(f"Error en generación compartida para data_id {data_id}: {e}")
+            yield _sse("error", {"success": False, "error": str(e), "fallback_recommendations": AI_FALLBACK_MESSAGE, "data_id": data_id})
+            return
+        yield _sse("chunk", {"text": shared_text})
+        yield _sse("done", {**done, "finish_reason": "SHARED", "cached": True})
+        return
+    
+    # La generación corre en su propia tarea: si este cliente se desconecta el texto se termina
+    # igual y llega a la caché y a los que esperaban el mismo contenido (streams o /generate)
+    chunks: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(_drain_cohere_stream(prompt, llm_key, future, chunks))
+    _generation_tasks.add(task)
+    task.add_done_callback(_generation_tasks.discard)
+    
+    while (text := await chunks.get()) is not None:
+        yield _sse("chunk", {"text": text})
+    finish_reason, error = await asyncio.shield(task)
+    if error is not None:
+        logger.error(f"Error en streaming de Cohere para data_id {data_id}: {error}")
+        yield _sse("error", {"success": False, "error": str(error), "fallback_recommendations": AI_FALLBACK_MESSAGE, "data_id": data_id})
+        return
+    
+    yield _sse("done", {**done, "finish_reason": finish_reason, "cached": False})
+
+# referencias a las generaciones en curso (el loop solo guarda referencias débiles a las tareas)
+_generation_tasks: set = set()
+
+async def _drain_cohere_stream(prompt: str, llm_key: str, future, chunks: asyncio.Queue):
+    """Consumir el stream de Cohere hasta el final, pasar cada fragmento a `chunks` y cerrar el single-flight
+
+    Devuelve (finish_reason, error); al terminar pone None en `chunks`.
+    """
+    finish_reason = None
+    parts = []
+    text = None
+    error = None
+    try:
+        if cohere_limiter is not None:
+            await cohere_limiter.acquire()
+        with span("cohere.chat_stream"):
+            stream = get_cohere_client().chat_stream(
+                model=AI_MODEL,
+                message=prompt,
+                max_tokens=1500,
+                temperature=0.3,
+                preamble=AI_PREAMBLE
+            )
+            # el iterador de Cohere es bloqueante: se consume en el threadpool
+            async for event in iterate_in_threadpool(stream):
+                if event.event_type == "text-generation":
+                    parts.append(event.text)
+                    chunks.put_nowait(event.text)
+                elif event.event_type == "stream-end":
+                    finish_reason = event.finish_reason
+        if finish_reason in ("COMPLETE", "MAX_TOKENS"):
+            text = "".join(parts).strip()
+    except asyncio.CancelledError:
+        # apagado del servidor
+        error = RuntimeError("Generación cancelada")
+        raise
+    except Exception as e:
+        error = e
+    finally:
+        # siempre se libera a los que esperan
+        if text is not None:
+            ai_cache.finish(llm_key, future, text)
+        else:
+            ai_cache.finish(llm_key, future, error=error or RuntimeError(f"Generación incompleta ({finish_reason})"))
+        chunks.put_nowait(None)
+    return finish_reason, error
+
+@router.post("/generate", status_code=202)
+async def generate_ai_recommendations(request: AIAnalysisRequest):
+    """Encolar la generación de recomendaciones y devolver el id del trabajo"""
+    try:
+        job_id = await ai_jobs.submit(run_ai_generation, request.data_id, request.no_cache)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return {
+        "success": True,
+        "job_id": job_id,
+        "status": "queued",
+        "data_id": request.data_id,
+        "status_url": f"/api/ai/jobs/{job_id}"
+    }
+
+@router.post("/generate/stream")
+async def generate_ai_recommendations_stream(request: AIAnalysisRequest):
+    """Generar recomendaciones en streaming (Server-Sent Events)"""
+    return StreamingResponse(
+        stream_ai_generation(request.data_id, request.no_cache),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/jobs/{job_id}")
+async def get_ai_job(job_id: str):
+    """Estado y resultado de un trabajo de generación"""
+    job = ai_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    return job
+
+@router.get("/cache")
+async def get_ai_cache_stats():
+    """Métricas de la caché de análisis y recomendaciones"""
+    return ai_cache.stats()
 
 @router.get("/test")
-async def test_cohere_connection():
+def test_cohere_connection():
     """Endpoint para probar la conexión con Cohere"""
     try:
         if not os.getenv("COHERE_API_KEY"):
             return {"status": "error", "message": "COHERE_API_KEY no configurada"}
         
         # Test simple con CHAT API (CORREGIDO)
-        response = cohere_client.chat(
-            model='command-r-08-2024',
+        response = get_cohere_client().chat(
+            model=AI_MODEL,
             message="Responde con 'OK' si puedes recibir este mensaje.",
             max_tokens=10,
             temperature=0.1
@@ -1,48 +1,60 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+import json
+from typing import List, Optional
 from shapely.geometry import shape, LineString, mapping
-from pyproj import Transformer
-import math
+import numpy as np
+from app.services.route_sampling import (
+    cumulative_distances,
+    project_coords_to_3857,
+    reproject_coords_to_latlon,
+    sample_coords_by_meters,
+)
+from app.services.adaptive_sampling import adaptive_elevation_profile
+from app.services.batch_analysis import analyze_batch
+from app.services.pole_placement import DEFAULT_SPAN_TABLE, plan_route_poles
+from app.services.job_queue import QueueFull
+from app.services.route_jobs import route_jobs
+from app.services.route_sessions import route_sessions
+from app.services.dem_service import get_elevation_service
+from app.core.metrics import span
+from app.services.compact_response import samples_response, samples_response_async, wants_compact
 
 router = APIRouter()
 
+# Formato compacto opcional (ver app.services.compact_response); sin ellos la respuesta es la de siempre
+FORMAT_QUERY = Query(None, description="columnar | polyline | delta")
+ENCODING_QUERY = Query(None, description="json | msgpack (también vía Accept: application/msgpack)")
+
 class RouteIn(BaseModel):
     geojson: dict  # LineString GeoJSON
     step_m: float = 20.0  # distancia en metros entre muestras
 
-# transformers (WGS84 <-> WebMercator (m))
-_to_3857 = Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
-_to_4326 = Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
+class AdaptiveRouteIn(RouteIn):
+    tolerance_m: float = 1.0  # error máximo (m) de elevación y de simplificación horizontal
+    coarse_factor: int = 8  # la pasada gruesa muestrea cada step_m * coarse_factor
+
+class BatchRouteIn(BaseModel):
+    geojson: dict  # MultiLineString o FeatureCollection de LineStrings
+    step_m: float = 20.0
+    with_elevation: bool = True  # consultar el proveedor de elevación para cada ruta
 
 def project_linestring_to_3857(linestring: LineString) -> LineString:
-    pts = [(x, y) for x, y in linestring.coords]
-    pts_3857 = [_to_3857.transform(x, y) for x, y in pts]  # lon,lat -> x,y metros
-    return LineString(pts_3857)
+    # todos los vértices se proyectan en una sola llamada (lon,lat -> x,y metros)
+    return LineString(project_coords_to_3857(linestring.coords))
 
 def reproject_point_to_latlon(pt_3857):
-    x, y = pt_3857
-    lon, lat = _to_4326.transform(x, y)
-    return lat, lon
+    lat, lon = reproject_coords_to_latlon([pt_3857])
+    return float(lat[0]), float(lon[0])
 
 def sample_linestring_by_meters(line: LineString, step_m: float):
     # linea espectante en metros (e.g. EPSG:3857)
-    length = line.length  # en metros
-    if length == 0:
-        return []
-    n = max(2, int(math.ceil(length / step_m)) + 1)
-    samples = []
-    for i in range(n):
-        dist = min(i * step_m, length)
-        p = line.interpolate(dist)
-        samples.append((p.x, p.y))  # x,y en metros
-    # also ensure last point is the true end
-    end = line.coords[-1]
-    if samples[-1] != end:
-        samples.append(end)
-    return samples
+    samples = sample_coords_by_meters(np.asarray(line.coords), step_m)
+    return [tuple(p) for p in samples.tolist()]  # x,y en metros
 
 @router.post("/submit")
-def analyze_route(payload: RouteIn):
+def analyze_route(payload: RouteIn, request: Request, format: Optional[str] = FORMAT_QUERY, encoding: Optional[str] = ENCODING_QUERY):
     try:
         geom = shape(payload.geojson)
     except Exception as e:
@@ -51,19 +63,236 @@ def analyze_route(payload: RouteIn):
     if not isinstance(geom, LineString):
         raise HTTPException(status_code=400, detail="Se requiere GeoJSON de tipo LineString")
 
-    # 1) proyectar a metros
-    line_3857 = project_linestring_to_3857(geom)
+    if payload.step_m <= 0:
+        raise HTTPException(status_code=400, detail="step_m debe ser mayor que 0")
 
-    # 2) muestrear cada X metros
-    samples_m = sample_linestring_by_meters(line_3857, payload.step_m)
+    # 1) proyectar a metros (vectorizado)
+    xy = project_coords_to_3857(geom.coords)
+    line_3857 = LineString(xy)
 
-    # 3) reprojectar las muestras a lat/lon para devolver
-    samples_latlon = [reproject_point_to_latlon((x, y)) for x, y in samples_m]
+    # 2) muestrear cada X metros sobre arreglos
+    with span("sample_linestring_by_meters"):
+        samples_m = sample_coords_by_meters(xy, payload.step_m)
+
+    # 3) reprojectar todas las muestras a lat/lon en una sola llamada
+    lat, lon = reproject_coords_to_latlon(samples_m)
+    lat = np.round(lat, 6).tolist()
+    lon = np.round(lon, 6).tolist()
 
     # 4) preparar salida mínima (más adelante aquí llamaremos a OpenTopoData/Overpass)
     response = {
         "original_length_m": round(line_3857.length, 2),
-        "n_samples": len(samples_latlon),
-        "samples": [{"lat": round(lat, 6), "lon": round(lon, 6)} for lat, lon in samples_latlon]
+        "n_samples": len(lat),
     }
+    if wants_compact(request, format, encoding):
+        return samples_response(request, response, lat, lon, fmt=format, encoding=encoding)
+    response["samples"] = [{"lat": la, "lon": lo} for la, lo in zip(lat, lon)]
     return response
+
+@router.post("/submit/adaptive")
+async def analyze_route_adaptive(payload: AdaptiveRouteIn, request: Request, format: Optional[str] = FORMAT_QUERY, encoding: Optional[str] = ENCODING_QUERY):
+    """Perfil de elevación con muestreo adaptativo (menos consultas al proveedor que el uniforme)"""
+    try:
+        geom = shape(payload.geojson)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail="GeoJSON inválido: " + str(e))
+
+    if not isinstance(geom, LineString):
+        raise HTTPException(status_code=400, detail="Se requiere GeoJSON de tipo LineString")
+
+    if payload.step_m <= 0 or payload.tolerance_m <= 0:
+        raise HTTPException(status_code=400, detail="step_m y tolerance_m deben ser mayores que 0")
+
+    profile = await adaptive_elevation_profile(
+        geom.coords,
+        payload.step_m,
+        payload.tolerance_m,
+        get_elevation_service(),
+        coarse_factor=payload.coarse_factor,
+    )
+    response = {
+        "original_length_m": profile["stats"].get("original_length_m", 0.0),
+        "n_samples": len(profile["samples"]),
+        **profile,
+    }
+    samples = profile["samples"]
+    return await samples_response_async(
+        request, response,
+        [p["lat"] for p in samples], [p["lon"] for p in samples], [p["elevation"] for p in samples],
+        fmt=format, encoding=encoding,
+    )
+
+@router.post("/batch")
+async def analyze_routes_batch(payload: BatchRouteIn):
+    """Analizar muchas rutas a la vez (p.ej. todas las calles de un sector)"""
+    if payload.step_m <= 0:
+        raise HTTPException(status_code=400, detail="step_m debe ser mayor que 0")
+
+    try:
+        return await analyze_batch(
+            payload.geojson,
+            payload.step_m,
+            get_elevation_service() if payload.with_elevation else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+class PoleRouteIn(BaseModel):
+    geojson: dict  # LineString GeoJSON (tendido aéreo)
+    step_m: float = 1.0  # resolución de las posiciones candidatas
+    elevation_step_m: float = 10.0  # la elevación se consulta a esta distancia y se interpola
+    with_elevation: bool = True
+    span_table: Optional[List[List[float]]] = None  # [[pendiente_max_pct, vano_max_m], ...] ascendente
+    min_span_m: float = 15.0
+    existing_poles: Optional[List[List[float]]] = None  # [[lon, lat], ...]
+    snap_m: float = 5.0  # distancia máxima de un poste existente a la ruta
+    reuse_cost: float = 0.3  # costo de reutilizar un poste existente (poste nuevo = 1)
+    forbidden_zones: Optional[List[dict]] = None  # polígonos GeoJSON donde no se puede poner poste
+    forbidden_zone_types: Optional[List[str]] = None  # zone_type del índice de zonas a evitar
+    cable_reserve_pct: float = 5.0
+
+@router.post("/poles")
+async def place_route_poles(payload: PoleRouteIn):
+    """Ubicación de postes y conteo de materiales sobre la ruta muestreada"""
+    geom = _linestring_from(payload.geojson)
+    if payload.step_m <= 0 or payload.elevation_step_m <= 0:
+        raise HTTPException(status_code=400, detail="step_m y elevation_step_m deben ser mayores que 0")
+    # con longitud cero no hay al menos 2 muestras (inicio y fin) entre las que tender un vano
+    if cumulative_distances(project_coords_to_3857(np.asarray(geom.coords)[:, :2]))[-1] <= 0:
+        raise HTTPException(status_code=400, detail="La ruta debe tener longitud mayor que 0")
+    if payload.min_span_m < 0 or not 0 <= payload.reuse_cost <= 1:
+        raise HTTPException(status_code=400, detail="min_span_m debe ser >= 0 y reuse_cost estar entre 0 y 1")
+    for zone in payload.forbidden_zones or []:
+        try:
+            shape(zone.get("geometry", zone))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail="Zona prohibida inválida: " + str(e))
+
+    table = DEFAULT_SPAN_TABLE
+    if payload.span_table:
+        table = [tuple(row) for row in payload.span_table]
+        if any(len(row) != 2 or row[1] <= 0 for row in table) or [r[0] for r in table] != sorted(r[0] for r in table):
+            raise HTTPException(status_code=400, detail="span_table debe ser [[pendiente_max_pct, vano_max_m], ...] en orden ascendente")
+    # también con la tabla por defecto: un vano mínimo mayor que el menor máximo no tiene solución en pendiente severa
+    if payload.min_span_m > min(r[1] for r in table):
+        raise HTTPException(status_code=400, detail="min_span_m no puede superar el menor vano máximo")
+
+    try:
+        return await plan_route_poles(
+            geom.coords,
+            step_m=payload.step_m,
+            elevation_step_m=payload.elevation_step_m,
+            elevation_service=get_elevation_service() if payload.with_elevation else None,
+            existing_poles=payload.existing_poles,
+            snap_m=payload.snap_m,
+            forbidden_zones=payload.forbidden_zones,
+            forbidden_zone_types=payload.forbidden_zone_types,
+            min_span_m=payload.min_span_m,
+            reuse_cost=payload.reuse_cost,
+            cable_reserve_pct=payload.cable_reserve_pct,
+            span_table=table,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+class RouteJobIn(RouteIn):
+    with_elevation: bool = True
+
+@router.post("/jobs", status_code=202)
+async def submit_route_job(payload: RouteJobIn):
+    """Encolar el análisis de una ruta larga; el progreso se consulta en status_url o events_url"""
+    try:
+        geom = shape(payload.geojson)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail="GeoJSON inválido: " + str(e))
+
+    if not isinstance(geom, LineString):
+        raise HTTPException(status_code=400, detail="Se requiere GeoJSON de tipo LineString")
+
+    if payload.step_m <= 0:
+        raise HTTPException(status_code=400, detail="step_m debe ser mayor que 0")
+
+    try:
+        job_id = await route_jobs.submit(list(geom.coords), payload.step_m, payload.with_elevation)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/analyze/jobs/{job_id}",
+        "events_url": f"/api/analyze/jobs/{job_id}/events",
+    }
+
+@router.get("/jobs/{job_id}")
+async def get_route_job(job_id: str):
+    job = route_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def stream_route_job(job_id: str):
+    """Progreso como Server-Sent Events: 'progress' en cada cambio y 'done' al terminar"""
+    if route_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+
+    async def events():
+        async for job in route_jobs.watch(job_id):
+            finished = job["status"] in ("done", "error", "cancelled")
+            data = job if finished else {k: v for k, v in job.items() if k != "result"}
+            yield f"event: {'done' if finished else 'progress'}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_route_job(job_id: str):
+    if route_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    cancelled = await route_jobs.cancel(job_id)
+    return {"job_id": job_id, "cancelled": cancelled, "status": route_jobs.get(job_id)["status"]}
+
+class RouteSessionIn(RouteJobIn):
+    pass
+
+class RouteEditIn(BaseModel):
+    geojson: dict  # la geometría completa editada (LineString)
+
+def _linestring_from(geojson: dict) -> LineString:
+    try:
+        geom = shape(geojson)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail="GeoJSON inválido: " + str(e))
+    if not isinstance(geom, LineString):
+        raise HTTPException(status_code=400, detail="Se requiere GeoJSON de tipo LineString")
+    return geom
+
+async def _session_response(request: Request, result: dict, format: Optional[str], encoding: Optional[str]):
+    samples = result["samples"]
+    return await samples_response_async(request, result, samples["lat"], samples["lon"], samples["elevation"], fmt=format, encoding=encoding)
+
+@router.post("/sessions")
+async def create_route_session(payload: RouteSessionIn, request: Request, format: Optional[str] = FORMAT_QUERY, encoding: Optional[str] = ENCODING_QUERY):
+    """Abrir una sesión de edición: análisis completo de la ruta inicial"""
+    geom = _linestring_from(payload.geojson)
+    if payload.step_m <= 0:
+        raise HTTPException(status_code=400, detail="step_m debe ser mayor que 0")
+    result = await route_sessions.create(list(geom.coords), payload.step_m, payload.with_elevation)
+    return await _session_response(request, result, format, encoding)
+
+@router.put("/sessions/{session_id}")
+async def update_route_session(session_id: str, payload: RouteEditIn, request: Request, format: Optional[str] = FORMAT_QUERY, encoding: Optional[str] = ENCODING_QUERY):
+    """Re-analizar la ruta editada recalculando solo los segmentos que cambiaron"""
+    geom = _linestring_from(payload.geojson)
+    result = await route_sessions.update(session_id, list(geom.coords))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Sesión no encontrada o expirada")
+    return await _session_response(request, result, format, encoding)
+
+@router.delete("/sessions/{session_id}")
+async def close_route_session(session_id: str):
+    return {"session_id": session_id, "closed": route_sessions.delete(session_id)}
@@ -1,13 +1,21 @@
 # backend/app/api/data.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-import os
-import psycopg2
-from psycopg2.extras import Json, RealDictCursor
-from dotenv import load_dotenv
+from psycopg2.extras import Json, execute_values
+from shapely.geometry import shape, LineString
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime
+import itertools
+import json
+from app.core.config import get_settings
+from app.core.database import get_conn, get_async_conn
+from app.services.spatial_index import spatial_index
+from app.services import route_export
 
-# Cargar .env ANTES de usarlo
-load_dotenv()
+settings = get_settings()
 
 router = APIRouter()
 
@@ -17,38 +25,256 @@ class CollectPayload(BaseModel):
     meta: dict = {}
 
 
-def _get_conn():
-    return psycopg2.connect(
-        host=os.environ.get("POSTGRES_HOST"),
-        port=int(os.environ.get("POSTGRES_PORT", 5432)),
-        dbname=os.environ.get("POSTGRES_DB"),
-        user=os.environ.get("POSTGRES_USER"),
-        password=os.environ.get("POSTGRES_PASSWORD"),
-        sslmode='require'
-    )
-
 @router.post("/collect")
 def collect_data(payload: CollectPayload):
     try:
-        conn = _get_conn()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO collected_data (config_id, geojson, step_m, metadata)
-            VALUES (%s, %s, %s, %s)
-            RETURNING id;
-            """,
-            (
-                None,
-                Json(payload.geojson),
-                payload.step_m,
-                Json(payload.meta),
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO collected_data (config_id, geojson, step_m, metadata)
+                VALUES (%s, %s, %s, %s)
+                RETURNING id;
+                """,
+                (
+                    None,
+                    Json(payload.geojson),
+                    payload.step_m,
+                    Json(payload.meta),
+                )
             )
-        )
-        inserted_id = cur.fetchone()[0]
-        conn.commit()
-        cur.close()
-        conn.close()
+            inserted_id = cur.fetchone()[0]
+            conn.commit()
         return {"ok": True, "id": inserted_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _row_from_item(item: Any) -> Tuple:
+    """Validar una fila de la carga masiva (Feature GeoJSON o forma de /collect)"""
+    if not isinstance(item, dict):
+        raise ValueError("Se esperaba un objeto JSON")
+    if item.get("type") == "Feature":
+        props = item.get("properties") or {}
+        payload = CollectPayload(
+            geojson=item,
+            step_m=props.get("step_m", 20),
+            meta=props.get("meta", props),
+        )
+    else:
+        payload = CollectPayload(**item)
+
+    geom = shape(payload.geojson)
+    if not isinstance(geom, LineString) or geom.is_empty or len(geom.coords) < 2:
+        raise ValueError("Se requiere una geometría LineString con al menos 2 puntos")
+    if payload.step_m <= 0:
+        raise ValueError("step_m debe ser mayor que 0")
+    return (None, Json(payload.geojson), payload.step_m, Json(payload.meta))
+
+
+def _insert_batch(conn, rows: List[Tuple]) -> List[int]:
+    with conn.cursor() as cur:
+        result = execute_values(
+            cur,
+            "INSERT INTO collected_data (config_id, geojson, step_m, metadata) VALUES %s RETURNING id",
+            rows,
+            page_size=len(rows),
+            fetch=True,
+        )
+    return [r[0] for r in result]
+
+
+async def _iter_ndjson(request: Request) -> AsyncIterator[Any]:
+    """Decodificar el cuerpo NDJSON línea a línea sin cargarlo completo en memoria"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+async def _read_limited_body(request: Request, limit: int) -> bytes:
+    """Leer el cuerpo completo cortando con 413 apenas supera `limit` bytes"""
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"El FeatureCollection supera {limit} bytes; envía el lote como NDJSON (application/x-ndjson)",
+    )
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > limit:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise too_large
+    return bytes(body)
+
+
+async def _iter_feature_collection(request: Request) -> AsyncIterator[Any]:
+    # el FeatureCollection se decodifica entero: se acota el tamaño en vez de bufferizar sin límite
+    raw = await _read_limited_body(request, settings.BULK_MAX_JSON_BYTES)
+    try:
+        body = json.loads(raw)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"JSON inválido: {e}")
+    if not isinstance(body, dict) or body.get("type") != "FeatureCollection":
+        raise HTTPException(status_code=400, detail="Se esperaba un FeatureCollection GeoJSON o NDJSON")
+    for feature in body.get("features", []):
+        yield feature
+
+
+@router.post("/collect/bulk")
+async def collect_data_bulk(request: Request):
+    """Carga masiva en collected_data en una sola transacción
+
+    Acepta un FeatureCollection (application/json, application/geo+json) o
+    NDJSON (application/x-ndjson) con un Feature u objeto {geojson, step_m,
+    meta} por línea; el NDJSON se procesa en streaming. El FeatureCollection
+    se lee completo y está limitado a BULK_MAX_JSON_BYTES (20 MB por defecto):
+    si lo supera se responde 413 y el lote debe enviarse como NDJSON, que no
+    tiene límite de tamaño. Las filas inválidas se
+    reportan y no se insertan; las válidas se insertan por lotes con
+    execute_values.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    ndjson = content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl")
+    items = _iter_ndjson(request) if ndjson else _iter_feature_collection(request)
+    batch_size = settings.BULK_INSERT_BATCH_SIZE
+
+    results: List[Dict[str, Any]] = []
+    batch: List[Tuple] = []
+    batch_rows: List[int] = []
+    inserted = 0
+
+    async def flush(conn):
+        nonlocal inserted
+        ids = await run_in_threadpool(_insert_batch, conn, batch)
+        for row_index, new_id in zip(batch_rows, ids):
+            results[row_index]["id"] = new_id
+        inserted += len(ids)
+        batch.clear()
+        batch_rows.clear()
+
+    try:
+        async with get_async_conn() as conn:
+            row = 0
+            async for item in items:
+                try:
+                    if ndjson:
+                        item = json.loads(item)
+                    batch.append(_row_from_item(item))
+                    batch_rows.append(len(results))
+                    results.append({"row": row, "id": None})
+                except Exception as e:
+                    # cualquier fallo de una fila (JSON, validación, geometría) solo descarta esa fila
+                    results.append({"row": row, "error": str(e)})
+                row += 1
+                if len(batch) >= batch_size:
+                    await flush(conn)
+            if batch:
+                await flush(conn)
+            await run_in_threadpool(conn.commit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    failed = len(results) - inserted
+    return {
+        "ok": failed == 0,
+        "inserted": inserted,
+        "failed": failed,
+        "results": results,
+    }
+
+
+def _parse_bbox(bbox: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    if bbox is None:
+        return None
+    try:
+        box_values = tuple(float(v) for v in bbox.split(","))
+    except ValueError:
+        box_values = ()
+    if len(box_values) != 4 or box_values[0] > box_values[2] or box_values[1] > box_values[3]:
+        raise HTTPException(status_code=400, detail="bbox debe ser min_lon,min_lat,max_lon,max_lat")
+    return box_values
+
+
+@router.get("/routes")
+def find_routes(
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    lon: Optional[float] = None,
+    lat: Optional[float] = None,
+    distance_m: Optional[float] = Query(None, gt=0),
+    after_id: int = Query(0, ge=0, description="Paginación por clave: id de la última ruta recibida"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Rutas guardadas dentro de un bbox o a cierta distancia de un punto (resúmenes ligeros)"""
+    box_values = _parse_bbox(bbox)
+    if box_values is None and (lon is None or lat is None or distance_m is None):
+        raise HTTPException(status_code=400, detail="Indica bbox o lon, lat y distance_m")
+
+    try:
+        if box_values is not None:
+            routes = spatial_index.query_bbox(box_values, after_id=after_id, limit=limit)
+        else:
+            routes = spatial_index.query_within(lon, lat, distance_m, after_id=after_id, limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "ok": True,
+        "backend": spatial_index.backend,
+        "count": len(routes),
+        "routes": routes,
+        "next_after_id": routes[-1]["id"] if len(routes) == limit else None,
+    }
+
+
+@router.get("/export")
+async def export_data(
+    format: str = Query("ndjson", description="ndjson, geojson, arrow o parquet"),
+    created_from: Optional[datetime] = Query(None, description="created_at >= (ISO 8601)"),
+    created_to: Optional[datetime] = Query(None, description="created_at < (ISO 8601)"),
+    config_id: Optional[int] = None,
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    include_config: bool = Query(False, description="Incluir el JSON de user_configs en cada fila"),
+    chunk_size: Optional[int] = Query(None, ge=1, le=50000),
+):
+    """Exportar collected_data en streaming (NDJSON, FeatureCollection, Arrow o GeoParquet)
+
+    Las filas se leen con un cursor del lado del servidor en bloques de
+    chunk_size y cada bloque se escribe a la respuesta antes de pedir el
+    siguiente: la memoria no crece con el tamaño de la tabla.
+    """
+    if format not in route_export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format debe ser uno de {', '.join(route_export.EXPORT_FORMATS)}")
+    if format in ("arrow", "parquet") and not route_export.columnar_available():
+        raise HTTPException(status_code=406, detail="pyarrow no está instalado en el servidor")
+    filters = route_export.ExportFilter(
+        created_from=created_from,
+        created_to=created_to,
+        config_id=config_id,
+        bbox=_parse_bbox(bbox),
+        include_config=include_config,
+    )
+
+    source = route_export.iter_export_chunks(filters, chunk_size or settings.EXPORT_CHUNK_SIZE)
+    # el primer bloque se lee antes de responder: los errores de BD todavía pueden ser un 500
+    try:
+        first = await run_in_threadpool(next, source, None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    chunks = itertools.chain([first], source) if first is not None else iter(())
+
+    media_type, extension = route_export.EXPORT_FORMATS[format]
+    return StreamingResponse(
+        route_export.write_export(chunks, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="collected_data.{extension}"'},
+        # devolver la conexión al pool si el cliente corta antes del final
+        background=BackgroundTask(source.close),
+    )
@@ -1,9 +1,13 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 from dotenv import load_dotenv
+from pathlib import Path
 
 load_dotenv()
 
+# backend/: base de las rutas relativas de la configuración
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
 class Settings(BaseSettings):
     # PostgreSQL
     POSTGRES_HOST: str = "db"
@@ -11,12 +15,97 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = "ftth"
     POSTGRES_USER: str = "***"
     POSTGRES_PASSWORD: str = "***"
+    POSTGRES_SSLMODE: str = "require"
+
+    # Pool de conexiones compartido (app.core.database)
+    DB_POOL_MIN: int = 1
+    DB_POOL_MAX: int = 10
+    DB_POOL_TIMEOUT_S: float = 10.0
+    BULK_INSERT_BATCH_SIZE: int = 500
+    BULK_MAX_JSON_BYTES: int = 20 * 1024 * 1024  # FeatureCollection de /collect/bulk (se lee completo); NDJSON sin límite
+    EXPORT_CHUNK_SIZE: int = 1000  # filas por bloque del cursor de /api/data/export
     
     # APIs - SIN valores hardcoded
     COHERE_API_KEY: str = ""
+    COHERE_BASE_URL: str = ""  # vacío = API oficial; p.ej. http://127.0.0.1:8102 para el servidor falso
     OPENAI_API_KEY: str = ""
     ARCGIS_API_KEY: str = ""
-    
+
+    # Cola de generación con IA (workers en segundo plano)
+    AI_WORKERS: int = 2
+    AI_QUEUE_MAX: int = 100
+    COHERE_CALLS_PER_MINUTE: float = 20
+    AI_JOB_TTL_S: float = 3600
+
+    # Caché de análisis y recomendaciones (clave = hash del contenido)
+    AI_CACHE_MAX_ENTRIES: int = 512
+    AI_CACHE_TTL_S: float = 24 * 3600
+
+    # Análisis por lotes: pool de procesos (0 = un worker por núcleo)
+    BATCH_PROCESS_WORKERS: int = 0
+    BATCH_MAX_ROUTES: int = 2000
+
+    # Trabajos de rutas largas en segundo plano (estado persistido en SQLite)
+    # relativa a backend/ (no al directorio de trabajo)
+    ROUTE_JOBS_DB_PATH: str = "cache/route_jobs.sqlite3"
+    ROUTE_JOBS_MAX_CONCURRENT: int = 2
+    ROUTE_JOBS_MAX_PENDING: int = 50
+    ROUTE_JOBS_CHUNK_POINTS: int = 600
+    ROUTE_JOBS_TTL_S: float = 24 * 3600
+
+    # Sesiones de edición de rutas (re-análisis incremental, en memoria)
+    ROUTE_SESSIONS_MAX: int = 256
+    ROUTE_SESSIONS_TTL_S: float = 3600
+
+    # Base de reglas del sistema experto (se recarga al modificarse)
+    RULES_PATH: str = str(Path(__file__).resolve().parents[1] / "rules" / "reglas_ftth.yaml")
+
+    # Zonas (polígonos GeoJSON: archivo o carpeta) para clasificar rutas por tramo
+    ZONES_PATH: str = str(Path(__file__).resolve().parents[1] / "zones")
+    ZONES_DEFAULT_TYPE: str = "rural"
+    ZONES_SAMPLE_STEP_M: float = 25.0
+
+    # Arranque: crear en el lifespan los clientes perezosos (SDK de Cohere, caché SQLite)
+    # y, opcionalmente, validar la key de ArcGIS con GIS (requiere red)
+    STARTUP_WARMUP_CLIENTS: bool = True
+    ARCGIS_VALIDATE_ON_STARTUP: bool = False
+
+    # Métricas: cabecera Server-Timing en todas las respuestas (o con X-Debug-Timing: 1)
+    # y endpoints del profiler por muestreo (/debug/profiler)
+    METRICS_TIMING_HEADER: bool = False
+    PROFILER_ENABLED: bool = False
+
+    # Frontend: build con hash + .br/.gz (app.core.static_assets), regenerado al arrancar si cambió
+    # relativo a backend/ (no al directorio de trabajo)
+    STATIC_BUILD_DIR: str = "cache/static"
+    STATIC_BUILD_ON_STARTUP: bool = True
+
+    # Elevación ArcGIS (lotes concurrentes con cliente HTTP compartido)
+    ARCGIS_ELEVATION_URL: str = "https://elevation-api.arcgis.com/arcgis/rest/services/elevation-service/v1/elevation/at-many-points"
+    ARCGIS_BATCH_SIZE: int = 150
+    ARCGIS_MAX_CONCURRENCY: int = 4
+    ARCGIS_MAX_RETRIES: int = 3
+    ARCGIS_RETRY_BACKOFF_S: float = 0.5
+    ARCGIS_MAX_RETRY_AFTER_S: float = 30.0  # tope de la espera que pide Retry-After
+    ARCGIS_TIMEOUT_S: float = 30.0
+
+    # Caché local de elevaciones (SQLite); precisión en decimales de grado (5 ≈ 1.1 m)
+    ELEVATION_CACHE_ENABLED: bool = True
+    # relativa a backend/ (no al directorio de trabajo)
+    ELEVATION_CACHE_PATH: str = "cache/elevation_cache.sqlite3"
+    ELEVATION_CACHE_PRECISION: int = 5
+    ELEVATION_CACHE_MAX_ENTRIES: int = 500_000
+    ELEVATION_CACHE_TTL_S: float = 30 * 24 * 3600
+
+    # Coalescedor de elevaciones: junta los puntos de peticiones concurrentes en lotes llenos
+    ELEVATION_COALESCE_ENABLED: bool = True
+    ELEVATION_COALESCE_WINDOW_MS: float = 20.0  # espera máxima de un lote incompleto
+
+    # Proveedor de elevación: "arcgis" (API remota) o "dem" (tiles locales)
+    ELEVATION_PROVIDER: str = "arcgis"
+    DEM_TILES_DIR: str = "dem"  # relativo a backend/ (no al directorio de trabajo)
+    DEM_ARCGIS_FALLBACK: bool = True
+
     class Config:
         env_file = "../.env"
         case_sensitive = False
@@ -0,0 +1,167 @@
+# backend/app/core/database.py
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class PoolTimeout(Exception):
+    """No se obtuvo una conexión libre dentro de DB_POOL_TIMEOUT_S"""
+
+
+class DatabasePool:
+    """Pool de conexiones PostgreSQL compartido por todos los routers
+
+    Envuelve ThreadedConnectionPool (los endpoints síncronos de FastAPI
+    corren en un threadpool) y añade espera con timeout cuando el pool está
+    lleno, devolución segura de conexiones ante errores y métricas de uso.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, timeout: float, **conn_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.conn_kwargs = conn_kwargs
+        self._pool: Optional[pg_pool.ThreadedConnectionPool] = None
+        self._init_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._stats_lock = threading.Lock()
+        self._in_use = 0
+        self._acquired = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_total_s = 0.0
+        self._wait_max_s = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "DatabasePool":
+        return cls(
+            minconn=settings.DB_POOL_MIN,
+            maxconn=settings.DB_POOL_MAX,
+            timeout=settings.DB_POOL_TIMEOUT_S,
+            host=settings.POSTGRES_HOST,
+            port=settings.POSTGRES_PORT,
+            dbname=settings.POSTGRES_DB,
+            user=settings.POSTGRES_USER,
+            password=settings.POSTGRES_PASSWORD,
+            sslmode=settings.POSTGRES_SSLMODE,
+            # Neon cierra conexiones inactivas; keepalives para detectarlas antes
+            keepalives=1,
+            keepalives_idle=30,
+            keepalives_interval=10,
+            keepalives_count=3,
+        )
+
+    def open(self):
+        """Crear el pool (se llama en el arranque; si falla se reintenta en el primer uso)"""
+        with self._init_lock:
+            if self._pool is None:
+                self._pool = pg_pool.ThreadedConnectionPool(self.minconn, self.maxconn, **self.conn_kwargs)
+                logger.info(f"✅ Pool PostgreSQL listo ({self.minconn}-{self.maxconn} conexiones)")
+
+    def close(self):
+        with self._init_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+
+    @contextmanager
+    def connection(self):
+        """Prestar una conexión; hace rollback si hay error y siempre la devuelve al pool"""
+        if self._pool is None:
+            self.open()
+
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._stats_lock:
+                self._timeouts += 1
+            raise PoolTimeout(f"Sin conexiones libres tras {self.timeout}s (max={self.maxconn})")
+        waited = time.perf_counter() - start
+
+        conn = None
+        discard = False
+        try:
+            conn = self._pool.getconn()
+            if conn.closed:
+                # conexión muerta (p.ej. cerrada por el servidor): reemplazarla
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+            with self._stats_lock:
+                self._in_use += 1
+                self._acquired += 1
+                self._wait_total_s += waited
+                self._wait_max_s = max(self._wait_max_s, waited)
+
+            try:
+                yield conn
+            except BaseException as e:
+                discard = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+                if not conn.closed:
+                    try:
+                        conn.rollback()
+                    except psycopg2.Error:
+                        discard = True
+                raise
+            finally:
+                with self._stats_lock:
+                    self._in_use -= 1
+        finally:
+            if conn is not None and self._pool is not None:
+                discard = discard or bool(conn.closed)
+                if discard:
+                    with self._stats_lock:
+                        self._discarded += 1
+                self._pool.putconn(conn, close=discard)
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            idle = len(self._pool._pool) if self._pool is not None else 0
+            return {
+                "initialized": self._pool is not None,
+                "min": self.minconn,
+                "max": self.maxconn,
+                "in_use": self._in_use,
+                "idle": idle,
+                "acquired_total": self._acquired,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "wait_avg_ms": round(1000 * self._wait_total_s / self._acquired, 3) if self._acquired else 0.0,
+                "wait_max_ms": round(1000 * self._wait_max_s, 3),
+            }
+
+
+db_pool = DatabasePool.from_settings()
+
+
+def get_conn():
+    """Uso: `with get_conn() as conn: ...`"""
+    return db_pool.connection()
+
+
+@asynccontextmanager
+async def get_async_conn():
+    """Versión para endpoints async: esperar la conexión y devolverla ocurre en el threadpool
+
+    Uso: `async with get_async_conn() as conn:` y ejecutar las consultas con
+    run_in_threadpool para no bloquear el event loop.
+    """
+    cm = db_pool.connection()
+    conn = await run_in_threadpool(cm.__enter__)
+    try:
+        yield conn
+    except BaseException as e:
+        await run_in_threadpool(cm.__exit__, type(e), e, e.__traceback__)
+        raise
+    else:
+        await run_in_threadpool(cm.__exit__, None, None, None)
@@ -0,0 +1,297 @@
+# backend/app/core/metrics.py
+import bisect
+import contextvars
+import functools
+import inspect
+import sys
+import threading
+import time
+import traceback
+from collections import Counter as _Tally
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Buckets de latencia (s) y de tamaño (bytes) al estilo de Prometheus
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _labels_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = []
+    for n, v in zip(names, values):
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{n}="{v}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels_text(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], List[float]] = {}  # conteos por bucket + [suma, total]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = self.header()
+        for key, data in items:
+            cumulative = 0.0
+            labels = _labels_text(self.labelnames, key)
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                le = _labels_text(self.labelnames, key, 'le="%g"' % bound)
+                lines.append(f"{self.name}_bucket{le} {cumulative:g}")
+            le = _labels_text(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {data[-1]:g}")
+            lines.append(f"{self.name}_sum{labels} {data[-2]}")
+            lines.append(f"{self.name}_count{labels} {data[-1]:g}")
+        return lines
+
+
+class Registry:
+    """Métricas del proceso en formato de exposición de texto de Prometheus
+
+    Además de contadores e histogramas admite "collectors": funciones que
+    devuelven gauges calculados al momento de exportar (p.ej. el pool de BD).
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]] = []
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn: Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]):
+        """fn() -> [(nombre, ayuda, etiquetas, valor)] exportados como gauges"""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        seen = set()
+        for fn in self._collectors:
+            try:
+                samples = list(fn())
+            except Exception:
+                continue
+            for name, help, labels, value in samples:
+                if name not in seen:
+                    lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+                    seen.add(name)
+                names = tuple(labels)
+                lines.append(f"{name}{_labels_text(names, tuple(labels[n] for n in names))} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter("ftth_http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status"))
+http_latency = registry.histogram("ftth_http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route"))
+http_request_bytes = registry.histogram("ftth_http_request_size_bytes", "Tamaño del cuerpo de la petición", ("route",), SIZE_BUCKETS)
+http_response_bytes = registry.histogram("ftth_http_response_size_bytes", "Tamaño del cuerpo de la respuesta", ("route",), SIZE_BUCKETS)
+span_latency = registry.histogram("ftth_span_duration_seconds", "Duración de las etapas internas (BD, análisis, ArcGIS, LLM)", ("span",))
+span_errors = registry.counter("ftth_span_errors_total", "Etapas internas que terminaron con excepción", ("span",))
+
+
+# --- spans: tiempo por etapa, acumulado también en el desglose de la petición actual ---
+
+class RequestSpans(list):
+    """(etapa, segundos) de una petición; se cierra al responder
+
+    Las tareas creadas durante la petición (p.ej. los workers de una cola)
+    heredan el contexto: al cerrarla dejan de acumular en ella.
+    """
+    closed = False
+
+
+_request_spans: contextvars.ContextVar[Optional[RequestSpans]] = contextvars.ContextVar("request_spans", default=None)
+
+
+def start_request_timing() -> Tuple[RequestSpans, contextvars.Token]:
+    spans = RequestSpans()
+    return spans, _request_spans.set(spans)
+
+
+def end_request_timing(spans: RequestSpans, token: contextvars.Token):
+    spans.closed = True
+    _request_spans.reset(token)
+
+
+@contextmanager
+def span(name: str):
+    """Medir una etapa: histograma global + desglose de la petición en curso
+
+    El desglose se propaga a run_in_threadpool / asyncio.to_thread porque
+    ambos copian el contexto (la lista es compartida).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        span_errors.inc(span=name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        span_latency.observe(elapsed, span=name)
+        spans = _request_spans.get()
+        if spans is not None and not spans.closed:
+            spans.append((name, elapsed))
+
+
+def timed(name: str):
+    """Decorador equivalente a `with span(name)` para funciones síncronas o async"""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing(spans: List[Tuple[str, float]], total_s: float) -> str:
+    """Cabecera Server-Timing (visible en las DevTools del navegador) con la suma por etapa"""
+    totals: Dict[str, Tuple[float, int]] = {}
+    for name, elapsed in spans:
+        acc, count = totals.get(name, (0.0, 0))
+        totals[name] = (acc + elapsed, count + 1)
+    parts = [
+        f'{name.replace(".", "_")};dur={1000 * acc:.2f};desc="{name} x{count}"'
+        for name, (acc, count) in totals.items()
+    ]
+    parts.append(f"total;dur={1000 * total_s:.2f}")
+    return ", ".join(parts)
+
+
+# --- profiler por muestreo activable en caliente ---
+
+class SamplingProfiler:
+    """Muestrea las pilas de todos los hilos cada `interval_s` desde un hilo aparte
+
+    No requiere dependencias ni reinicio: se activa y desactiva por HTTP y
+    devuelve las pilas en formato "collapsed" (compatible con flamegraph.pl
+    y speedscope). El costo es proporcional a la frecuencia de muestreo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stacks: _Tally = _Tally()
+        self.interval_s = 0.005
+        self.samples = 0
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_s: float = 0.005) -> bool:
+        with self._lock:
+            if self.running:
+                return False
+            self.interval_s = max(interval_s, 0.001)
+            self._stacks = _Tally()
+            self.samples = 0
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> Dict:
+        with self._lock:
+            if self._thread is not None:
+                self._stop.set()
+                self._thread.join()
+                self._thread = None
+        return self.report()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = ";".join(f"{f.name} ({f.filename.rsplit('/', 1)[-1]}:{f.lineno})" for f in traceback.extract_stack(frame))
+                self._stacks[stack] += 1
+            self.samples += 1
+
+    def report(self, top: int = 50) -> Dict:
+        stacks = self._stacks.most_common(top)
+        return {
+            "running": self.running,
+            "interval_ms": round(1000 * self.interval_s, 3),
+            "samples": self.samples,
+            "duration_s": round(time.time() - self.started_at, 3) if self.started_at else 0.0,
+            "collapsed": [f"{stack} {count}" for stack, count in stacks],
+        }
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,101 @@
+# backend/app/core/readiness.py
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ComponentState:
+    required: bool = False
+    lazy: bool = False  # se inicializa en el primer uso, no en el arranque
+    status: str = "pending"  # pending | ready | failed
+    elapsed_ms: Optional[float] = None
+    error: Optional[str] = None
+    initialized_at: Optional[float] = None
+
+
+class Readiness:
+    """Qué componentes de la app ya están inicializados (para /ready)
+
+    Los del arranque se registran con `warm_up` desde el lifespan; los
+    perezosos (clientes de Cohere/ArcGIS, caché de elevación...) con `track`
+    la primera vez que se usan. La app está lista cuando terminó el lifespan
+    y todos los componentes requeridos quedaron en "ready".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components: Dict[str, ComponentState] = {}
+        self.created_at = time.time()
+        self.startup_ms: Optional[float] = None
+
+    def declare(self, name: str, required: bool = False, lazy: bool = False):
+        with self._lock:
+            self._components.setdefault(name, ComponentState(required=required, lazy=lazy))
+
+    def _record(self, name: str, elapsed_s: float, error: Optional[BaseException] = None):
+        with self._lock:
+            state = self._components.setdefault(name, ComponentState())
+            state.status = "failed" if error is not None else "ready"
+            state.error = f"{type(error).__name__}: {error}" if error is not None else None
+            state.elapsed_ms = round(1000 * elapsed_s, 2)
+            state.initialized_at = time.time()
+
+    @contextmanager
+    def track(self, name: str):
+        """Registrar la inicialización de `name`; la excepción se propaga"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self._record(name, time.perf_counter() - start, e)
+            raise
+        self._record(name, time.perf_counter() - start)
+
+    async def warm_up(self, name: str, fn: Callable[[], Any], required: bool = True) -> bool:
+        """Inicializar un componente en el arranque; un fallo se registra sin detener la app"""
+        self.declare(name, required=required)
+        try:
+            with self.track(name):
+                if inspect.iscoroutinefunction(fn):
+                    await fn()
+                else:
+                    await run_in_threadpool(fn)
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ {name} no disponible al arrancar: {e}")
+            return False
+
+    def start_background(self, name: str, fn: Callable[[], Any], required: bool = False) -> asyncio.Task:
+        """warm_up sin bloquear el arranque (p.ej. la BD remota)"""
+        self.declare(name, required=required)
+        return asyncio.create_task(self.warm_up(name, fn, required=required))
+
+    def startup_complete(self, elapsed_s: float):
+        self.startup_ms = round(1000 * elapsed_s, 2)
+        logger.info(f"✅ Arranque completo en {self.startup_ms} ms")
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            components = {name: asdict(state) for name, state in self._components.items()}
+        ready = self.startup_ms is not None and all(
+            c["status"] == "ready" for c in components.values() if c["required"]
+        )
+        return {
+            "ready": ready,
+            "startup_ms": self.startup_ms,
+            "uptime_s": round(time.time() - self.created_at, 3),
+            "components": components,
+        }
+
+
+readiness = Readiness()
@@ -0,0 +1,268 @@
+# backend/app/core/static_assets.py
+"""Frontend estático con nombres con hash, variantes .br/.gz y caché HTTP.
+
+`build_assets` copia el frontend a un directorio de build: los assets
+(CSS, JS, imágenes) quedan como `nombre.<hash>.ext` y las referencias
+`/frontend/...` dentro de HTML/CSS/JS se reescriben a esos nombres; los
+archivos de texto se precomprimen con gzip (y brotli si está instalado).
+
+`PrecompressedStaticFiles` sirve ese build: los assets con hash con
+`Cache-Control: immutable` de un año y el resto (HTML) con `no-cache`
+y ETag por contenido, así que las recargas se resuelven con 304.
+
+Uso (desde backend/):
+    python -m app.core.static_assets --frontend ../frontend --out cache/static
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.core.config import BACKEND_DIR, get_settings
+
+logger = logging.getLogger(__name__)
+
+try:  # brotli es opcional: sin él solo se generan variantes .gz
+    import brotli
+except ImportError:
+    brotli = None
+
+URL_PREFIX = "/frontend"
+MANIFEST = "manifest.json"
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+COMPRESSIBLE = {".html", ".css", ".js", ".mjs", ".json", ".svg", ".txt", ".xml", ".map"}
+# texto donde se reescriben referencias; el orden hace que un CSS vea ya los nombres con hash de lo que cita
+REWRITE_ORDER = (".js", ".mjs", ".css", ".html")
+# se sirven con su nombre original (las URLs públicas no cambian)
+UNHASHED = {".html"}
+# compresión que no ahorra al menos esto no vale un archivo extra
+MIN_SAVING = 0.05
+
+_REF_RE = re.compile(re.escape(URL_PREFIX) + r"/([\w./-]+)")
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _hashed_name(rel: str, digest: str) -> str:
+    stem, ext = os.path.splitext(rel)
+    return f"{stem}.{digest[:10]}{ext}"
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _iter_sources(src: Path):
+    """(ruta relativa, Path) de los archivos del frontend, sin ocultos"""
+    for path in sorted(p for p in src.rglob("*") if p.is_file()):
+        rel = path.relative_to(src).as_posix()
+        if not (rel.startswith(".") or "/." in rel):
+            yield rel, path
+
+
+def source_fingerprint(src: Path) -> str:
+    """Hash de rutas, tamaños y mtimes del frontend: cambia si cambia cualquier archivo"""
+    h = hashlib.sha256()
+    for rel, path in _iter_sources(src):
+        st = path.stat()
+        h.update(f"{rel}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    h.update(b"br" if brotli is not None else b"gz")
+    return h.hexdigest()
+
+
+def load_manifest(out: Path) -> Optional[Dict]:
+    try:
+        return json.loads((out / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def build_assets(src: Path, out: Path, force: bool = False) -> Dict:
+    """Construir el frontend en out/<fingerprint>/ y publicar out/manifest.json
+
+    No hace nada si el manifest ya corresponde al contenido actual. Cada build
+    va a su propio subdirectorio y el manifest se reemplaza de forma atómica,
+    así que varios workers pueden construir a la vez sin servir mezclas.
+    """
+    src, out = Path(src), Path(out)
+    fingerprint = source_fingerprint(src)
+    current = load_manifest(out)
+    if not force and current is not None and current.get("fingerprint") == fingerprint:
+        return current
+
+    build = fingerprint[:16]
+    root = out / build
+    sources = {rel: path.read_bytes() for rel, path in _iter_sources(src)}
+
+    def rank(rel: str) -> int:
+        ext = os.path.splitext(rel)[1].lower()
+        return REWRITE_ORDER.index(ext) + 1 if ext in REWRITE_ORDER else 0
+
+    renamed: Dict[str, str] = {}  # ruta lógica -> ruta publicada
+    files: Dict[str, Dict] = {}
+    for rel in sorted(sources, key=lambda r: (rank(r), r)):
+        data = sources[rel]
+        ext = os.path.splitext(rel)[1].lower()
+        if ext in REWRITE_ORDER:
+            text = data.decode("utf-8")
+            text = _REF_RE.sub(
+                lambda m: f"{URL_PREFIX}/{renamed[m.group(1)]}" if m.group(1) in renamed else m.group(0), text)
+            data = text.encode("utf-8")
+
+        digest = _digest(data)
+        published = rel if ext in UNHASHED else _hashed_name(rel, digest)
+        renamed[rel] = published
+        _write_atomic(root / published, data)
+
+        encodings = {}
+        if ext in COMPRESSIBLE:
+            variants = {"gzip": (".gz", gzip.compress(data, compresslevel=9, mtime=0))}
+            if brotli is not None:
+                variants["br"] = (".br", brotli.compress(data, quality=11))
+            for encoding, (suffix, body) in variants.items():
+                if len(body) <= len(data) * (1 - MIN_SAVING):
+                    _write_atomic(root / (published + suffix), body)
+                    encodings[encoding] = published + suffix
+
+        files[rel] = {
+            "path": published,
+            "etag": digest[:20],
+            "immutable": published != rel,
+            "size": len(data),
+            "encodings": encodings,
+        }
+
+    manifest = {"fingerprint": fingerprint, "build": build, "files": files}
+    _write_atomic(out / MANIFEST, json.dumps(manifest, indent=1).encode("utf-8"))
+
+    # borrar builds anteriores salvo el previo (páginas ya abiertas pueden pedir sus assets)
+    keep = {build, current.get("build") if current else None}
+    for child in out.iterdir():
+        if child.is_dir() and child.name not in keep:
+            shutil.rmtree(child, ignore_errors=True)
+
+    logger.info(f"✅ Frontend construido: {len(files)} archivos en {root}")
+    return manifest
+
+
+def _accepted_encodings(header: str) -> Set[str]:
+    """Codificaciones de Accept-Encoding con q > 0"""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles que sirve el build (hash + .br/.gz) y cae al frontend original si no existe
+
+    Rutas publicadas con hash -> immutable; rutas lógicas (index.html o un
+    asset pedido por su nombre original) -> no-cache + ETag por contenido.
+    Sin build, sirve el directorio original con no-cache (revalidación con
+    el ETag de StaticFiles).
+    """
+
+    def __init__(self, directory: str, build_dir: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.source_dir = Path(directory)
+        self.build_dir = Path(build_dir)
+        self._routes: Dict[str, Dict] = {}
+        self._root: Optional[Path] = None
+        self.reload()
+
+    def build(self, force: bool = False) -> Dict:
+        manifest = build_assets(self.source_dir, self.build_dir, force=force)
+        self._load(manifest)
+        return manifest
+
+    def reload(self):
+        manifest = load_manifest(self.build_dir)
+        if manifest is not None:
+            self._load(manifest)
+
+    def _load(self, manifest: Dict):
+        routes = {}
+        for rel, entry in manifest["files"].items():
+            routes[rel] = {**entry, "logical": rel, "cache": REVALIDATE_CACHE}
+            if entry["immutable"]:
+                routes[entry["path"]] = {**entry, "logical": rel, "cache": IMMUTABLE_CACHE}
+        self._root = self.build_dir / manifest["build"]
+        self._routes = routes
+
+    def stats(self) -> Dict:
+        return {"build": self._root.name if self._root else None, "files": len(self._routes)}
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        entry = self._routes.get(path.replace(os.sep, "/"))
+        if entry is None or scope["method"] not in ("GET", "HEAD"):
+            response = await super().get_response(path, scope)
+            response.headers.setdefault("cache-control", REVALIDATE_CACHE)
+            return response
+
+        request_headers = Headers(scope=scope)
+        accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+        encoding = next((e for e in ("br", "gzip") if e in entry["encodings"] and e in accepted), None)
+        file_path = self._root / (entry["encodings"][encoding] if encoding else entry["path"])
+        if not file_path.is_file():
+            # build borrado por otro worker: servir el original
+            return await super().get_response(entry["logical"], scope)
+
+        headers = {
+            "cache-control": entry["cache"],
+            # un ETag por representación: la variante comprimida es otro cuerpo
+            "etag": f'"{entry["etag"]}-{encoding}"' if encoding else f'"{entry["etag"]}"',
+        }
+        if entry["encodings"]:
+            headers["vary"] = "Accept-Encoding"
+        if encoding:
+            headers["content-encoding"] = encoding
+        media_type = mimetypes.guess_type(entry["logical"])[0] or "application/octet-stream"
+        response = FileResponse(file_path, headers=headers, media_type=media_type, stat_result=file_path.stat())
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frontend", default=str(Path(__file__).resolve().parents[3] / "frontend"))
+    parser.add_argument("--out", default=str(BACKEND_DIR / get_settings().STATIC_BUILD_DIR))
+    parser.add_argument("--force", action="store_true", help="reconstruir aunque no haya cambios")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    manifest = build_assets(Path(args.frontend), Path(args.out), force=args.force)
+    for rel, entry in sorted(manifest["files"].items()):
+        variants = " ".join(entry["encodings"])
+        print(f"{rel:<28} -> {entry['path']:<36} {entry['size']:>9} B {variants}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,120 @@
 # backend/app/main.py
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from pathlib import Path
+from contextlib import asynccontextmanager
+import asyncio
+import logging
 import os
+import time
 
 # Importar todos los routers
 from app.api import analyze, data, config_db, ai_recommendations
+from app.services.arcgis_service import arcgis_service
+from app.core.config import BACKEND_DIR, get_settings
+from app.core.database import db_pool
+from app.core import metrics
+from app.core.readiness import readiness
+from app.core.static_assets import PrecompressedStaticFiles
+from app.services.spatial_index import spatial_index
+from app.services.rule_engine import get_rule_engine
+from app.services.batch_analysis import shutdown_process_pool
+from app.services.route_jobs import route_jobs
+from app.services.zone_index import get_zone_index
+
+logger = logging.getLogger(__name__)
+
+
+def _open_database():
+    # Abrir el pool de PostgreSQL; si la BD no responde, se reintenta en el primer uso
+    db_pool.open()
+    # Preparar el índice espacial (PostGIS o STRtree en memoria)
+    spatial_index.initialize()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # Compilar la base de reglas del sistema experto una sola vez
+    await readiness.warm_up("rule_engine", get_rule_engine)
+    # Cargar los polígonos de zonas en el STRtree
+    await readiness.warm_up("zone_index", get_zone_index)
+    # Retomar los trabajos de rutas largas que quedaron pendientes
+    await readiness.warm_up("route_jobs", route_jobs.start)
+    # La BD remota no bloquea el arranque: /ready la muestra pendiente hasta conectar
+    db_task = readiness.start_background("database", _open_database)
+    # Clientes pesados (SDK de Cohere, caché SQLite) antes de la primera petición
+    if settings.STARTUP_WARMUP_CLIENTS:
+        await readiness.warm_up("cohere_client", ai_recommendations.get_cohere_client, required=False)
+        await readiness.warm_up("elevation_cache", lambda: arcgis_service.cache, required=False)
+    # Validar la key de ArcGIS (importa `arcgis` y llama a la red)
+    if settings.ARCGIS_VALIDATE_ON_STARTUP:
+        readiness.start_background("arcgis_gis", lambda: arcgis_service.gis)
+    # Regenerar el build del frontend (hash + .br/.gz) si cambió algún archivo
+    if settings.STATIC_BUILD_ON_STARTUP:
+        await readiness.warm_up("static_assets", frontend_static.build, required=False)
+    readiness.startup_complete(time.perf_counter() - started)
+    yield
+    if not db_task.done():
+        db_task.cancel()
+        await asyncio.gather(db_task, return_exceptions=True)
+    # Cerrar el pool HTTP compartido de ArcGIS
+    await arcgis_service.aclose()
+    await ai_recommendations.ai_jobs.shutdown()
+    await route_jobs.shutdown()
+    shutdown_process_pool()
+    db_pool.close()
+
+
+app = FastAPI(title="FTTH Analyzer", lifespan=lifespan)
+settings = get_settings()
+
+
+def _route_template(request: Request) -> str:
+    """Ruta con sus parámetros (/api/data/{data_id}) para no crear una serie por id"""
+    route = request.scope.get("route")
+    if route is None:
+        return "unmatched"
+    # FastAPI reciente deja en scope["route"] la ruta del APIRouter sin el prefijo de include_router
+    effective = (request.scope.get("fastapi") or {}).get("effective_route_context")
+    return getattr(effective, "path_format", None) or route.path
+
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """Latencia, conteo y tamaños por ruta; desglose por etapa en Server-Timing"""
+    spans, token = metrics.start_request_timing()
+    started = time.perf_counter()
+    status = 500
+    response = None
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.end_request_timing(spans, token)
+        route = _route_template(request)
+        method = request.method
+        metrics.http_requests.inc(method=method, route=route, status=str(status))
+        metrics.http_latency.observe(elapsed, method=method, route=route)
+        if request.headers.get("content-length", "").isdigit():
+            metrics.http_request_bytes.observe(int(request.headers["content-length"]), route=route)
+        if response is not None and response.headers.get("content-length", "").isdigit():
+            metrics.http_response_bytes.observe(int(response.headers["content-length"]), route=route)
+    if settings.METRICS_TIMING_HEADER or request.headers.get("x-debug-timing") == "1":
+        response.headers["Server-Timing"] = metrics.server_timing(spans, elapsed)
+    return response
+
+
+def _db_pool_gauges():
+    for key, value in db_pool.stats().items():
+        if isinstance(value, (int, float)):
+            yield f"ftth_db_pool_{key}", f"Pool de PostgreSQL: {key}", {}, value
+
+
+metrics.registry.add_collector(_db_pool_gauges)
 
-app = FastAPI(title="FTTH Analyzer")
 
 # Incluir todos los routers
 app.include_router(analyze.router, prefix="/api/analyze", tags=["analyze"])
@@ -23,18 +129,57 @@ if local_frontend.exists():
 else:
     frontend_dir = os.environ.get("FRONTEND_DIR", "/frontend")
 
-# Montamos los archivos estáticos en /frontend
-app.mount("/frontend", StaticFiles(directory=frontend_dir), name="frontend")
+# Montamos los archivos estáticos en /frontend (build precomprimido si existe)
+frontend_static = PrecompressedStaticFiles(directory=frontend_dir, build_dir=str(BACKEND_DIR / settings.STATIC_BUILD_DIR))
+app.mount("/frontend", frontend_static, name="frontend")
 
-# Servir index.html en la raíz
+# Servir index.html en la raíz (con ETag: las recargas responden 304)
 @app.get("/", include_in_schema=False)
-def serve_index():
-    index_path = Path(frontend_dir) / "index.html"
-    if index_path.exists():
-        return FileResponse(str(index_path))
-    return JSONResponse({"error": "index.html not found"}, status_code=404)
+async def serve_index(request: Request):
+    try:
+        return await frontend_static.get_response("index.html", request.scope)
+    except StarletteHTTPException:
+        return JSONResponse({"error": "index.html not found"}, status_code=404)
 
 # Health check
 @app.get("/health")
 def health():
-    return {"ok": True, "status": "alive"}
\ No newline at end of file
+    return {"ok": True, "status": "alive"}
+
+# Preparación: componentes inicializados (503 mientras falte alguno requerido)
+@app.get("/ready")
+def ready():
+    report = readiness.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+# Métricas del pool de conexiones
+@app.get("/health/db")
+def health_db():
+    return db_pool.stats()
+
+# Métricas en formato Prometheus
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+# Profiler por muestreo (solo con PROFILER_ENABLED)
+def _require_profiler():
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@app.post("/debug/profiler/start", include_in_schema=False)
+def profiler_start(interval_ms: float = Query(5.0, gt=0, le=1000)):
+    _require_profiler()
+    started = metrics.profiler.start(interval_ms / 1000)
+    return {"started": started, **metrics.profiler.report(top=0)}
+
+@app.post("/debug/profiler/stop", include_in_schema=False)
+def profiler_stop(top: int = Query(50, ge=1, le=1000)):
+    _require_profiler()
+    metrics.profiler.stop()
+    return metrics.profiler.report(top=top)
+
+@app.get("/debug/profiler", include_in_schema=False)
+def profiler_report(top: int = Query(50, ge=1, le=1000)):
+    _require_profiler()
+    return metrics.profiler.report(top=top)
\ No newline at end of file
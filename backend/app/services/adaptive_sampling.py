@@ -0,0 +1,114 @@
+# backend/app/services/adaptive_sampling.py
+import logging
+import math
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.services.route_sampling import (
+    cumulative_distances,
+    interpolate_at,
+    project_coords_to_3857,
+    reproject_coords_to_latlon,
+    simplify_coords,
+)
+from app.services.terrain_features import extract_terrain_features
+
+logger = logging.getLogger(__name__)
+
+
+async def _lookup(elevation_service, xy: np.ndarray) -> np.ndarray:
+    """Una sola llamada (en lotes) al proveedor de elevación para todas las posiciones nuevas"""
+    lat, lon = reproject_coords_to_latlon(xy)
+    profile = await elevation_service.get_elevation_profile(list(zip(lat.tolist(), lon.tolist())), with_stats=False)
+    z = profile.get("elevations") or []
+    if len(z) != len(xy):
+        return np.full(len(xy), np.nan)
+    return np.array([np.nan if e is None else e for e in z], dtype=float)
+
+
+async def adaptive_elevation_profile(
+    coords,
+    step_m: float,
+    tolerance_m: float,
+    elevation_service,
+    coarse_factor: int = 8,
+    max_rounds: int = 8,
+) -> Dict[str, Any]:
+    """Perfil de elevación con muestreo adaptativo acotado por error
+
+    1. Simplifica la línea con Douglas-Peucker (tolerancia horizontal =
+       tolerance_m); los vértices que quedan son los cambios de dirección.
+    2. Pasada gruesa: una muestra cada step_m * coarse_factor más cada vértice.
+    3. Refinamiento: en cada ronda se consulta el punto medio de los
+       intervalos no verificados más largos que step_m. Si su elevación se
+       aparta más de tolerance_m de la interpolación lineal, ambas mitades
+       siguen sin verificar; si no, el intervalo queda aceptado.
+
+    Cada ronda es una sola llamada en lotes al proveedor. Devuelve las
+    muestras ordenadas por distancia y cuántas consultas se ahorraron frente
+    al muestreo uniforme cada step_m.
+    """
+    xy = project_coords_to_3857(coords)
+    full_length = float(cumulative_distances(xy)[-1]) if len(xy) > 1 else 0.0
+    n_uniform = max(2, int(math.ceil(full_length / step_m)) + 1) if full_length > 0 else 0
+
+    line = simplify_coords(xy, tolerance_m)
+    cum = cumulative_distances(line)
+    length = float(cum[-1]) if len(cum) else 0.0
+    if length == 0:
+        return {"samples": [], "stats": {"original_length_m": round(full_length, 2), "n_samples": 0, "n_uniform": n_uniform}}
+
+    coarse_step = step_m * max(coarse_factor, 1)
+    dists = np.unique(np.concatenate((np.arange(0.0, length, coarse_step), cum, [length])))
+    z = await _lookup(elevation_service, interpolate_at(line, cum, dists))
+    # intervalos [i, i+1] pendientes de verificar, como índices sobre dists
+    unverified = np.ones(len(dists) - 1, dtype=bool)
+    rounds = 0
+
+    while True:
+        todo = np.flatnonzero(unverified & (np.diff(dists) > step_m))
+        if not len(todo) or rounds >= max_rounds:
+            break
+        rounds += 1
+        mid = (dists[todo] + dists[todo + 1]) / 2
+        z_mid = await _lookup(elevation_service, interpolate_at(line, cum, mid))
+        linear = (z[todo] + z[todo + 1]) / 2
+        # sin elevación (lote fallido) no hay evidencia para seguir refinando
+        bad = np.isfinite(z_mid) & np.isfinite(linear) & (np.abs(z_mid - linear) > tolerance_m)
+
+        # insertar los puntos medios; cada intervalo se parte en dos mitades con la misma marca
+        dists = np.insert(dists, todo + 1, mid)
+        z = np.insert(z, todo + 1, z_mid)
+        split = unverified.copy()
+        split[todo] = bad
+        repeats = np.ones(len(split), dtype=int)
+        repeats[todo] = 2
+        unverified = np.repeat(split, repeats)
+
+    samples_xy = interpolate_at(line, cum, dists)
+    lat, lon = reproject_coords_to_latlon(samples_xy)
+    terrain = extract_terrain_features(lat, lon, z)
+    saved = max(n_uniform - len(dists), 0)
+    logger.info(f"Muestreo adaptativo: {len(dists)} puntos vs {n_uniform} uniformes ({rounds} rondas)")
+
+    samples: List[Dict[str, Any]] = [
+        {"lat": round(la, 6), "lon": round(lo, 6), "dist_m": round(d, 2), "elevation": None if not np.isfinite(e) else round(e, 2)}
+        for la, lo, d, e in zip(lat.tolist(), lon.tolist(), dists.tolist(), z.tolist())
+    ]
+    return {
+        "samples": samples,
+        "statistics": terrain.summary(),
+        "stats": {
+            "original_length_m": round(full_length, 2),
+            "original_vertices": int(len(xy)),
+            "simplified_vertices": int(len(line)),
+            "n_samples": int(len(dists)),
+            "n_uniform": n_uniform,
+            "saved_points": saved,
+            "saved_pct": round(100.0 * saved / n_uniform, 1) if n_uniform else 0.0,
+            "rounds": rounds,
+            # intervalos que quedaron sin verificar por alcanzar max_rounds
+            "unverified_intervals": int(len(todo)),
+        },
+    }
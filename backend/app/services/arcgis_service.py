@@ -1,100 +1,295 @@
 # backend/app/services/arcgis_service.py
-from arcgis.gis import GIS
 import httpx
 import asyncio
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 import numpy as np
 import logging
 import json
-from app.core.config import get_settings
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import BACKEND_DIR, get_settings
+from app.core.metrics import timed
+from app.core.readiness import readiness
+from app.services.elevation_cache import ElevationCache
+from app.services.elevation_coalescer import ElevationCoalescer
+from app.services.terrain_features import extract_terrain_features
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Códigos HTTP que vale la pena reintentar (límite de tasa y errores del servidor)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class ElevationBatchError(Exception):
+    """Error definitivo al obtener un lote de elevaciones"""
+    def __init__(self, message: str, status_code: Optional[int] = None, attempts: int = 0):
+        super().__init__(message)
+        self.status_code = status_code
+        self.attempts = attempts
+
+
 class ArcGISService:
     def __init__(self):
-        # Configurar URL de la nueva API (PaaS)
-        self.elevation_url = "https://elevation-api.arcgis.com/arcgis/rest/services/elevation-service/v1/elevation/at-many-points"
-        
-        # Inicializar GIS solo para validar la key (opcional)
-        if settings.ARCGIS_API_KEY:
+        # Configurar URL de la nueva API (PaaS); configurable para apuntar a un servidor local en benchmarks
+        self.elevation_url = settings.ARCGIS_ELEVATION_URL
+        self.batch_size = settings.ARCGIS_BATCH_SIZE
+        self.max_concurrency = max(1, settings.ARCGIS_MAX_CONCURRENCY)
+        self.max_retries = max(0, settings.ARCGIS_MAX_RETRIES)
+        self.retry_backoff = settings.ARCGIS_RETRY_BACKOFF_S
+        self.max_retry_after = settings.ARCGIS_MAX_RETRY_AFTER_S
+
+        # Cliente HTTP compartido (pool de conexiones keep-alive), se crea al primer uso
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # Peticiones concurrentes comparten lotes (y puntos repetidos) hacia ArcGIS
+        self.coalescer: Optional[ElevationCoalescer] = None
+        if settings.ELEVATION_COALESCE_ENABLED:
+            self.coalescer = ElevationCoalescer(
+                self._fetch_batch,
+                batch_size=self.batch_size,
+                window_s=settings.ELEVATION_COALESCE_WINDOW_MS / 1000,
+                precision=settings.ELEVATION_CACHE_PRECISION,
+            )
+
+        # Caché en disco y GIS se crean al primer uso (o en el warm-up del arranque):
+        # importar el módulo no abre archivos ni toca la red
+        self._cache: Optional[ElevationCache] = None
+        self._cache_loaded = False
+        self._gis = None
+        self._gis_loaded = False
+        readiness.declare("elevation_cache", lazy=True)
+        readiness.declare("arcgis_gis", lazy=True)
+
+    @property
+    def cache(self) -> Optional[ElevationCache]:
+        """Caché local en disco (SQLite) para no volver a pedir calles ya consultadas"""
+        if not self._cache_loaded:
+            self._cache_loaded = True
+            if settings.ELEVATION_CACHE_ENABLED:
+                try:
+                    with readiness.track("elevation_cache"):
+                        self._cache = ElevationCache(
+                            str(BACKEND_DIR / settings.ELEVATION_CACHE_PATH),
+                            precision=settings.ELEVATION_CACHE_PRECISION,
+                            max_entries=settings.ELEVATION_CACHE_MAX_ENTRIES,
+                            ttl_s=settings.ELEVATION_CACHE_TTL_S,
+                        )
+                except Exception as e:
+                    logger.warning(f"⚠️ Caché de elevación deshabilitada: {e}")
+        return self._cache
+
+    @property
+    def gis(self):
+        """GIS de ArcGIS solo para validar la key (opcional); importa `arcgis` y llama a la red"""
+        if not self._gis_loaded:
+            self._gis_loaded = True
+            if settings.ARCGIS_API_KEY:
+                try:
+                    with readiness.track("arcgis_gis"):
+                        from arcgis.gis import GIS
+                        self._gis = GIS(api_key=settings.ARCGIS_API_KEY)
+                    logger.info("✅ ArcGIS GIS inicializado")
+                except Exception as e:
+                    logger.warning(f"⚠️ Error iniciando GIS: {e}")
+        return self._gis
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=settings.ARCGIS_TIMEOUT_S,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+        return self._client
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def aclose(self):
+        """Cerrar el cliente HTTP compartido (apagado de la app)"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        # Respetar Retry-After si la API lo envía (acotado: un valor enorme no debe colgar la
+        # petición), si no backoff exponencial; valores negativos o no numéricos se ignoran
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    delay = float(retry_after)
+                except ValueError:
+                    delay = None
+                if delay is not None and 0 <= delay < float("inf"):
+                    return min(delay, self.max_retry_after)
+        return self.retry_backoff * (2 ** attempt)
+
+    @timed("arcgis.batch")
+    async def _fetch_batch(self, batch: List[Tuple[float, float]]) -> List[float]:
+        """Pedir un lote de puntos con reintentos; lanza ElevationBatchError si falla"""
+        # ArcGIS pide orden: [Longitud, Latitud] -> [x, y]
+        # Tus coordenadas vienen como [Lat, Lon] -> [y, x]
+        points_json = {
+            "points": [{"x": lon, "y": lat, "spatialReference": {"wkid": 4326}} for lat, lon in batch]
+        }
+
+        params = {
+            "f": "json",
+            "token": settings.ARCGIS_API_KEY, # TU API KEY DE SIEMPRE
+            "geometry": json.dumps(points_json),
+            "geometryType": "esriGeometryMultipoint"
+        }
+
+        client = self._get_client()
+        last_error = "sin respuesta"
+        last_status = None
+
+        for attempt in range(self.max_retries + 1):
+            response = None
             try:
-                self.gis = GIS(api_key=settings.ARCGIS_API_KEY)
-                logger.info("✅ ArcGIS GIS inicializado")
-            except Exception as e:
-                logger.warning(f"⚠️ Error iniciando GIS: {e}")
-        else:
-            self.gis = None
+                async with self._get_semaphore():
+                    response = await client.post(self.elevation_url, data=params)
+            except httpx.TransportError as e:
+                last_error = f"Error conexión: {e}"
+                last_status = None
+            else:
+                last_status = response.status_code
+                if response.status_code == 200:
+                    data = response.json()
+                    # La nueva API devuelve 'result' -> 'points' -> 'z'
+                    if "result" in data and "points" in data["result"]:
+                        z_values = [p.get("z", 0) for p in data["result"]["points"]]
+                        if len(z_values) != len(batch):
+                            raise ElevationBatchError(
+                                f"ArcGIS devolvió {len(z_values)} puntos para un lote de {len(batch)}",
+                                status_code=200, attempts=attempt + 1)
+                        return z_values
+                    error = data.get("error", {}) if isinstance(data, dict) else {}
+                    raise ElevationBatchError(
+                        f"Respuesta inesperada de ArcGIS: {error.get('message', 'sin campo result')}",
+                        status_code=error.get("code", 200), attempts=attempt + 1)
+                last_error = f"Error HTTP ArcGIS: {response.status_code}"
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise ElevationBatchError(last_error, status_code=last_status, attempts=attempt + 1)
+
+            if attempt < self.max_retries:
+                delay = self._retry_delay(attempt, response)
+                logger.warning(f"{last_error} - reintento {attempt + 1}/{self.max_retries} en {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+        raise ElevationBatchError(last_error, status_code=last_status, attempts=self.max_retries + 1)
+
+    async def _fetch_points(self, points: List[Tuple[float, float]]):
+        """Enviar puntos upstream en lotes concurrentes; devuelve (elevaciones, lotes fallidos)"""
+        # Procesar en lotes de 150 puntos para no saturar la API; los lotes
+        # se envían en paralelo (limitados por el semáforo) y se reordenan al final
+        batch_size = self.batch_size
+        starts = list(range(0, len(points), batch_size))
+        results = await asyncio.gather(
+            *(self._fetch_batch(points[i:i+batch_size]) for i in starts),
+            return_exceptions=True,
+        )
+
+        elevations: List[Optional[float]] = [None] * len(points)
+        failed_batches = []
+        for batch_index, (start, result) in enumerate(zip(starts, results)):
+            end = min(start + batch_size, len(points))
+            if isinstance(result, BaseException):
+                logger.error(f"Lote {batch_index} ({start}-{end}) falló: {result}")
+                failed_batches.append({
+                    "batch": batch_index,
+                    # índices en `points`; get_elevation_profile los traduce a los del llamador
+                    "indices": list(range(start, end)),
+                    "error": str(result),
+                    "status_code": getattr(result, "status_code", None),
+                    "attempts": getattr(result, "attempts", None),
+                })
+                continue
+            elevations[start:end] = result
+        return elevations, failed_batches
 
-    async def get_elevation_profile(self, coordinates: List[Tuple[float, float]]) -> Dict:
+    async def get_elevation_profile(self, coordinates: List[Tuple[float, float]], with_stats: bool = True) -> Dict:
         if not coordinates:
             return {"success": False, "elevations": []}
 
-        # Procesar en lotes de 150 puntos para no saturar la API
-        batch_size = 150
-        all_elevations = []
-        
-        for i in range(0, len(coordinates), batch_size):
-            batch = coordinates[i:i+batch_size]
-            
-            # ArcGIS pide orden: [Longitud, Latitud] -> [x, y]
-            # Tus coordenadas vienen como [Lat, Lon] -> [y, x]
-            points_json = {
-                "points": [{"x": lon, "y": lat, "spatialReference": {"wkid": 4326}} for lat, lon in batch]
-            }
-
-            params = {
-                "f": "json",
-                "token": settings.ARCGIS_API_KEY, # TU API KEY DE SIEMPRE
-                "geometry": json.dumps(points_json),
-                "geometryType": "esriGeometryMultipoint"
-            }
+        # 1) Resolver lo que ya está en la caché local (SQLite: fuera del event loop)
+        cache = self.cache if self._cache_loaded else await run_in_threadpool(lambda: self.cache)
+        if cache is not None:
+            all_elevations = await run_in_threadpool(cache.get_many, coordinates)
+        else:
+            all_elevations = [None] * len(coordinates)
 
-            try:
-                # Llamada directa a la NUEVA API
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.post(self.elevation_url, data=params)
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        # La nueva API devuelve 'result' -> 'points' -> 'z'
-                        if "result" in data and "points" in data["result"]:
-                            z_values = [p.get("z", 0) for p in data["result"]["points"]]
-                            all_elevations.extend(z_values)
-                        else:
-                            # Intento alternativo de estructura
-                            all_elevations.extend([0] * len(batch))
-                    else:
-                        logger.error(f"Error HTTP ArcGIS: {response.status_code}")
-                        all_elevations.extend([0] * len(batch))
-
-            except Exception as e:
-                logger.error(f"Error conexión: {e}")
-                all_elevations.extend([0] * len(batch))
-
-        # Calcular estadísticas
-        stats = self._calculate_stats(all_elevations, coordinates)
+        # 2) Solo los fallos de caché van upstream, una vez por clave cuantizada
+        pending: Dict[Tuple, List[int]] = {}
+        for i, z in enumerate(all_elevations):
+            if z is None:
+                lat, lon = coordinates[i]
+                key = cache.key(lat, lon) if cache is not None else (lat, lon)
+                pending.setdefault(key, []).append(i)
+        groups = list(pending.values())
+        upstream_points = [coordinates[idx[0]] for idx in groups]
+
+        failed_batches = []
+        fetched = []
+        if upstream_points:
+            if self.coalescer is not None:
+                fetched, failed = await self.coalescer.fetch(upstream_points)
+            else:
+                fetched, failed = await self._fetch_points(upstream_points)
+            # ambas rutas dan índices sobre upstream_points: se pasan a los del llamador
+            failed_batches = self._caller_failures(failed, groups)
+            for indices, z in zip(groups, fetched):
+                for i in indices:
+                    all_elevations[i] = z
+            if cache is not None:
+                await run_in_threadpool(cache.put_many, upstream_points, fetched)
+
+        # Calcular estadísticas (quien procesa el perfil por su cuenta puede omitirlas)
+        stats = self._calculate_stats(all_elevations, coordinates) if with_stats else {}
         return {
-            "success": True, 
+            # éxito parcial si al menos un lote respondió; los fallidos se listan aparte
+            "success": not failed_batches or any(z is not None for z in fetched),
             "elevations": all_elevations,
-            "statistics": stats
+            "statistics": stats,
+            "failed_batches": failed_batches,
+            "cache": {
+                "hits": len(coordinates) - sum(len(v) for v in groups),
+                "upstream_points": len(upstream_points),
+            },
         }
 
+    @staticmethod
+    def _caller_failures(failed: List[Dict], groups: List[List[int]]) -> List[Dict]:
+        """Pasar los índices de los lotes fallidos (puntos únicos enviados) a índices de `coordinates`"""
+        return [
+            {**entry, "indices": sorted(i for u in entry["indices"] for i in groups[u])}
+            for entry in failed
+        ]
+
     def _calculate_stats(self, elevations, coords):
-        # Cálculo básico para evitar errores si la lista está vacía
-        if not elevations: return {}
-        return {
-            "elevacion_promedio": round(np.mean(elevations), 2),
-            "elevacion_max": round(max(elevations), 2),
-            "desnivel_total": round(max(elevations) - min(elevations), 2)
-        }
+        # Los puntos de lotes fallidos vienen como None: no cuentan en las
+        # estadísticas y se interpolan por distancia para las pendientes
+        if all(e is None for e in elevations): return {}
+        lat, lon = np.asarray(coords, dtype=float).reshape(-1, 2).T
+        return extract_terrain_features(lat, lon, elevations).summary()
 
     # ESTA ES LA FUNCIÓN QUE TE FALTABA
     def test_connection(self):
         return {
-            "connected": True, 
+            "connected": True,
             "api_url": self.elevation_url,
-            "has_key": bool(settings.ARCGIS_API_KEY)
+            "has_key": bool(settings.ARCGIS_API_KEY),
+            "batch_size": self.batch_size,
+            "max_concurrency": self.max_concurrency,
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "coalescer": self.coalescer.stats() if self.coalescer is not None else None,
+            "gis_initialized": self._gis is not None,
         }
 
-arcgis_service = ArcGISService()
\ No newline at end of file
+arcgis_service = ArcGISService()
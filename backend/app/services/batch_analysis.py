@@ -0,0 +1,214 @@
+# backend/app/services/batch_analysis.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from shapely.geometry import shape
+
+from app.core.config import get_settings
+from app.services.route_sampling import sample_route_lonlat
+from app.services.terrain_features import extract_terrain_features, geodesic_segment_lengths
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def pool_size() -> int:
+    return settings.BATCH_PROCESS_WORKERS or os.cpu_count() or 1
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Pool de procesos compartido (se crea en el primer uso y se cierra en el shutdown)"""
+    global _pool
+    if _pool is None:
+        # spawn: el proceso ya tiene hilos (event loop, threadpool de FastAPI) y hacer fork
+        # con hilos vivos puede heredar locks tomados y colgar a los workers
+        _pool = ProcessPoolExecutor(max_workers=pool_size(), mp_context=multiprocessing.get_context("spawn"))
+        logger.info(f"✅ Pool de procesos para análisis por lotes: {pool_size()} workers")
+    return _pool
+
+
+def shutdown_process_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def split_routes(geojson: Dict) -> List[Tuple[Optional[Any], Any]]:
+    """Separar la entrada en (id, coordenadas) por ruta, en el orden recibido
+
+    Acepta MultiLineString, FeatureCollection (features LineString o
+    MultiLineString, cada parte es una ruta) o un LineString suelto. Las
+    entradas inválidas se devuelven como (id, Exception) para reportarlas
+    sin abortar el lote.
+    """
+    if geojson.get("type") == "FeatureCollection":
+        items = [_feature_item(f) for f in geojson.get("features") or []]
+    elif geojson.get("type") == "Feature":
+        items = [(geojson.get("id"), geojson.get("geometry"))]
+    else:
+        items = [(None, geojson)]
+
+    routes: List[Tuple[Optional[Any], Any]] = []
+    for route_id, geometry in items:
+        if isinstance(geometry, Exception):
+            routes.append((route_id, geometry))
+            continue
+        try:
+            geom = shape(geometry)
+        except Exception as e:
+            routes.append((route_id, ValueError(f"GeoJSON inválido: {e}")))
+            continue
+        if geom.geom_type == "LineString":
+            routes.append((route_id, list(geom.coords)))
+        elif geom.geom_type == "MultiLineString":
+            routes.extend((route_id, list(part.coords)) for part in geom.geoms)
+        else:
+            routes.append((route_id, ValueError(f"Geometría no soportada: {geom.geom_type}")))
+    return routes
+
+
+def _feature_item(feature: Any) -> Tuple[Optional[Any], Any]:
+    if not isinstance(feature, dict):
+        return None, ValueError(f"Feature inválida: se esperaba un objeto, llegó {type(feature).__name__}")
+    properties = feature.get("properties")
+    route_id = feature.get("id", properties.get("id") if isinstance(properties, dict) else None)
+    return route_id, feature.get("geometry")
+
+
+# --- trabajo CPU: se ejecuta dentro de los procesos del pool ---
+
+def _sample_chunk(chunk: List[Tuple[int, Any]], step_m: float) -> List[Tuple[int, Dict]]:
+    """Proyectar y muestrear un grupo de rutas (un envío al pool por grupo, no por ruta)"""
+    out = []
+    for index, coords in chunk:
+        try:
+            length, _, lat, lon = sample_route_lonlat(coords, step_m)
+            out.append((index, {"length_m": length, "lat": lat, "lon": lon}))
+        except Exception as e:
+            out.append((index, {"error": str(e)}))
+    return out
+
+
+def _features_chunk(chunk: List[Tuple[int, np.ndarray, np.ndarray, Optional[List]]]) -> List[Tuple[int, Dict]]:
+    out = []
+    for index, lat, lon, elevations in chunk:
+        seg_len = geodesic_segment_lengths(lat, lon)
+        if elevations is None:
+            out.append((index, {"longitud_m": round(float(seg_len.sum()), 2)}))
+        else:
+            out.append((index, extract_terrain_features(lat, lon, elevations, seg_len_m=seg_len).summary()))
+    return out
+
+
+def _chunks(items: List, n_chunks: int) -> List[List]:
+    size = max(1, -(-len(items) // max(n_chunks, 1)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+async def _run_chunks(fn, chunks: List[List], *args) -> Dict[int, Dict]:
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    done = await asyncio.gather(*(loop.run_in_executor(pool, fn, chunk, *args) for chunk in chunks))
+    return {index: result for part in done for index, result in part}
+
+
+async def analyze_batch(geojson: Dict, step_m: float, elevation_service=None) -> Dict[str, Any]:
+    """Analizar muchas rutas: muestreo y features en el pool de procesos, elevación con tareas async
+
+    Devuelve un resultado por ruta en el orden de entrada y un resumen agregado.
+    """
+    timing: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    routes = split_routes(geojson)
+    if len(routes) > settings.BATCH_MAX_ROUTES:
+        raise ValueError(f"Máximo {settings.BATCH_MAX_ROUTES} rutas por lote (recibidas {len(routes)})")
+
+    results: List[Dict[str, Any]] = [{"index": i, "id": rid} for i, (rid, _) in enumerate(routes)]
+    valid = []
+    for i, (_, coords) in enumerate(routes):
+        if isinstance(coords, Exception):
+            results[i]["error"] = str(coords)
+        else:
+            valid.append((i, coords))
+
+    # 1) proyección + muestreo (CPU) repartido en ~4 grupos por worker para balancear carga
+    n_chunks = pool_size() * 4
+    sampled = await _run_chunks(_sample_chunk, _chunks(valid, n_chunks), step_m) if valid else {}
+    timing["sampling_ms"] = round(1000 * (time.perf_counter() - t0), 1)
+
+    ok = []
+    for i, res in sampled.items():
+        if "error" in res:
+            results[i]["error"] = res["error"]
+        else:
+            results[i]["n_samples"] = len(res["lat"])
+            ok.append(i)
+    ok.sort()
+
+    # 2) elevación (I/O): todas las rutas en paralelo; el proveedor limita la concurrencia real
+    t1 = time.perf_counter()
+    elevations: Dict[int, Optional[List]] = {i: None for i in ok}
+    if elevation_service is not None and ok:
+        profiles = await asyncio.gather(
+            *(elevation_service.get_elevation_profile(
+                list(zip(sampled[i]["lat"].tolist(), sampled[i]["lon"].tolist())), with_stats=False)
+              for i in ok),
+            return_exceptions=True,
+        )
+        for i, profile in zip(ok, profiles):
+            if isinstance(profile, BaseException):
+                results[i]["elevation_error"] = str(profile)
+            else:
+                elevations[i] = profile.get("elevations")
+                if profile.get("failed_batches"):
+                    results[i]["failed_batches"] = len(profile["failed_batches"])
+    timing["elevation_ms"] = round(1000 * (time.perf_counter() - t1), 1)
+
+    # 3) features del terreno (CPU) de vuelta en el pool
+    t2 = time.perf_counter()
+    jobs = [(i, sampled[i]["lat"], sampled[i]["lon"], elevations[i]) for i in ok]
+    features = await _run_chunks(_features_chunk, _chunks(jobs, n_chunks)) if jobs else {}
+    for i, summary in features.items():
+        results[i]["statistics"] = summary
+    timing["features_ms"] = round(1000 * (time.perf_counter() - t2), 1)
+    timing["total_ms"] = round(1000 * (time.perf_counter() - t0), 1)
+
+    return {
+        "n_routes": len(routes),
+        "results": results,
+        "summary": _aggregate(results),
+        "workers": pool_size(),
+        "timing": timing,
+    }
+
+
+def _aggregate(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    stats = [r["statistics"] for r in results if "statistics" in r]
+    lengths = np.array([s.get("longitud_m", 0.0) for s in stats], dtype=float)
+    summary: Dict[str, Any] = {
+        "analyzed": len(stats),
+        "failed": sum(1 for r in results if "error" in r),
+        "total_length_m": round(float(lengths.sum()), 2),
+        "total_samples": int(sum(r.get("n_samples", 0) for r in results)),
+    }
+    with_slope = [(s["pendiente_promedio"], s["longitud_m"]) for s in stats if "pendiente_promedio" in s]
+    if with_slope:
+        slope, weight = np.array(with_slope, dtype=float).T
+        steepest = max((r for r in results if "pendiente_promedio" in r.get("statistics", {})),
+                       key=lambda r: r["statistics"]["pendiente_promedio"])
+        summary.update({
+            "pendiente_promedio": round(float((slope * weight).sum() / weight.sum()), 2) if weight.sum() > 0 else 0.0,
+            "desnivel_max": round(max(s["desnivel_total"] for s in stats if "desnivel_total" in s), 2),
+            "ruta_mas_empinada": {"index": steepest["index"], "id": steepest["id"],
+                                  "pendiente_promedio": steepest["statistics"]["pendiente_promedio"]},
+        })
+    return summary
@@ -0,0 +1,193 @@
+# backend/app/services/compact_response.py
+import gzip
+import json
+import logging
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from app.core.static_assets import _accepted_encodings
+
+logger = logging.getLogger(__name__)
+
+try:  # brotli es opcional: sin él se comprime con gzip
+    import brotli
+except ImportError:
+    brotli = None
+
+SAMPLE_FORMATS = ("columnar", "polyline", "delta")
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Respuestas más chicas no compensan el costo de comprimir
+COMPRESS_MIN_BYTES = 1024
+# Desde este tamaño la compresión va al threadpool (solo en endpoints async)
+COMPRESS_THREADPOOL_BYTES = 64 * 1024
+
+
+def encode_polyline(lat, lon, precision: int = 5) -> str:
+    """Encoded Polyline (algoritmo de Google) de una secuencia lat/lon
+
+    Los deltas enteros se calculan con NumPy; solo la emisión de caracteres
+    (5 bits por carácter) recorre los valores.
+    """
+    scale = 10 ** precision
+    pts = np.round(np.column_stack((lat, lon)) * scale).astype(np.int64)
+    deltas = np.diff(pts, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).reshape(-1)
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1).tolist()
+    out = []
+    for v in values:
+        while v >= 0x20:
+            out.append(chr((0x20 | (v & 0x1F)) + 63))
+            v >>= 5
+        out.append(chr(v + 63))
+    return "".join(out)
+
+
+def delta_encode(values, scale: float) -> list:
+    """Primer valor entero escalado seguido de las diferencias con el anterior"""
+    ints = np.round(np.asarray(values, dtype=float) * scale).astype(np.int64)
+    return np.diff(ints, prepend=0).tolist() if len(ints) else []
+
+
+def _elevation_column(elevation) -> Optional[list]:
+    if elevation is None:
+        return None
+    z = np.asarray([np.nan if e is None else e for e in elevation], dtype=float)
+    return [None if not np.isfinite(v) else round(v, 2) for v in z.tolist()]
+
+
+def compact_samples(lat, lon, elevation=None, fmt: str = "columnar") -> Dict[str, Any]:
+    """Muestras como columnas en lugar de un objeto {lat, lon} por punto
+
+    - columnar: arreglos lat/lon (6 decimales ≈ 0.1 m)
+    - polyline: Encoded Polyline con precisión 1e-6
+    - delta: enteros en micro-grados codificados como diferencias
+    La elevación (si la hay) va siempre como columna en metros con 2 decimales.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    out: Dict[str, Any] = {"format": fmt, "n": int(len(lat))}
+    if fmt == "columnar":
+        out["lat"] = np.round(lat, 6).tolist()
+        out["lon"] = np.round(lon, 6).tolist()
+    elif fmt == "polyline":
+        out["precision"] = 6
+        out["polyline"] = encode_polyline(lat, lon, precision=6)
+    elif fmt == "delta":
+        out["scale"] = 1_000_000
+        out["lat"] = delta_encode(lat, 1e6)
+        out["lon"] = delta_encode(lon, 1e6)
+    else:
+        raise ValueError(f"Formato de muestras no soportado: {fmt}")
+    elevation = _elevation_column(elevation)
+    if elevation is not None:
+        out["elevation"] = elevation
+    return out
+
+
+def negotiate(request: Request, fmt: Optional[str] = None, encoding: Optional[str] = None):
+    """(formato de muestras, codificación) pedidos por query param o cabecera Accept
+
+    Devuelve formato None cuando el cliente no pidió nada: se mantiene la
+    respuesta JSON de siempre.
+    """
+    accept = request.headers.get("accept", "").lower()
+    if encoding is None:
+        encoding = "msgpack" if any(t in accept for t in MSGPACK_TYPES) else "json"
+    if encoding not in ("json", "msgpack"):
+        raise HTTPException(status_code=400, detail="encoding debe ser 'json' o 'msgpack'")
+    if fmt is not None and fmt not in SAMPLE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format debe ser uno de {', '.join(SAMPLE_FORMATS)}")
+    if fmt is None and encoding == "msgpack":
+        fmt = "columnar"
+    return fmt, encoding
+
+
+def wants_compact(request: Request, fmt: Optional[str] = None, encoding: Optional[str] = None) -> bool:
+    return negotiate(request, fmt, encoding)[0] is not None
+
+
+def _serialize(request: Request, payload: Dict[str, Any], encoding: str):
+    """(cuerpo, media type, Content-Encoding a aplicar o None)"""
+    if encoding == "msgpack":
+        try:
+            import msgpack
+        except ImportError:
+            raise HTTPException(status_code=406, detail="msgpack no está instalado en el servidor")
+        body = msgpack.packb(jsonable_encoder(payload), use_bin_type=True)
+        media_type = "application/msgpack"
+    else:
+        body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+        media_type = "application/json"
+
+    # mismo criterio que los estáticos: "br;q=0" o "gzip;q=0" significan no aceptado
+    accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    content_encoding = None
+    if len(body) >= COMPRESS_MIN_BYTES:
+        if brotli is not None and "br" in accepted:
+            content_encoding = "br"
+        elif "gzip" in accepted:
+            content_encoding = "gzip"
+    return body, media_type, content_encoding
+
+
+def _compress(body: bytes, content_encoding: str) -> bytes:
+    if content_encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def _response(body: bytes, media_type: str, content_encoding: Optional[str]) -> Response:
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if content_encoding is not None:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def render(request: Request, payload: Dict[str, Any], encoding: str = "json") -> Response:
+    """Serializar (JSON compacto o msgpack) y comprimir con brotli/gzip si el cliente lo acepta
+
+    Para endpoints sync (ya corren en el threadpool); los async usan `render_async`.
+    """
+    body, media_type, content_encoding = _serialize(request, payload, encoding)
+    if content_encoding is not None:
+        body = _compress(body, content_encoding)
+    return _response(body, media_type, content_encoding)
+
+
+async def render_async(request: Request, payload: Dict[str, Any], encoding: str = "json") -> Response:
+    """Como `render`, pero los cuerpos grandes se comprimen en el threadpool y no en el event loop"""
+    body, media_type, content_encoding = _serialize(request, payload, encoding)
+    if content_encoding is not None:
+        if len(body) >= COMPRESS_THREADPOOL_BYTES:
+            body = await run_in_threadpool(_compress, body, content_encoding)
+        else:
+            body = _compress(body, content_encoding)
+    return _response(body, media_type, content_encoding)
+
+
+def _compact_payload(request: Request, payload: Dict[str, Any], lat, lon, elevation, fmt, encoding, samples_key):
+    fmt, encoding = negotiate(request, fmt, encoding)
+    if fmt is None:
+        return None, encoding
+    return {**payload, samples_key: compact_samples(lat, lon, elevation, fmt)}, encoding
+
+
+def samples_response(request: Request, payload: Dict[str, Any], lat: Sequence, lon: Sequence,
+                     elevation=None, fmt: Optional[str] = None, encoding: Optional[str] = None,
+                     samples_key: str = "samples"):
+    """Respuesta de un endpoint con muestras: el dict original si no se pidió formato compacto"""
+    compact, encoding = _compact_payload(request, payload, lat, lon, elevation, fmt, encoding, samples_key)
+    return payload if compact is None else render(request, compact, encoding)
+
+
+async def samples_response_async(request: Request, payload: Dict[str, Any], lat: Sequence, lon: Sequence,
+                                 elevation=None, fmt: Optional[str] = None, encoding: Optional[str] = None,
+                                 samples_key: str = "samples"):
+    """`samples_response` para endpoints async (compresión de cuerpos grandes fuera del event loop)"""
+    compact, encoding = _compact_payload(request, payload, lat, lon, elevation, fmt, encoding, samples_key)
+    return payload if compact is None else await render_async(request, compact, encoding)
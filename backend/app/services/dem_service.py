@@ -0,0 +1,202 @@
+# backend/app/services/dem_service.py
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.metrics import timed
+from app.services.terrain_features import extract_terrain_features
+
+logger = logging.getLogger(__name__)
+
+
+class DEMTile:
+    """Tile de un modelo digital de elevación abierto con numpy.memmap
+
+    El tile es un `.npy` 2D (filas = latitud, columnas = longitud) con un
+    `.json` al lado que describe su geotransformación en EPSG:4326:
+
+        {"west": -80.0, "north": -2.0, "res_x": 0.0003, "res_y": 0.0003, "nodata": -9999}
+
+    `west`/`north` son la esquina superior izquierda del primer píxel.
+    """
+
+    def __init__(self, npy_path: Path, meta: Dict):
+        self.path = npy_path
+        self.data = np.load(npy_path, mmap_mode="r")
+        if self.data.ndim != 2:
+            raise ValueError(f"{npy_path.name}: se esperaba un arreglo 2D, tiene {self.data.ndim} dimensiones")
+        self.west = float(meta["west"])
+        self.north = float(meta["north"])
+        self.res_x = float(meta["res_x"])
+        self.res_y = abs(float(meta["res_y"]))
+        self.nodata = meta.get("nodata")
+        rows, cols = self.data.shape
+        self.east = self.west + cols * self.res_x
+        self.south = self.north - rows * self.res_y
+
+    def contains(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        return (lon >= self.west) & (lon <= self.east) & (lat >= self.south) & (lat <= self.north)
+
+    def bilinear(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """Interpolación bilineal vectorizada (los puntos deben estar dentro del tile)"""
+        rows, cols = self.data.shape
+        # posición fraccional respecto a los centros de píxel
+        col_f = np.clip((lon - self.west) / self.res_x - 0.5, 0, cols - 1)
+        row_f = np.clip((self.north - lat) / self.res_y - 0.5, 0, rows - 1)
+        c0 = np.minimum(np.floor(col_f).astype(np.intp), max(cols - 2, 0))
+        r0 = np.minimum(np.floor(row_f).astype(np.intp), max(rows - 2, 0))
+        c1 = np.minimum(c0 + 1, cols - 1)
+        r1 = np.minimum(r0 + 1, rows - 1)
+        dc = col_f - c0
+        dr = row_f - r0
+
+        # indexado avanzado: solo se leen de disco las páginas tocadas
+        z00 = self.data[r0, c0].astype(float)
+        z01 = self.data[r0, c1].astype(float)
+        z10 = self.data[r1, c0].astype(float)
+        z11 = self.data[r1, c1].astype(float)
+        z = (z00 * (1 - dr) * (1 - dc) + z01 * (1 - dr) * dc
+             + z10 * dr * (1 - dc) + z11 * dr * dc)
+
+        if self.nodata is not None:
+            invalid = (z00 == self.nodata) | (z01 == self.nodata) | (z10 == self.nodata) | (z11 == self.nodata)
+            z[invalid] = np.nan
+        return z
+
+
+def convert_geotiff_to_tile(tif_path: Path) -> Path:
+    """Convertir un GeoTIFF (EPSG:4326) a .npy + .json para poder mapearlo en memoria (requiere rasterio)"""
+    import rasterio
+
+    with rasterio.open(tif_path) as src:
+        if src.crs is not None and src.crs.to_epsg() != 4326:
+            raise ValueError(f"{tif_path.name}: se requiere EPSG:4326, tiene {src.crs}")
+        data = src.read(1)
+        t = src.transform
+        meta = {"west": t.c, "north": t.f, "res_x": t.a, "res_y": abs(t.e), "nodata": src.nodata}
+    npy_path = tif_path.with_suffix(".npy")
+    np.save(npy_path, data)
+    tif_path.with_suffix(".json").write_text(json.dumps(meta))
+    return npy_path
+
+
+class DEMService:
+    """Proveedor de elevación local a partir de tiles DEM
+
+    Los puntos fuera de los tiles (o sobre nodata) se piden al servicio de
+    `fallback` (ArcGIS) si está configurado.
+    """
+
+    def __init__(self, tiles_dir: str, fallback=None):
+        self.tiles_dir = Path(tiles_dir)
+        self.fallback = fallback
+        self.tiles: List[DEMTile] = []
+        self._load_tiles()
+
+    def _load_tiles(self):
+        if not self.tiles_dir.is_dir():
+            logger.warning(f"⚠️ Directorio DEM no encontrado: {self.tiles_dir}")
+            return
+
+        # GeoTIFF sin su .npy: convertir una sola vez si rasterio está disponible
+        for tif in sorted(self.tiles_dir.glob("*.tif")):
+            if not tif.with_suffix(".npy").exists():
+                try:
+                    convert_geotiff_to_tile(tif)
+                    logger.info(f"DEM convertido a tile: {tif.name}")
+                except ImportError:
+                    logger.warning(f"⚠️ {tif.name} ignorado: instala rasterio o conviértelo a .npy")
+                except Exception as e:
+                    logger.warning(f"⚠️ Error convirtiendo {tif.name}: {e}")
+
+        for npy in sorted(self.tiles_dir.glob("*.npy")):
+            meta_path = npy.with_suffix(".json")
+            if not meta_path.exists():
+                logger.warning(f"⚠️ {npy.name} sin metadatos {meta_path.name}")
+                continue
+            try:
+                self.tiles.append(DEMTile(npy, json.loads(meta_path.read_text())))
+            except Exception as e:
+                logger.warning(f"⚠️ Error cargando tile {npy.name}: {e}")
+        logger.info(f"✅ DEM: {len(self.tiles)} tiles cargados desde {self.tiles_dir}")
+
+    @timed("dem.sample")
+    def sample(self, lat, lon) -> np.ndarray:
+        """Elevación para arreglos de lat/lon en una sola pasada; NaN fuera de cobertura"""
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        z = np.full(lat.shape, np.nan)
+        pending = np.ones(lat.shape, dtype=bool)
+        for tile in self.tiles:
+            inside = pending & tile.contains(lat, lon)
+            if not inside.any():
+                continue
+            z[inside] = tile.bilinear(lat[inside], lon[inside])
+            pending &= ~inside | np.isnan(z)
+            if not pending.any():
+                break
+        return z
+
+    async def get_elevation_profile(self, coordinates: List[Tuple[float, float]], with_stats: bool = True) -> Dict:
+        if not coordinates:
+            return {"success": False, "elevations": []}
+
+        coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+        z = self.sample(coords[:, 0], coords[:, 1])
+        missing = np.flatnonzero(np.isnan(z))
+
+        failed_batches = []
+        if len(missing) and self.fallback is not None:
+            fb = await self.fallback.get_elevation_profile([coordinates[i] for i in missing], with_stats=False)
+            fb_z = np.array([np.nan if e is None else e for e in fb.get("elevations", [])], dtype=float)
+            if len(fb_z) == len(missing):
+                z[missing] = fb_z
+            # índices del fallback (sobre `missing`) -> índices de `coordinates`
+            failed_batches = [
+                {**entry, "indices": [int(missing[i]) for i in entry.get("indices", [])]}
+                for entry in fb.get("failed_batches", [])
+            ]
+
+        elevations: List[Optional[float]] = [None if np.isnan(v) else float(v) for v in z]
+        return {
+            "success": bool(np.isfinite(z).any()),
+            "elevations": elevations,
+            "statistics": self._calculate_stats(z, coords) if with_stats else {},
+            "failed_batches": failed_batches,
+            "dem": {"points": len(z), "from_tiles": len(z) - len(missing), "outside_tiles": int(len(missing))},
+        }
+
+    def _calculate_stats(self, z: np.ndarray, coords: np.ndarray) -> Dict:
+        if not np.isfinite(z).any():
+            return {}
+        return extract_terrain_features(coords[:, 0], coords[:, 1], z).summary()
+
+    def test_connection(self):
+        return {
+            "connected": bool(self.tiles),
+            "tiles_dir": str(self.tiles_dir),
+            "tiles": [t.path.name for t in self.tiles],
+            "fallback": self.fallback is not None,
+        }
+
+
+_elevation_service = None
+
+
+def get_elevation_service():
+    """Proveedor de elevación según Settings.ELEVATION_PROVIDER ("arcgis" o "dem")"""
+    global _elevation_service
+    if _elevation_service is None:
+        from app.core.config import BACKEND_DIR, get_settings
+        from app.services.arcgis_service import arcgis_service
+
+        settings = get_settings()
+        if settings.ELEVATION_PROVIDER.lower() == "dem":
+            fallback = arcgis_service if settings.DEM_ARCGIS_FALLBACK else None
+            _elevation_service = DEMService(str(BACKEND_DIR / settings.DEM_TILES_DIR), fallback=fallback)
+        else:
+            _elevation_service = arcgis_service
+    return _elevation_service
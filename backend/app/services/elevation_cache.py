@@ -0,0 +1,183 @@
+# backend/app/services/elevation_cache.py
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# SQLite limita el número de parámetros por sentencia; 2 por punto
+_CHUNK = 400
+# Cada cuánto se barren las entradas expiradas (las lecturas ya las ignoran)
+_EXPIRE_EVERY_S = 600
+
+
+class ElevationCache:
+    """Caché persistente de elevaciones en SQLite
+
+    Las claves son (lat, lon) cuantizadas a `precision` decimales, así que
+    puntos casi idénticos de rutas redibujadas comparten entrada. Expulsa por
+    LRU cuando supera `max_entries` y descarta entradas más viejas que `ttl_s`.
+    Las operaciones bloquean (SQLite): desde código async llamarlas con
+    run_in_threadpool.
+    """
+
+    def __init__(self, path: str, precision: int = 5, max_entries: int = 500_000, ttl_s: float = 30 * 24 * 3600):
+        self.path = path
+        self.precision = precision
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._scale = 10 ** precision
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS elevations (
+                lat_q INTEGER NOT NULL,
+                lon_q INTEGER NOT NULL,
+                z REAL NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (lat_q, lon_q)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_elevations_accessed ON elevations (accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_elevations_created ON elevations (created_at)")
+        # Conteo de filas mantenido en memoria: un COUNT(*) al abrir y no en cada escritura
+        self._size = self._conn.execute("SELECT COUNT(*) FROM elevations").fetchone()[0]
+        self._last_expire = 0.0
+
+    def key(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(round(lat * self._scale)), int(round(lon * self._scale))
+
+    def get_many(self, coordinates: Sequence[Tuple[float, float]]) -> List[Optional[float]]:
+        """Elevación cacheada por punto (lat, lon), None si no está o expiró"""
+        keys = [self.key(lat, lon) for lat, lon in coordinates]
+        unique = list(dict.fromkeys(keys))
+        now = time.time()
+        min_created = now - self.ttl_s
+        found: Dict[Tuple[int, int], float] = {}
+
+        with self._lock:
+            for i in range(0, len(unique), _CHUNK):
+                chunk = unique[i:i + _CHUNK]
+                placeholders = ",".join(["(?,?)"] * len(chunk))
+                params = [v for k in chunk for v in k]
+                rows = self._conn.execute(
+                    f"SELECT lat_q, lon_q, z, created_at FROM elevations WHERE (lat_q, lon_q) IN (VALUES {placeholders})",
+                    params,
+                ).fetchall()
+                for lat_q, lon_q, z, created_at in rows:
+                    if created_at >= min_created:
+                        found[(lat_q, lon_q)] = z
+            if found:
+                # una sola transacción para todos los accessed_at (no un commit por fila)
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.executemany(
+                        "UPDATE elevations SET accessed_at = ? WHERE lat_q = ? AND lon_q = ?",
+                        [(now, lat_q, lon_q) for lat_q, lon_q in found],
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+
+            result = [found.get(k) for k in keys]
+            hits = sum(1 for v in result if v is not None)
+            self.hits += hits
+            self.misses += len(result) - hits
+        return result
+
+    def put_many(self, coordinates: Iterable[Tuple[float, float]], elevations: Iterable[Optional[float]]):
+        """Guardar elevaciones obtenidas upstream (los None se ignoran)"""
+        now = time.time()
+        rows = [
+            (*self.key(lat, lon), float(z), now, now)
+            for (lat, lon), z in zip(coordinates, elevations)
+            if z is not None
+        ]
+        if not rows:
+            return
+        with self._lock:
+            size = self._size
+            self._conn.execute("BEGIN")
+            try:
+                # INSERT OR IGNORE cuenta solo las filas nuevas; las existentes se
+                # actualizan después (las recién insertadas tienen created_at = now)
+                inserted = self._conn.executemany(
+                    "INSERT OR IGNORE INTO elevations (lat_q, lon_q, z, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                ).rowcount
+                self._conn.executemany(
+                    "UPDATE elevations SET z = ?, created_at = ?, accessed_at = ? WHERE lat_q = ? AND lon_q = ? AND created_at < ?",
+                    [(z, now, now, lat_q, lon_q, now) for lat_q, lon_q, z, _, _ in rows],
+                )
+                self._size += inserted
+                self._evict(now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._size = size
+                raise
+
+    def _evict(self, now: float):
+        # Primero lo expirado (cada _EXPIRE_EVERY_S), luego lo menos usado recientemente hasta max_entries
+        expired = 0
+        if now - self._last_expire >= _EXPIRE_EVERY_S:
+            expired = self._conn.execute(
+                "DELETE FROM elevations WHERE created_at < ?", (now - self.ttl_s,)
+            ).rowcount
+            self._last_expire = now
+        self._size -= expired
+        overflow = self._size - self.max_entries
+        lru = 0
+        if overflow > 0:
+            lru = self._conn.execute(
+                """
+                DELETE FROM elevations WHERE (lat_q, lon_q) IN (
+                    SELECT lat_q, lon_q FROM elevations ORDER BY accessed_at LIMIT ?
+                )
+                """,
+                (overflow,),
+            ).rowcount
+            self._size -= lru
+        if expired or lru:
+            self.evictions += expired + lru
+            logger.info(f"Caché de elevación: {expired} expiradas, {lru} expulsadas por LRU")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "path": self.path,
+                "precision": self.precision,
+                "entries": self._size,
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM elevations")
+            self._size = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
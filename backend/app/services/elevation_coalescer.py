@@ -0,0 +1,189 @@
+# backend/app/services/elevation_coalescer.py
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+coalesced_points = registry.counter(
+    "ftth_elevation_coalescer_points_total",
+    "Puntos pedidos al coalescedor (upstream = clave nueva, shared = ya pendiente o en vuelo)",
+    ("source",),
+)
+batch_fill = registry.histogram(
+    "ftth_elevation_batch_points", "Puntos por lote enviado a la API de elevación", (),
+    (1, 10, 25, 50, 75, 100, 125, 149, 150),
+)
+
+Point = Tuple[float, float]
+Key = Tuple[int, int]
+
+
+class _Slot:
+    """Un punto cuantizado pendiente o en vuelo y quienes lo esperan"""
+    __slots__ = ("point", "waiters", "z", "error")
+
+    def __init__(self, point: Point):
+        self.point = point
+        self.waiters: List["_Waiter"] = []
+        self.z: Optional[float] = None
+        self.error: Optional[Tuple[int, BaseException]] = None
+
+
+class _Waiter:
+    """Una llamada a fetch(): se resuelve cuando llegan todos sus puntos"""
+    __slots__ = ("future", "remaining")
+
+    def __init__(self, future: asyncio.Future, remaining: int):
+        self.future = future
+        self.remaining = remaining
+
+
+class ElevationCoalescer:
+    """Junta los puntos de llamadas concurrentes en lotes llenos hacia la API de elevación
+
+    Los puntos se cuantizan a `precision` decimales: un punto ya pendiente o
+    en vuelo (de esta u otra petición) no se vuelve a pedir. Los lotes de
+    `batch_size` se envían apenas se completan; el resto espera como máximo
+    `window_s` a que otras llamadas lo completen. Cada llamada recibe sus
+    elevaciones en su propio orden. Vive en un solo event loop.
+    """
+
+    def __init__(self, fetch_batch: Callable[[List[Point]], Awaitable[List[float]]],
+                 batch_size: int = 150, window_s: float = 0.02, precision: int = 5):
+        self._fetch_batch = fetch_batch
+        self.batch_size = batch_size
+        self.window_s = window_s
+        self.precision = precision
+        self._scale = 10 ** precision
+        self._slots: Dict[Key, _Slot] = {}  # pendientes + en vuelo
+        self._queue: List[Key] = []  # pendientes, en orden de llegada
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._batch_seq = 0
+        self.requested_points = 0
+        self.shared_points = 0
+        self.upstream_batches = 0
+        self.upstream_points = 0
+
+    def key(self, lat: float, lon: float) -> Key:
+        return int(round(lat * self._scale)), int(round(lon * self._scale))
+
+    async def fetch(self, points: Sequence[Point]) -> Tuple[List[Optional[float]], List[Dict]]:
+        """Elevaciones de `points` (lat, lon); devuelve (elevaciones, lotes fallidos)
+
+        Misma forma que ArcGISService._fetch_points: cada lote fallido lista
+        en `indices` las posiciones de `points` que afectó (en orden), aunque
+        el lote haya mezclado puntos de varias peticiones.
+        """
+        if not points:
+            return [], []
+
+        slots: List[_Slot] = []
+        unique: Dict[int, _Slot] = {}
+        new = 0
+        for lat, lon in points:
+            k = self.key(lat, lon)
+            slot = self._slots.get(k)
+            if slot is None:
+                slot = self._slots[k] = _Slot((lat, lon))
+                self._queue.append(k)
+                new += 1
+            slots.append(slot)
+            unique[id(slot)] = slot
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), len(unique))
+        for slot in unique.values():
+            slot.waiters.append(waiter)
+        self.requested_points += len(unique)
+        self.shared_points += len(unique) - new
+        coalesced_points.inc(new, source="upstream")
+        coalesced_points.inc(len(unique) - new, source="shared")
+
+        self._schedule()
+        await waiter.future
+
+        failed: Dict[int, Dict] = {}
+        for i, slot in enumerate(slots):
+            if slot.error is None:
+                continue
+            batch_id, error = slot.error
+            entry = failed.setdefault(batch_id, {
+                "batch": batch_id,
+                "indices": [],
+                "error": str(error),
+                "status_code": getattr(error, "status_code", None),
+                "attempts": getattr(error, "attempts", None),
+            })
+            entry["indices"].append(i)
+        return [slot.z for slot in slots], list(failed.values())
+
+    def _schedule(self):
+        # lotes llenos: enviar ya; el resto espera la ventana
+        while len(self._queue) >= self.batch_size:
+            self._flush(self.batch_size)
+        if not self._queue:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        elif self.window_s <= 0:
+            self._flush(len(self._queue))
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window_s, self._on_window)
+
+    def _on_window(self):
+        self._timer = None
+        while self._queue:
+            self._flush(min(self.batch_size, len(self._queue)))
+
+    def _flush(self, n: int):
+        keys = self._queue[:n]
+        del self._queue[:n]
+        self._batch_seq += 1
+        self.upstream_batches += 1
+        self.upstream_points += len(keys)
+        batch_fill.observe(len(keys))
+        task = asyncio.create_task(self._run_batch(self._batch_seq, keys))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch_id: int, keys: List[Key]):
+        slots = [self._slots[k] for k in keys]
+        try:
+            z_values = await self._fetch_batch([slot.point for slot in slots])
+            for slot, z in zip(slots, z_values):
+                slot.z = z
+        except Exception as e:
+            logger.error(f"Lote coalescido {batch_id} ({len(keys)} puntos) falló: {e}")
+            for slot in slots:
+                slot.error = (batch_id, e)
+        except asyncio.CancelledError as e:
+            # apagado: nadie debe quedar esperando
+            for slot in slots:
+                slot.error = (batch_id, e)
+            raise
+        finally:
+            for k in keys:
+                del self._slots[k]
+            for slot in slots:
+                for waiter in slot.waiters:
+                    waiter.remaining -= 1
+                    if waiter.remaining == 0 and not waiter.future.done():
+                        waiter.future.set_result(None)
+
+    def stats(self) -> Dict:
+        return {
+            "batch_size": self.batch_size,
+            "window_ms": round(1000 * self.window_s, 3),
+            "precision": self.precision,
+            "requested_points": self.requested_points,
+            "shared_points": self.shared_points,
+            "upstream_batches": self.upstream_batches,
+            "upstream_points": self.upstream_points,
+            "batch_fill_rate": round(self.upstream_points / (self.upstream_batches * self.batch_size), 4)
+            if self.upstream_batches else None,
+            "pending": len(self._queue),
+            "in_flight": len(self._slots) - len(self._queue),
+        }
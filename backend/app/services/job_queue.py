@@ -0,0 +1,159 @@
+# backend/app/services/job_queue.py
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """La cola de trabajos alcanzó su tamaño máximo"""
+
+
+class RateLimiter:
+    """Token bucket: como máximo `per_minute` llamadas por minuto
+
+    Cada llamada reserva su token al entrar (el saldo puede quedar negativo)
+    y espera lo que falte para cubrirlo, así el orden es FIFO. Se puede usar
+    desde el event loop (`acquire`) o desde un hilo (`acquire_blocking`).
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = max(1.0, float(per_minute))
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Tomar un token y devolver cuántos segundos hay que esperar"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_blocking(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class JobQueue:
+    """Cola de trabajos en proceso con un pool acotado de workers
+
+    Cada trabajo es una función síncrona (bloqueante) que se ejecuta en un
+    hilo con asyncio.to_thread, así el event loop de uvicorn nunca se bloquea,
+    o una corrutina que se espera en el propio worker.
+    Los resultados se guardan en memoria durante `ttl_s` segundos. La cuota
+    de un proveedor externo no se aplica aquí sino en la llamada que la
+    consume (ver RateLimiter), así los aciertos de caché no gastan tokens.
+    """
+
+    def __init__(self, name: str, workers: int, max_pending: int, ttl_s: float = 3600):
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.ttl_s = ttl_s
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _ensure_started(self):
+        if self._tasks and not all(t.done() for t in self._tasks):
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Cola '{self.name}': {self.workers} workers iniciados")
+
+    async def submit(self, fn: Callable, *args, **kwargs) -> str:
+        """Encolar un trabajo y devolver su id sin esperar el resultado"""
+        self._ensure_started()
+        self._purge_expired()
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        try:
+            self._queue.put_nowait((job_id, fn, args, kwargs))
+        except asyncio.QueueFull:
+            raise QueueFull(f"Cola '{self.name}' llena ({self.max_pending} trabajos pendientes)")
+        self.jobs[job_id] = job
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        out = dict(job)
+        if job["status"] == "queued":
+            out["position"] = sum(
+                1 for j in self.jobs.values()
+                if j["status"] == "queued" and j["created_at"] < job["created_at"]
+            )
+        return out
+
+    async def _worker(self, index: int):
+        while True:
+            job_id, fn, args, kwargs = await self._queue.get()
+            job = self.jobs.get(job_id)
+            try:
+                if job is None:
+                    continue
+                job["status"] = "running"
+                job["started_at"] = time.time()
+                if asyncio.iscoroutinefunction(fn):
+                    job["result"] = await fn(*args, **kwargs)
+                else:
+                    job["result"] = await asyncio.to_thread(fn, *args, **kwargs)
+                job["status"] = "done"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Trabajo {job_id} en '{self.name}' falló: {e}")
+                job["status"] = "error"
+                job["error"] = str(e)
+            finally:
+                if job is not None and job["finished_at"] is None and job["status"] in ("done", "error"):
+                    job["finished_at"] = time.time()
+                self._queue.task_done()
+
+    def _purge_expired(self):
+        limit = time.time() - self.ttl_s
+        expired = [k for k, j in self.jobs.items() if j["finished_at"] and j["finished_at"] < limit]
+        for k in expired:
+            del self.jobs[k]
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for j in self.jobs.values():
+            counts[j["status"]] = counts.get(j["status"], 0) + 1
+        return {
+            "name": self.name,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "jobs": counts,
+        }
+
+    async def shutdown(self):
+        for t in self._tasks:
+            t.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
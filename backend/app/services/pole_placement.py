@@ -0,0 +1,285 @@
+# backend/app/services/pole_placement.py
+import bisect
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import shape
+
+from app.services.route_sampling import project_coords_to_3857, sample_route_lonlat
+from app.services.terrain_features import extract_terrain_features, geodesic_segment_lengths
+
+# Vano máximo (m) según la pendiente del vano (%), según la base de reglas (R001-R005):
+# plano 40-50 m, leve 45-50 m, moderada 35-40 m, fuerte 30-35 m, severa <30 m
+DEFAULT_SPAN_TABLE: Tuple[Tuple[float, float], ...] = (
+    (5.0, 50.0),
+    (10.0, 45.0),
+    (15.0, 40.0),
+    (20.0, 35.0),
+    (math.inf, 28.0),
+)
+
+# Postes con deflexión mayor (grados) llevan retención y tensor
+ANGLE_DEADEND_DEG = 30.0
+# En pendientes > 15 % se exige un poste de anclaje cada 80-100 m (R004)
+ANCHOR_SLOPE_PCT = 15.0
+ANCHOR_EVERY_M = 80.0
+
+
+@dataclass
+class PolePlan:
+    """Postes elegidos (índices de muestra) y datos para el conteo de materiales"""
+    index: np.ndarray
+    position_m: np.ndarray
+    reused: np.ndarray
+    span_m: np.ndarray
+    span_slope_pct: np.ndarray
+    deflection_deg: np.ndarray
+    deadend: np.ndarray
+    cost: float
+
+    def materials(self, cable_reserve_pct: float = 5.0) -> Dict[str, Any]:
+        n = len(self.index)
+        n_reused = int(self.reused.sum())
+        cable = float(self.span_m.sum())
+        n_deadend = int(self.deadend.sum())
+        return {
+            "postes_total": n,
+            "postes_nuevos": n - n_reused,
+            "postes_reutilizados": n_reused,
+            "vanos": int(len(self.span_m)),
+            "vano_promedio_m": round(float(self.span_m.mean()), 2) if len(self.span_m) else 0.0,
+            "vano_max_m": round(float(self.span_m.max()), 2) if len(self.span_m) else 0.0,
+            "cable_m": round(cable * (1 + cable_reserve_pct / 100.0), 1),
+            "herrajes_retencion": n_deadend,
+            "herrajes_suspension": n - n_deadend,
+            "tensores": n_deadend,
+        }
+
+
+def _span_limit(table: Sequence[Tuple[float, float]]):
+    bounds = [b for b, _ in table]
+    spans = [s for _, s in table]
+
+    def limit(slope_pct: float) -> float:
+        i = bisect.bisect_left(bounds, slope_pct)
+        return spans[min(i, len(spans) - 1)]
+    return limit
+
+
+def solve_pole_positions(cum_m: np.ndarray, seg_slope_pct: np.ndarray, cost: np.ndarray,
+                         span_table: Sequence[Tuple[float, float]] = DEFAULT_SPAN_TABLE,
+                         min_span_m: float = 15.0) -> Tuple[np.ndarray, float]:
+    """Programación dinámica sobre las muestras: postes de costo mínimo en ambos extremos
+
+    Un vano i -> j es válido si mide al menos `min_span_m` y no supera el
+    vano máximo para la pendiente más fuerte dentro de él. Al crecer j el
+    primer i válido nunca retrocede, así que los candidatos forman una
+    ventana deslizante: el máximo de pendiente y el mínimo de costo se llevan
+    con colas monótonas y el total es O(N). `cost` es el costo de poner
+    poste en cada muestra (inf = prohibido).
+    """
+    n = len(cum_m)
+    if n < 2:
+        raise ValueError("La ruta necesita al menos dos muestras")
+    if not (np.isfinite(cost[0]) and np.isfinite(cost[-1])):
+        raise ValueError("Los extremos de la ruta están en una zona prohibida")
+    if min_span_m > min(s for _, s in span_table):
+        raise ValueError("min_span_m no puede superar el menor vano máximo de la tabla")
+
+    limit = _span_limit(span_table)
+    cum = cum_m.tolist()
+    slope = np.abs(np.nan_to_num(seg_slope_pct)).tolist()
+    cost_l = cost.tolist()
+    dp = [math.inf] * n
+    prev = [-1] * n
+    dp[0] = cost_l[0]
+
+    best: deque = deque()  # candidatos i en [lo, hi) con dp creciente
+    steep: deque = deque()  # segmentos k en [lo, j) con pendiente decreciente
+    lo = hi = 0
+    for j in range(1, n):
+        s = slope[j - 1]
+        while steep and slope[steep[-1]] <= s:
+            steep.pop()
+        steep.append(j - 1)
+        cj = cum[j]
+        while hi < j and cj - cum[hi] >= min_span_m:
+            d = dp[hi]
+            # un i que ya quedó atrás de lo no vuelve a ser válido
+            if d < math.inf and hi >= lo:
+                while best and dp[best[-1]] >= d:
+                    best.pop()
+                best.append(hi)
+            hi += 1
+        while lo < j and cj - cum[lo] > limit(slope[steep[0]]):
+            lo += 1
+            while steep and steep[0] < lo:
+                steep.popleft()
+        while best and best[0] < lo:
+            best.popleft()
+        if best and cost_l[j] < math.inf:
+            i = best[0]
+            dp[j] = dp[i] + cost_l[j]
+            prev[j] = i
+
+    if dp[-1] == math.inf:
+        raise ValueError("No hay ubicación de postes que cumpla los vanos máximos (¿zona prohibida más larga que un vano?)")
+    path = [n - 1]
+    while path[-1] != 0:
+        path.append(prev[path[-1]])
+    return np.asarray(path[::-1], dtype=int), dp[-1]
+
+
+def snap_existing_poles(samples_xy: np.ndarray, poles_lonlat, snap_m: float, lat_ref: float) -> np.ndarray:
+    """Índice de la muestra más cercana a cada poste existente (a menos de snap_m)"""
+    mask = np.zeros(len(samples_xy), dtype=bool)
+    if poles_lonlat is None or not len(poles_lonlat):
+        return mask
+    # en EPSG:3857 las distancias crecen 1/cos(lat)
+    scale = 1.0 / max(math.cos(math.radians(lat_ref)), 1e-6)
+    tree = STRtree(shapely.points(samples_xy))
+    poles = shapely.points(project_coords_to_3857(np.asarray(poles_lonlat, dtype=float)[:, :2]))
+    _, sample_idx = tree.query_nearest(poles, max_distance=snap_m * scale)
+    mask[sample_idx] = True
+    return mask
+
+
+def forbidden_mask(lon: np.ndarray, lat: np.ndarray, zones: Optional[List[dict]] = None,
+                   zone_types: Optional[Sequence[str]] = None) -> np.ndarray:
+    """Muestras donde no se puede poner poste: polígonos dados y/o tipos de zona del índice"""
+    mask = np.zeros(len(lon), dtype=bool)
+    if zones:
+        geoms = [shape(z.get("geometry", z)) for z in zones]
+        tree = STRtree(geoms)
+        pt_idx, _ = tree.query(shapely.points(lon, lat), predicate="intersects")
+        mask[pt_idx] = True
+    if zone_types:
+        from app.services.zone_index import get_zone_index
+        zone = get_zone_index().classify(lon, lat)["zone_type"]
+        mask |= np.isin(zone.astype(str), list(zone_types))
+    return mask
+
+
+def _deflection_deg(xy: np.ndarray) -> np.ndarray:
+    """Ángulo de deflexión en cada poste intermedio (0 en los extremos)"""
+    out = np.zeros(len(xy))
+    if len(xy) < 3:
+        return out
+    v = np.diff(xy, axis=0)
+    heading = np.arctan2(v[:, 1], v[:, 0])
+    turn = np.abs((np.diff(heading) + np.pi) % (2 * np.pi) - np.pi)
+    out[1:-1] = np.degrees(turn)
+    return out
+
+
+def plan_poles(lat: np.ndarray, lon: np.ndarray, elevations, samples_xy: np.ndarray,
+               existing: Optional[np.ndarray] = None, forbidden: Optional[np.ndarray] = None,
+               span_table: Sequence[Tuple[float, float]] = DEFAULT_SPAN_TABLE,
+               min_span_m: float = 15.0, new_cost: float = 1.0, reuse_cost: float = 0.3) -> PolePlan:
+    """Ubicar postes sobre la ruta muestreada (lat/lon/elevación por muestra)"""
+    n = len(lat)
+    seg_len = geodesic_segment_lengths(lat, lon)
+    # pendiente sobre una ventana del orden de un vano
+    window = max(s for _, s in span_table)
+    terrain = extract_terrain_features(lat, lon, elevations, window_m=window, seg_len_m=seg_len)
+    seg_slope = terrain.rolling_slope_pct if np.isfinite(terrain.elevation_m).any() else np.zeros(n - 1)
+
+    existing = np.zeros(n, dtype=bool) if existing is None else existing
+    cost = np.full(n, float(new_cost))
+    if forbidden is not None:
+        # un poste existente dentro de una zona prohibida se puede seguir usando
+        cost[forbidden] = np.inf
+    cost[existing] = reuse_cost
+
+    index, total = solve_pole_positions(terrain.cum_m, seg_slope, cost, span_table, min_span_m)
+    cum = terrain.cum_m
+    span_m = np.diff(cum[index])
+    # pendiente máxima dentro de cada vano
+    abs_slope = np.abs(np.nan_to_num(seg_slope))
+    span_slope = np.maximum.reduceat(abs_slope, index[:-1]) if len(abs_slope) else np.zeros(len(span_m))
+
+    deflection = _deflection_deg(samples_xy[index])
+    deadend = deflection > ANGLE_DEADEND_DEG
+    deadend[[0, -1]] = True
+    # anclajes en pendiente fuerte: dentro de cada tramo empinado, una retención cada ANCHOR_EVERY_M
+    last_anchor = cum[index[0]]
+    for k in range(1, len(index)):
+        pos = cum[index[k]]
+        if deadend[k] or span_slope[k - 1] <= ANCHOR_SLOPE_PCT:
+            last_anchor = pos
+        elif pos - last_anchor >= ANCHOR_EVERY_M:
+            deadend[k] = True
+            last_anchor = pos
+
+    return PolePlan(
+        index=index, position_m=cum[index], reused=existing[index], span_m=span_m,
+        span_slope_pct=span_slope, deflection_deg=deflection, deadend=deadend, cost=float(total),
+    )
+
+
+async def plan_route_poles(coords, step_m: float = 1.0, elevation_step_m: float = 10.0,
+                           elevation_service=None, existing_poles=None, snap_m: float = 5.0,
+                           forbidden_zones: Optional[List[dict]] = None,
+                           forbidden_zone_types: Optional[Sequence[str]] = None,
+                           span_table: Sequence[Tuple[float, float]] = DEFAULT_SPAN_TABLE,
+                           min_span_m: float = 15.0, reuse_cost: float = 0.3,
+                           cable_reserve_pct: float = 5.0) -> Dict[str, Any]:
+    """Muestrear la ruta, obtener elevaciones y resolver la ubicación de postes
+
+    Las posiciones candidatas van cada `step_m` (p.ej. 1 m), pero la
+    elevación se consulta cada `elevation_step_m` e interpola por distancia:
+    el terreno no cambia al metro y así la consulta al proveedor no crece
+    con la resolución del solver.
+    """
+    coords = np.asarray(coords, dtype=float)[:, :2]
+    _, samples_xy, lat, lon = sample_route_lonlat(coords, step_m)
+    if len(lat) < 2:
+        raise ValueError("La ruta debe tener longitud mayor que 0")
+    cum = np.concatenate(([0.0], np.cumsum(geodesic_segment_lengths(lat, lon))))
+
+    elevations = np.full(len(lat), np.nan)
+    if elevation_service is not None and len(lat):
+        stride = max(1, int(round(elevation_step_m / step_m)))
+        coarse = np.unique(np.append(np.arange(0, len(lat), stride), len(lat) - 1))
+        profile = await elevation_service.get_elevation_profile(
+            list(zip(lat[coarse].tolist(), lon[coarse].tolist())), with_stats=False
+        )
+        z = np.array([np.nan if e is None else e for e in (profile.get("elevations") or [])], dtype=float)
+        valid = np.isfinite(z) if len(z) == len(coarse) else np.zeros(0, dtype=bool)
+        if valid.any():
+            elevations = np.interp(cum, cum[coarse][valid], z[valid])
+
+    existing = snap_existing_poles(samples_xy, existing_poles, snap_m, float(np.mean(lat)))
+    forbidden = forbidden_mask(lon, lat, forbidden_zones, forbidden_zone_types)
+    plan = plan_poles(
+        lat, lon, elevations, samples_xy, existing=existing, forbidden=forbidden,
+        span_table=span_table, min_span_m=min_span_m, reuse_cost=reuse_cost,
+    )
+
+    idx = plan.index
+    return {
+        "n_samples": int(len(lat)),
+        "longitud_m": round(float(cum[-1]), 2) if len(cum) else 0.0,
+        "existentes_ubicados": int(existing.sum()),
+        "muestras_prohibidas": int(forbidden.sum()),
+        "materiales": plan.materials(cable_reserve_pct),
+        "postes": [
+            {
+                "lat": round(float(lat[i]), 6),
+                "lon": round(float(lon[i]), 6),
+                "distancia_m": round(float(plan.position_m[k]), 2),
+                "elevacion": None if not np.isfinite(elevations[i]) else round(float(elevations[i]), 2),
+                "reutilizado": bool(plan.reused[k]),
+                "retencion": bool(plan.deadend[k]),
+                "deflexion_deg": round(float(plan.deflection_deg[k]), 1),
+                "vano_siguiente_m": round(float(plan.span_m[k]), 2) if k < len(plan.span_m) else None,
+                "pendiente_vano_pct": round(float(plan.span_slope_pct[k]), 2) if k < len(plan.span_slope_pct) else None,
+            }
+            for k, i in enumerate(idx.tolist())
+        ],
+    }
@@ -0,0 +1,136 @@
+# backend/app/services/result_cache.py
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+_MISSING = object()
+
+
+def normalize_geometry(geojson: Dict, decimals: int = 7) -> Dict:
+    """GeoJSON canónico: solo tipo y coordenadas redondeadas (ignora properties, orden de claves, etc.)"""
+    geom = geojson.get("geometry", geojson) if geojson.get("type") == "Feature" else geojson
+
+    def _round(value):
+        if isinstance(value, (list, tuple)):
+            return [_round(v) for v in value]
+        if isinstance(value, float):
+            return round(value, decimals)
+        return value
+
+    return {"type": geom.get("type"), "coordinates": _round(geom.get("coordinates"))}
+
+
+def content_key(*parts: Any) -> str:
+    """Hash SHA-256 estable de cualquier combinación de valores serializables a JSON"""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Caché LRU en memoria con TTL y single-flight
+
+    `get_or_compute` garantiza que peticiones idénticas simultáneas (misma
+    clave) comparten un único cálculo: la primera lo ejecuta y el resto
+    espera su resultado. Es seguro entre hilos (los workers de la cola de IA
+    y el threadpool de FastAPI).
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_s: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or time.time() - item[0] > self.ttl_s:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key: str) -> bool:
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def begin(self, key: str) -> Tuple[Future, bool]:
+        """Registrar un cálculo en vuelo: devuelve (future, es_líder)
+
+        El líder debe llamar a `finish` siempre (también si falla); el resto
+        espera el future. Permite single-flight en código async o por partes.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def finish(self, key: str, future: Future, value: Any = _MISSING, error: BaseException = None):
+        """Cerrar el cálculo del líder: guarda `value` en la caché o propaga `error`"""
+        with self._lock:
+            self._inflight.pop(key, None)
+        if value is not _MISSING:
+            self.set(key, value)
+            future.set_result(value)
+        else:
+            future.set_exception(error or RuntimeError("cálculo cancelado"))
+
+    def get_or_compute(self, key: str, fn: Callable[[], Any], bypass: bool = False) -> Tuple[Any, bool]:
+        """Devuelve (valor, reutilizado). Con bypass=True no lee la caché pero sí la actualiza
+
+        Si `fn` lanza una excepción no se guarda nada: los que esperaban la
+        reciben y la próxima petición vuelve a calcular.
+        """
+        if not bypass:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value, True
+
+        future, leader = self.begin(key)
+        if not leader:
+            return future.result(), True
+
+        try:
+            value = fn()
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, value)
+        return value, False
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared_inflight": self.shared,
+                "inflight": len(self._inflight),
+            }
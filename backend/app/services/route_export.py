@@ -0,0 +1,259 @@
+# backend/app/services/route_export.py
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import shapely
+from shapely.geometry import box
+
+from app.core.database import get_conn
+from app.core.metrics import span
+from app.services.spatial_index import spatial_index
+
+logger = logging.getLogger(__name__)
+
+# formato -> (media type, extensión del archivo)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "geojson": ("application/geo+json", "geojson"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# JSONB como texto: se copia tal cual a la salida sin decodificarlo en Python
+_EXPORT_COLUMNS = """
+    d.id, d.config_id, d.step_m, d.created_at,
+    d.metadata::text,
+    COALESCE(d.geojson->'geometry', d.geojson)::text,
+    c.name, {config}
+"""
+
+_GEO_METADATA = {
+    "version": "1.0.0",
+    "primary_column": "geometry",
+    # sin "crs": GeoParquet asume OGC:CRS84 (lon/lat WGS84)
+    "columns": {"geometry": {"encoding": "WKB", "geometry_types": []}},
+}
+
+
+@dataclass
+class ExportFilter:
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    config_id: Optional[int] = None
+    bbox: Optional[Tuple[float, float, float, float]] = None
+    include_config: bool = False
+
+
+@dataclass
+class ExportRow:
+    id: int
+    config_id: Optional[int]
+    step_m: Optional[int]
+    created_at: Optional[datetime]
+    metadata: Optional[str]  # JSON
+    geometry: str  # JSON de la geometría
+    config_name: Optional[str]
+    config: Optional[str]  # JSON, solo con include_config
+
+    def properties(self) -> dict:
+        return {
+            "id": self.id,
+            "config_id": self.config_id,
+            "config_name": self.config_name,
+            "step_m": self.step_m,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+def build_query(filters: ExportFilter, postgis: bool) -> Tuple[str, list]:
+    """SELECT de collected_data con los filtros; el bbox va en SQL solo con PostGIS"""
+    where, params = [], []
+    if filters.created_from is not None:
+        where.append("d.created_at >= %s")
+        params.append(filters.created_from)
+    if filters.created_to is not None:
+        where.append("d.created_at < %s")
+        params.append(filters.created_to)
+    if filters.config_id is not None:
+        where.append("d.config_id = %s")
+        params.append(filters.config_id)
+    if filters.bbox is not None and postgis:
+        where.append("d.geom && ST_MakeEnvelope(%s, %s, %s, %s, 4326)"
+                     " AND ST_Intersects(d.geom, ST_MakeEnvelope(%s, %s, %s, %s, 4326))")
+        params.extend((*filters.bbox, *filters.bbox))
+
+    columns = _EXPORT_COLUMNS.format(config="c.config::text" if filters.include_config else "NULL")
+    sql = f"SELECT {columns} FROM collected_data d LEFT JOIN user_configs c ON c.id = d.config_id"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY d.id", params
+
+
+def iter_export_chunks(filters: ExportFilter, chunk_size: int) -> Iterator[List[ExportRow]]:
+    """Filas de collected_data en bloques de chunk_size vía cursor con nombre (server-side)
+
+    El servidor mantiene el resultado y solo viaja un bloque por vez, así que
+    la memoria no depende del tamaño de la tabla. La conexión queda tomada
+    del pool hasta que se agota o se cierra el generador.
+    """
+    spatial_index.initialize()
+    postgis = spatial_index.backend == "postgis"
+    sql, params = build_query(filters, postgis)
+    # sin PostGIS el bbox se aplica por bloque con shapely
+    area = box(*filters.bbox) if filters.bbox is not None and not postgis else None
+
+    exported = 0
+    with get_conn() as conn:
+        with conn.cursor(name="collected_data_export") as cur:
+            cur.itersize = chunk_size
+            cur.execute(sql, params)
+            while True:
+                with span("db.export_chunk"):
+                    rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if area is not None:
+                    geoms = shapely.from_geojson([r[5] for r in rows], on_invalid="ignore")
+                    keep = shapely.intersects(geoms, area)
+                    rows = [r for r, k in zip(rows, keep) if k]
+                if rows:
+                    exported += len(rows)
+                    yield [ExportRow(*r) for r in rows]
+        conn.commit()
+    logger.info(f"📤 Exportación de collected_data: {exported} filas")
+
+
+def _feature(row: ExportRow) -> str:
+    """Feature GeoJSON armado con los JSON de la BD sin volver a serializarlos
+
+    properties.meta mantiene la forma que acepta /collect/bulk, así que la
+    exportación se puede volver a importar.
+    """
+    props = json.dumps(row.properties(), ensure_ascii=False)[:-1]
+    props += f', "meta": {row.metadata or "null"}'
+    if row.config is not None:
+        props += f', "config": {row.config}'
+    return f'{{"type": "Feature", "id": {row.id}, "geometry": {row.geometry}, "properties": {props}}}}}'
+
+
+def write_ndjson(chunks: Iterable[List[ExportRow]]) -> Iterator[bytes]:
+    """Un Feature por línea"""
+    for rows in chunks:
+        yield "".join(_feature(r) + "\n" for r in rows).encode("utf-8")
+
+
+def write_geojson(chunks: Iterable[List[ExportRow]]) -> Iterator[bytes]:
+    """FeatureCollection emitido por partes: cabecera, bloques de Features y cierre"""
+    yield b'{"type": "FeatureCollection", "features": ['
+    first = True
+    for rows in chunks:
+        body = ",\n".join(_feature(r) for r in rows)
+        yield (("\n" if first else ",\n") + body).encode("utf-8")
+        first = False
+    yield b"\n]}\n"
+
+
+class _ChunkSink:
+    """Archivo de solo escritura que acumula lo escrito hasta que se drena"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _arrow_schema(pa):
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("config_id", pa.int64()),
+        ("config_name", pa.string()),
+        ("step_m", pa.int32()),
+        ("created_at", pa.timestamp("us")),
+        ("meta", pa.string()),
+        ("config", pa.string()),
+        ("geometry", pa.binary()),
+    ])
+    return schema.with_metadata({"geo": json.dumps(_GEO_METADATA)})
+
+
+def _arrow_batch(pa, schema, rows: List[ExportRow]):
+    geoms = shapely.from_geojson([r.geometry for r in rows], on_invalid="ignore")
+    return pa.record_batch([
+        pa.array([r.id for r in rows], pa.int64()),
+        pa.array([r.config_id for r in rows], pa.int64()),
+        pa.array([r.config_name for r in rows], pa.string()),
+        pa.array([r.step_m for r in rows], pa.int32()),
+        pa.array([r.created_at for r in rows], pa.timestamp("us")),
+        pa.array([r.metadata for r in rows], pa.string()),
+        pa.array([r.config for r in rows], pa.string()),
+        pa.array(shapely.to_wkb(geoms).tolist(), pa.binary()),
+    ], schema=schema)
+
+
+def write_columnar(chunks: Iterable[List[ExportRow]], fmt: str) -> Iterator[bytes]:
+    """Arrow IPC (stream) o GeoParquet; cada bloque es un record batch / row group
+
+    La geometría va en WKB con los metadatos "geo" de GeoParquet. Requiere
+    pyarrow (se importa recién aquí; el endpoint verifica antes que exista).
+    """
+    import pyarrow as pa
+
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    for rows in chunks:
+        writer.write_batch(_arrow_batch(pa, schema, rows))
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+def columnar_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def write_export(chunks: Iterable[List[ExportRow]], fmt: str) -> Iterator[bytes]:
+    if fmt == "ndjson":
+        return write_ndjson(chunks)
+    if fmt == "geojson":
+        return write_geojson(chunks)
+    return write_columnar(chunks, fmt)
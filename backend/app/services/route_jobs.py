@@ -0,0 +1,378 @@
+# backend/app/services/route_jobs.py
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+from app.services.job_queue import QueueFull
+from app.services.route_sampling import sample_route_lonlat
+from app.services.terrain_features import extract_terrain_features
+
+logger = logging.getLogger(__name__)
+
+# Estados que se retoman después de un reinicio
+_RESUMABLE = ("queued", "running")
+_FINISHED = ("done", "error", "cancelled")
+
+
+class JobStore:
+    """Estado de los trabajos y elevaciones parciales en SQLite
+
+    Cada bloque de elevaciones terminado se guarda como BLOB (float64, NaN
+    = sin dato), así un reinicio solo repite los bloques pendientes.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS route_jobs (
+                job_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                params TEXT NOT NULL,
+                result TEXT
+            );
+            CREATE TABLE IF NOT EXISTS route_job_chunks (
+                job_id TEXT NOT NULL,
+                chunk INTEGER NOT NULL,
+                elevations BLOB NOT NULL,
+                PRIMARY KEY (job_id, chunk)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def save(self, job: Dict[str, Any], params: Optional[Dict[str, Any]] = None):
+        state = json.dumps({k: v for k, v in job.items() if k != "result"})
+        with self._lock:
+            if params is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO route_jobs (job_id, state, params, result) VALUES (?, ?, ?, NULL)",
+                    (job["job_id"], state, json.dumps(params)),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE route_jobs SET state = ?, result = ? WHERE job_id = ?",
+                    (state, json.dumps(job.get("result")) if job.get("result") is not None else None, job["job_id"]),
+                )
+
+    def save_chunk(self, job_id: str, chunk: int, elevations: np.ndarray):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO route_job_chunks (job_id, chunk, elevations) VALUES (?, ?, ?)",
+                (job_id, chunk, np.asarray(elevations, dtype=np.float64).tobytes()),
+            )
+
+    def load_chunks(self, job_id: str) -> Dict[int, np.ndarray]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk, elevations FROM route_job_chunks WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        return {chunk: np.frombuffer(blob, dtype=np.float64) for chunk, blob in rows}
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT state, params, result FROM route_jobs").fetchall()
+        return [
+            {"job": {**json.loads(state), "result": json.loads(result) if result else None}, "params": json.loads(params)}
+            for state, params, result in rows
+        ]
+
+    def delete(self, job_ids: List[str]):
+        with self._lock:
+            for job_id in job_ids:
+                self._conn.execute("DELETE FROM route_jobs WHERE job_id = ?", (job_id,))
+                self._conn.execute("DELETE FROM route_job_chunks WHERE job_id = ?", (job_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RouteJobScheduler:
+    """Trabajos de análisis de rutas largas en segundo plano
+
+    Un trabajo muestrea la ruta, consulta la elevación por bloques de
+    `chunk_points` puntos y calcula las features del terreno. El progreso
+    (muestras, bloques de elevación, ETA) se publica en memoria para consulta
+    o suscripción y se persiste en SQLite junto con cada bloque terminado:
+    tras un reinicio los trabajos pendientes se retoman sin repetir bloques.
+    Como máximo `max_concurrent` trabajos se ejecutan a la vez.
+    """
+
+    def __init__(self, store_path: str, max_concurrent: int = 2, max_pending: int = 50,
+                 chunk_points: int = 600, ttl_s: float = 24 * 3600):
+        self.store_path = store_path
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_pending = max_pending
+        self.chunk_points = max(1, chunk_points)
+        self.ttl_s = ttl_s
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._params: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._store: Optional[JobStore] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._elevation_service = None
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = JobStore(self.store_path)
+        return self._store
+
+    def _ensure_started(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+
+    async def start(self, elevation_service=None):
+        """Cargar trabajos persistidos y retomar los que quedaron pendientes"""
+        self._ensure_started()
+        self._elevation_service = elevation_service
+        resumed = 0
+        for item in await asyncio.to_thread(self.store.load_all):
+            job, params = item["job"], item["params"]
+            self.jobs[job["job_id"]] = job
+            self._params[job["job_id"]] = params
+            if job["status"] in _RESUMABLE:
+                job["status"] = "queued"
+                job["resumed"] = True
+                self._launch(job["job_id"])
+                resumed += 1
+        await self._purge_expired()
+        if resumed:
+            logger.info(f"Trabajos de rutas retomados tras reinicio: {resumed}")
+
+    def _get_elevation_service(self):
+        if self._elevation_service is None:
+            from app.services.dem_service import get_elevation_service
+            self._elevation_service = get_elevation_service()
+        return self._elevation_service
+
+    def _launch(self, job_id: str):
+        self._changed[job_id] = asyncio.Event()
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+    async def submit(self, coords: List, step_m: float, with_elevation: bool = True) -> str:
+        self._ensure_started()
+        await self._purge_expired()
+        pending = sum(1 for j in self.jobs.values() if j["status"] in _RESUMABLE)
+        if pending >= self.max_pending:
+            raise QueueFull(f"Demasiados trabajos de rutas pendientes ({self.max_pending})")
+
+        job_id = uuid.uuid4().hex
+        # chunk_points va con el trabajo: los bloques persistidos se ubican por índice y un reinicio
+        # con otro ROUTE_JOBS_CHUNK_POINTS los pondría en posiciones equivocadas
+        params = {"coords": [list(c[:2]) for c in coords], "step_m": step_m, "with_elevation": with_elevation,
+                  "chunk_points": self.chunk_points}
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "progress": {"stage": "queued"},
+            "error": None,
+            "result": None,
+        }
+        self.jobs[job_id] = job
+        self._params[job_id] = params
+        await asyncio.to_thread(self.store.save, job, params)
+        self._launch(job_id)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    async def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or job["status"] in _FINISHED:
+            return False
+        job["cancel_requested"] = True
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        return True
+
+    async def watch(self, job_id: str, interval_s: float = 15.0) -> AsyncIterator[Dict[str, Any]]:
+        """Instantáneas del trabajo cada vez que cambia (o cada interval_s como keep-alive)"""
+        while True:
+            # el evento se toma antes de la instantánea: un cambio mientras el consumidor
+            # procesa lo que se le entregó ya lo deja activado y no se pierde
+            event = self._changed.get(job_id)
+            job = self.get(job_id)
+            if job is None:
+                return
+            yield job
+            if job["status"] in _FINISHED:
+                return
+            if event is None:
+                await asyncio.sleep(interval_s)
+                continue
+            try:
+                await asyncio.wait_for(event.wait(), timeout=interval_s)
+            except asyncio.TimeoutError:
+                pass
+
+    def _update(self, job_id: str, **progress):
+        job = self.jobs[job_id]
+        job["progress"] = {**job["progress"], **progress}
+        # un evento por cambio: se activa y se reemplaza, nunca se limpia, así ningún
+        # suscriptor le quita la notificación a los demás
+        event = self._changed.get(job_id)
+        if event is not None:
+            event.set()
+            self._changed[job_id] = asyncio.Event()
+
+    async def _persist(self, job_id: str):
+        # copia: el trabajo sigue cambiando en el loop mientras el hilo lo serializa
+        await asyncio.to_thread(self.store.save, dict(self.jobs[job_id]))
+
+    async def _run(self, job_id: str):
+        job = self.jobs[job_id]
+        params = self._params[job_id]
+        chunk_points = params.get("chunk_points", self.chunk_points)
+        try:
+            async with self._slots:
+                if job.get("cancel_requested"):
+                    raise asyncio.CancelledError
+                job["status"] = "running"
+                job["started_at"] = job["started_at"] or time.time()
+                started = time.time()
+
+                # 1) muestreo (CPU) fuera del event loop
+                self._update(job_id, stage="sampling")
+                await self._persist(job_id)
+                length, _, lat, lon = await asyncio.to_thread(sample_route_lonlat, params["coords"], params["step_m"])
+                n = len(lat)
+                n_chunks = math.ceil(n / chunk_points) if params["with_elevation"] else 0
+                self._update(job_id, stage="elevation", samples_total=n, samples_done=0,
+                             batches_total=n_chunks, batches_done=0, batches_failed=0, eta_s=None)
+
+                # 2) elevación por bloques; los ya persistidos (reinicio) no se repiten
+                z = np.full(n, np.nan)
+                done = await asyncio.to_thread(self.store.load_chunks, job_id) if n_chunks else {}
+                for chunk, values in list(done.items()):
+                    start, end = chunk * chunk_points, min((chunk + 1) * chunk_points, n)
+                    if len(values) != end - start:
+                        # bloque de otra partición (trabajo anterior a guardar chunk_points): se vuelve a consultar
+                        del done[chunk]
+                        continue
+                    z[start:end] = values
+                fetched_points = 0
+                failed_chunks = 0
+                for chunk in range(n_chunks):
+                    start, end = chunk * chunk_points, min((chunk + 1) * chunk_points, n)
+                    if chunk not in done:
+                        profile = await self._get_elevation_service().get_elevation_profile(
+                            list(zip(lat[start:end].tolist(), lon[start:end].tolist())), with_stats=False
+                        )
+                        elevations = profile.get("elevations") or []
+                        if len(elevations) != end - start:
+                            elevations = [None] * (end - start)
+                        values = np.array([np.nan if e is None else e for e in elevations], dtype=float)
+                        z[start:end] = values
+                        fetched_points += end - start
+                        if np.isfinite(values).any() and not profile.get("failed_batches"):
+                            await asyncio.to_thread(self.store.save_chunk, job_id, chunk, values)
+                        else:
+                            # bloque fallido: no se persiste, un reinicio lo vuelve a consultar
+                            failed_chunks += 1
+                    samples_done = end
+                    # ETA a partir del ritmo de los bloques consultados en esta ejecución
+                    elapsed = time.time() - started
+                    rate = fetched_points / elapsed if fetched_points and elapsed > 0 else None
+                    self._update(
+                        job_id,
+                        samples_done=samples_done,
+                        batches_done=chunk + 1,
+                        batches_failed=failed_chunks,
+                        eta_s=round((n - samples_done) / rate, 1) if rate else None,
+                    )
+                    await self._persist(job_id)
+
+                # 3) features del terreno
+                self._update(job_id, stage="features", samples_done=n, eta_s=0)
+                terrain = await asyncio.to_thread(extract_terrain_features, lat, lon, z)
+                job["result"] = {
+                    "original_length_m": round(length, 2),
+                    "n_samples": n,
+                    "batches_failed": failed_chunks,
+                    "statistics": terrain.summary() if n_chunks else {"longitud_m": round(terrain.length_m, 2)},
+                    # columnas compactas en lugar de un objeto por muestra
+                    "samples": {
+                        "lat": np.round(lat, 6).tolist(),
+                        "lon": np.round(lon, 6).tolist(),
+                        "elevation": [None if not np.isfinite(v) else round(v, 2) for v in z.tolist()] if n_chunks else None,
+                    },
+                }
+                job["status"] = "done"
+        except asyncio.CancelledError:
+            if not job.get("cancel_requested"):
+                # apagado del servidor: el estado persistido queda como "running" y se retoma
+                raise
+            job["status"] = "cancelled"
+        except Exception as e:
+            logger.error(f"Trabajo de ruta {job_id} falló: {e}")
+            job["status"] = "error"
+            job["error"] = str(e)
+        finally:
+            if job["status"] in _FINISHED:
+                job["finished_at"] = time.time()
+                self._update(job_id, stage=job["status"])
+                self._tasks.pop(job_id, None)
+                await self._persist(job_id)
+
+    async def _purge_expired(self):
+        limit = time.time() - self.ttl_s
+        expired = [k for k, j in self.jobs.items() if j.get("finished_at") and j["finished_at"] < limit]
+        for k in expired:
+            self.jobs.pop(k, None)
+            self._params.pop(k, None)
+            self._changed.pop(k, None)
+        if expired:
+            await asyncio.to_thread(self.store.delete, expired)
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for j in self.jobs.values():
+            counts[j["status"]] = counts.get(j["status"], 0) + 1
+        return {"max_concurrent": self.max_concurrent, "chunk_points": self.chunk_points, "jobs": counts}
+
+    async def shutdown(self):
+        tasks = list(self._tasks.values())
+        for t in tasks:
+            t.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = {}
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+
+def _create_scheduler() -> RouteJobScheduler:
+    from app.core.config import BACKEND_DIR, get_settings
+    settings = get_settings()
+    return RouteJobScheduler(
+        str(BACKEND_DIR / settings.ROUTE_JOBS_DB_PATH),
+        max_concurrent=settings.ROUTE_JOBS_MAX_CONCURRENT,
+        max_pending=settings.ROUTE_JOBS_MAX_PENDING,
+        chunk_points=settings.ROUTE_JOBS_CHUNK_POINTS,
+        ttl_s=settings.ROUTE_JOBS_TTL_S,
+    )
+
+
+route_jobs = _create_scheduler()
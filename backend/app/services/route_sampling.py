@@ -0,0 +1,84 @@
+# backend/app/services/route_sampling.py
+from pyproj import Transformer
+import shapely
+from typing import Tuple
+import numpy as np
+import math
+
+# transformers (WGS84 <-> WebMercator (m))
+_to_3857 = Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
+_to_4326 = Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
+
+
+def project_coords_to_3857(coords) -> np.ndarray:
+    """Proyecta un arreglo (N, 2) de lon,lat a x,y en metros con una sola llamada"""
+    lonlat = np.asarray(coords, dtype=float).reshape(-1, 2)
+    x, y = _to_3857.transform(lonlat[:, 0], lonlat[:, 1])
+    return np.column_stack((x, y))
+
+
+def reproject_coords_to_latlon(xy) -> Tuple[np.ndarray, np.ndarray]:
+    """Reproyecta un arreglo (N, 2) de x,y en metros a (lat, lon) en una sola llamada"""
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    lon, lat = _to_4326.transform(xy[:, 0], xy[:, 1])
+    return np.asarray(lat), np.asarray(lon)
+
+
+def cumulative_distances(xy: np.ndarray) -> np.ndarray:
+    """Distancia acumulada (m) en cada vértice de la polilínea"""
+    if len(xy) == 0:
+        return np.zeros(0)
+    seg = np.hypot(np.diff(xy[:, 0]), np.diff(xy[:, 1]))
+    return np.concatenate(([0.0], np.cumsum(seg)))
+
+
+def interpolate_at(xy: np.ndarray, cum: np.ndarray, dists: np.ndarray) -> np.ndarray:
+    """Interpola puntos a las distancias dadas sobre la polilínea (equivale a LineString.interpolate)"""
+    dists = np.clip(np.asarray(dists, dtype=float), 0.0, cum[-1])
+    # side="right" salta los segmentos de longitud cero igual que shapely
+    idx = np.searchsorted(cum, dists, side="right") - 1
+    idx = np.clip(idx, 0, len(xy) - 2)
+    seg_len = cum[idx + 1] - cum[idx]
+    safe_len = np.where(seg_len > 0, seg_len, 1.0)
+    t = np.where(seg_len > 0, (dists - cum[idx]) / safe_len, 0.0)
+    t = np.clip(t, 0.0, 1.0)[:, None]
+    return xy[idx] + t * (xy[idx + 1] - xy[idx])
+
+
+def sample_coords_by_meters(xy, step_m: float) -> np.ndarray:
+    """Muestrea una polilínea (N, 2) en metros cada step_m; devuelve un arreglo (M, 2)"""
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    if len(xy) < 2:
+        return np.zeros((0, 2))
+    cum = cumulative_distances(xy)
+    length = float(cum[-1])
+    if length == 0:
+        return np.zeros((0, 2))
+    n = max(2, int(math.ceil(length / step_m)) + 1)
+    dists = np.minimum(np.arange(n) * step_m, length)
+    samples = interpolate_at(xy, cum, dists)
+    # asegurar que el último punto sea exactamente el final de la línea
+    samples[-1] = xy[-1]
+    return samples
+
+
+def sample_route_lonlat(coords, step_m: float):
+    """Pipeline completo: lon,lat -> metros -> muestras -> lat,lon
+
+    Devuelve (longitud_m, samples_xy, lat, lon) usando solo operaciones sobre arreglos.
+    """
+    xy = project_coords_to_3857(coords)
+    cum = cumulative_distances(xy)
+    length = float(cum[-1]) if len(cum) else 0.0
+    samples_xy = sample_coords_by_meters(xy, step_m)
+    lat, lon = reproject_coords_to_latlon(samples_xy)
+    return length, samples_xy, lat, lon
+
+
+def simplify_coords(xy, tolerance_m: float) -> np.ndarray:
+    """Douglas-Peucker sobre una polilínea (N, 2) en metros; conserva los extremos"""
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    if len(xy) < 3 or tolerance_m <= 0:
+        return xy
+    simplified = shapely.simplify(shapely.linestrings(xy), tolerance_m, preserve_topology=False)
+    return shapely.get_coordinates(simplified)
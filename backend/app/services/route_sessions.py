@@ -0,0 +1,234 @@
+# backend/app/services/route_sessions.py
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.result_cache import ResultCache
+from app.services.route_sampling import project_coords_to_3857, reproject_coords_to_latlon
+from app.services.terrain_features import extract_terrain_features, geodesic_distances
+
+logger = logging.getLogger(__name__)
+
+# Vértices con diferencias menores (grados) se consideran iguales al comparar ediciones
+_VERTEX_EPS = 1e-9
+
+
+@dataclass
+class _Segment:
+    """Muestras de un segmento (vértice i -> i+1), sin incluir el vértice final
+
+    `step_len` es la distancia geodésica de cada muestra a la siguiente
+    (la última llega al vértice final), así el segmento no depende de sus
+    vecinos y se puede reutilizar tal cual.
+    """
+    lat: np.ndarray
+    lon: np.ndarray
+    z: np.ndarray
+    step_len: np.ndarray
+
+
+@dataclass
+class RouteSession:
+    session_id: str
+    step_m: float
+    coords: np.ndarray  # (N, 2) lon, lat
+    segments: List[_Segment]
+    tail: _Segment  # el último vértice de la ruta
+    with_elevation: bool = True
+    version: int = 0
+    updated_at: float = field(default_factory=time.time)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+def diff_vertices(old: np.ndarray, new: np.ndarray) -> Tuple[int, int]:
+    """Largo del prefijo y del sufijo de vértices comunes (sin solaparse)"""
+    n = min(len(old), len(new))
+    same_head = np.all(np.abs(old[:n] - new[:n]) <= _VERTEX_EPS, axis=1)
+    prefix = n if same_head.all() else int(np.argmin(same_head))
+    same_tail = np.all(np.abs(old[::-1][:n] - new[::-1][:n]) <= _VERTEX_EPS, axis=1)
+    suffix = n if same_tail.all() else int(np.argmin(same_tail))
+    return prefix, min(suffix, n - prefix)
+
+
+def _sample_segments(coords: np.ndarray, step_m: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Muestras de todos los segmentos de `coords` cada step_m desde el inicio de cada segmento
+
+    Devuelve (lat, lon, segmento de cada muestra) en una sola pasada vectorizada.
+    """
+    xy = project_coords_to_3857(coords)
+    delta = np.diff(xy, axis=0)
+    length = np.hypot(delta[:, 0], delta[:, 1])
+    counts = np.maximum(1, np.ceil(length / step_m).astype(int))
+    seg = np.repeat(np.arange(len(length)), counts)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    local = np.arange(counts.sum()) - np.repeat(offsets, counts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frac = np.where(length[seg] > 0, local * step_m / length[seg], 0.0)
+    samples = xy[seg] + np.clip(frac, 0.0, 1.0)[:, None] * delta[seg]
+    lat, lon = reproject_coords_to_latlon(samples)
+    return lat, lon, seg
+
+
+async def _elevations(elevation_service, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    if elevation_service is None or not len(lat):
+        return np.full(len(lat), np.nan)
+    profile = await elevation_service.get_elevation_profile(list(zip(lat.tolist(), lon.tolist())), with_stats=False)
+    z = profile.get("elevations") or []
+    if len(z) != len(lat):
+        return np.full(len(lat), np.nan)
+    return np.array([np.nan if e is None else e for e in z], dtype=float)
+
+
+async def _build_segments(coords: np.ndarray, step_m: float, elevation_service, with_tail: bool):
+    """Muestrear, consultar elevación y medir los segmentos de `coords` (una llamada al proveedor)"""
+    if len(coords) >= 2:
+        lat, lon, seg = _sample_segments(coords, step_m)
+    else:
+        lat = lon = np.zeros(0)
+        seg = np.zeros(0, dtype=int)
+    if with_tail:
+        lat = np.append(lat, coords[-1, 1])
+        lon = np.append(lon, coords[-1, 0])
+    z = await _elevations(elevation_service, lat, lon)
+
+    n = len(seg)
+    # siguiente punto de cada muestra: la muestra siguiente o el vértice final de su segmento
+    last_in_seg = np.append(seg[1:] != seg[:-1], True) if n else np.zeros(0, dtype=bool)
+    next_lat = np.where(last_in_seg, coords[seg + 1, 1] if n else 0.0, np.append(lat[1:n], 0.0))
+    next_lon = np.where(last_in_seg, coords[seg + 1, 0] if n else 0.0, np.append(lon[1:n], 0.0))
+    step_len = geodesic_distances(lat[:n], lon[:n], next_lat, next_lon)
+
+    bounds = np.flatnonzero(np.diff(seg)) + 1 if n else []
+    segments = [
+        _Segment(lat=a, lon=b, z=c, step_len=d)
+        for a, b, c, d in zip(np.split(lat[:n], bounds), np.split(lon[:n], bounds), np.split(z[:n], bounds), np.split(step_len, bounds))
+    ] if n else []
+    tail = _Segment(lat=lat[n:], lon=lon[n:], z=z[n:], step_len=np.zeros(0)) if with_tail else None
+    return segments, tail, len(lat)
+
+
+class RouteSessionStore:
+    """Sesiones de edición de rutas con re-análisis incremental
+
+    La sesión guarda, por cada segmento de la ruta, sus muestras, elevaciones
+    y longitudes geodésicas. Al recibir la geometría editada se compara con la
+    anterior (prefijo y sufijo de vértices comunes) y solo se muestrean y
+    consultan los segmentos que cambiaron; el resto se reutiliza. Las
+    features del terreno se recalculan sobre los arreglos ya ensamblados.
+    """
+
+    def __init__(self, max_sessions: int = 256, ttl_s: float = 3600, elevation_service=None):
+        self._sessions = ResultCache(max_entries=max_sessions, ttl_s=ttl_s)
+        self._elevation_service = elevation_service
+
+    def _get_elevation_service(self):
+        if self._elevation_service is None:
+            from app.services.dem_service import get_elevation_service
+            self._elevation_service = get_elevation_service()
+        return self._elevation_service
+
+    async def create(self, coords, step_m: float, with_elevation: bool = True) -> Dict[str, Any]:
+        coords = np.asarray(coords, dtype=float)[:, :2]
+        service = self._get_elevation_service() if with_elevation else None
+        segments, tail, fetched = await _build_segments(coords, step_m, service, with_tail=True)
+        session = RouteSession(
+            session_id=uuid.uuid4().hex, step_m=step_m, coords=coords,
+            segments=segments, tail=tail, with_elevation=with_elevation,
+        )
+        self._sessions.set(session.session_id, session)
+        return self._result(session, {
+            "segments_reused": 0,
+            "segments_recomputed": len(segments),
+            "points_fetched": fetched,
+        })
+
+    def get(self, session_id: str) -> Optional[RouteSession]:
+        return self._sessions.get(session_id)
+
+    async def update(self, session_id: str, coords) -> Optional[Dict[str, Any]]:
+        session = self.get(session_id)
+        if session is None:
+            return None
+        new = np.asarray(coords, dtype=float)[:, :2]
+        service = self._get_elevation_service() if session.with_elevation else None
+
+        async with session.lock:
+            started = time.perf_counter()
+            old = session.coords
+            prefix, suffix = diff_vertices(old, new)
+            # segmentos con ambos extremos dentro del prefijo/sufijo común
+            keep_head = max(prefix - 1, 0)
+            keep_tail = max(suffix - 1, 0)
+            start, stop = keep_head, len(new) - 1 - keep_tail
+
+            # incluir el vértice final de la zona cambiada para muestrear sus segmentos
+            tail_changed = bool(np.any(np.abs(old[-1] - new[-1]) > _VERTEX_EPS))
+            changed = new[start:stop + 1] if stop > start else new[start:start + 1]
+            middle, tail, fetched = await _build_segments(
+                changed, session.step_m, service, with_tail=tail_changed
+            )
+            if stop <= start:
+                middle = []
+
+            session.segments = session.segments[:keep_head] + middle + (
+                session.segments[len(session.segments) - keep_tail:] if keep_tail else []
+            )
+            if tail_changed:
+                session.tail = tail
+            session.coords = new
+            session.version += 1
+            session.updated_at = time.time()
+            self._sessions.set(session_id, session)
+
+            return self._result(session, {
+                "common_prefix_vertices": prefix,
+                "common_suffix_vertices": suffix,
+                "segments_reused": keep_head + keep_tail,
+                "segments_recomputed": len(middle),
+                "points_fetched": fetched,
+                "elapsed_ms": round(1000 * (time.perf_counter() - started), 2),
+            })
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id)
+
+    @staticmethod
+    def _assemble(session: RouteSession):
+        parts = session.segments + [session.tail]
+        lat = np.concatenate([s.lat for s in parts])
+        lon = np.concatenate([s.lon for s in parts])
+        z = np.concatenate([s.z for s in parts])
+        step_len = np.concatenate([s.step_len for s in session.segments]) if session.segments else np.zeros(0)
+        return lat, lon, z, step_len
+
+    def _result(self, session: RouteSession, incremental: Dict[str, Any]) -> Dict[str, Any]:
+        lat, lon, z, step_len = self._assemble(session)
+        terrain = extract_terrain_features(lat, lon, z, seg_len_m=step_len)
+        return {
+            "session_id": session.session_id,
+            "version": session.version,
+            "step_m": session.step_m,
+            "n_vertices": len(session.coords),
+            "n_samples": len(lat),
+            "statistics": terrain.summary(),
+            "incremental": incremental,
+            "samples": {
+                "lat": np.round(lat, 6).tolist(),
+                "lon": np.round(lon, 6).tolist(),
+                "elevation": [None if not np.isfinite(v) else round(v, 2) for v in z.tolist()],
+            },
+        }
+
+
+def _create_store() -> RouteSessionStore:
+    from app.core.config import get_settings
+    settings = get_settings()
+    return RouteSessionStore(max_sessions=settings.ROUTE_SESSIONS_MAX, ttl_s=settings.ROUTE_SESSIONS_TTL_S)
+
+
+route_sessions = _create_store()
@@ -0,0 +1,303 @@
+# backend/app/services/rule_engine.py
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import yaml
+
+logger = logging.getLogger(__name__)
+
+_LEVELS = {"INFO": 0, "WARNING": 1, "CRITICAL": 2}
+_NUMERIC_OPS = {"BETWEEN", ">", ">=", "<", "<=", "=="}
+
+
+@dataclass
+class Rule:
+    id: str
+    nombre: str
+    categoria: str
+    nivel: str
+    condicion: Dict[str, Any]
+    alerta: Dict[str, Any]
+    recomendaciones: List[str]
+    impacto: Dict[str, Any]
+
+    @property
+    def costo_pct(self) -> float:
+        # R007 expresa el ahorro como reduccion_costo_pct negativo
+        return float(self.impacto.get("incremento_costo_pct", 0) or 0) + float(self.impacto.get("reduccion_costo_pct", 0) or 0)
+
+    @property
+    def score(self) -> float:
+        return float(self.impacto.get("score_complejidad", 0) or 0)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "nombre": self.nombre,
+            "categoria": self.categoria,
+            "nivel": self.nivel,
+            "mensaje": self.alerta.get("mensaje"),
+            "recomendaciones": self.recomendaciones,
+            "impacto": self.impacto,
+        }
+
+
+@dataclass
+class _NumericGroup:
+    """Reglas numéricas de una misma variable como intervalos en arreglos"""
+    rules: List[Rule] = field(default_factory=list)
+    lo: Optional[np.ndarray] = None
+    hi: Optional[np.ndarray] = None
+    lo_incl: Optional[np.ndarray] = None
+    hi_incl: Optional[np.ndarray] = None
+
+
+@dataclass
+class _CompiledRuleBase:
+    metadata: Dict[str, Any]
+    rules: List[Rule]
+    numeric: Dict[str, _NumericGroup]
+    categorical: Dict[str, List[Rule]]
+    general: List[Rule]
+    skipped: List[Rule]
+    costo: np.ndarray
+    score: np.ndarray
+    index: Dict[str, int]
+
+
+def _interval(op: str, valores: List[Any]):
+    """Cada operador numérico como intervalo (lo, hi, lo inclusivo, hi inclusivo)"""
+    if op == "BETWEEN":
+        return float(valores[0]), float(valores[1]), True, True
+    v = float(valores[0])
+    return {
+        ">": (v, np.inf, False, False),
+        ">=": (v, np.inf, True, False),
+        "<": (-np.inf, v, False, False),
+        "<=": (-np.inf, v, False, True),
+        "==": (v, v, True, True),
+    }[op]
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def compile_rules(data: Dict[str, Any]) -> _CompiledRuleBase:
+    """Compilar el YAML a un índice por variable listo para evaluación vectorizada"""
+    metadata = data.get("metadata", {}) or {}
+    rules: List[Rule] = []
+    for categoria, items in data.items():
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            rules.append(Rule(
+                id=item["id"],
+                nombre=item.get("nombre", item["id"]),
+                categoria=categoria,
+                nivel=str(item.get("nivel", "INFO")).upper(),
+                condicion=item.get("condicion", {}) or {},
+                alerta=item.get("alerta", {}) or {},
+                recomendaciones=item.get("recomendaciones", []) or [],
+                impacto=item.get("impacto", {}) or {},
+            ))
+
+    numeric: Dict[str, _NumericGroup] = {}
+    categorical: Dict[str, List[Rule]] = {}
+    general: List[Rule] = []
+    skipped: List[Rule] = []
+    region = f"{metadata.get('region', '')} {metadata.get('clima', '')}".lower()
+
+    for rule in rules:
+        cond = rule.condicion
+        variable = cond.get("variable")
+        op = str(cond.get("operador", "")).upper()
+        valores = cond.get("valores", [])
+        if variable:
+            if op in _NUMERIC_OPS and valores and all(_is_number(v) for v in valores):
+                numeric.setdefault(variable, _NumericGroup()).rules.append(rule)
+            elif op in ("==", "IN"):
+                categorical.setdefault(variable, []).append(rule)
+            else:
+                logger.warning(f"⚠️ Regla {rule.id}: operador no soportado {op!r}")
+                skipped.append(rule)
+        elif cond.get("aplica_siempre") or (cond.get("region") and str(cond["region"]).lower() in region):
+            general.append(rule)
+        else:
+            # p.ej. tipo "calculado": lo resuelven otras etapas del análisis
+            skipped.append(rule)
+
+    for group in numeric.values():
+        bounds = [_interval(str(r.condicion["operador"]).upper(), r.condicion["valores"]) for r in group.rules]
+        # rangos que se tocan (BETWEEN [0, 5] y [5, 10]): el límite pertenece solo al de arriba,
+        # si no un valor justo en el borde cumpliría ambas reglas y sumaría los dos costos
+        starts = {lo for lo, _, lo_incl, _ in bounds if lo_incl}
+        bounds = [(lo, hi, lo_incl, hi_incl and not (hi in starts and lo < hi)) for lo, hi, lo_incl, hi_incl in bounds]
+        group.lo = np.array([b[0] for b in bounds])
+        group.hi = np.array([b[1] for b in bounds])
+        group.lo_incl = np.array([b[2] for b in bounds])
+        group.hi_incl = np.array([b[3] for b in bounds])
+
+    return _CompiledRuleBase(
+        metadata=metadata,
+        rules=rules,
+        numeric=numeric,
+        categorical=categorical,
+        general=general,
+        skipped=skipped,
+        costo=np.array([r.costo_pct for r in rules]),
+        score=np.array([r.score for r in rules]),
+        index={r.id: i for i, r in enumerate(rules)},
+    )
+
+
+class RuleEngine:
+    """Motor del sistema experto (reglas ITU-T/ARCOTEL)
+
+    Carga y compila el YAML una vez; antes de cada evaluación compara el
+    mtime del archivo y recompila si cambió (si el YAML nuevo es inválido se
+    conserva la versión anterior). La evaluación recibe features por segmento
+    como arreglos NumPy (o escalares de la ruta) y evalúa todas las reglas de
+    una variable a la vez con broadcasting (segmentos × reglas).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._compiled: Optional[_CompiledRuleBase] = None
+        self.reload(force=True)
+
+    def reload(self, force: bool = False) -> bool:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            if self._compiled is None:
+                logger.error(f"Archivo de reglas no encontrado: {e}")
+            return False
+        if not force and mtime == self._mtime:
+            return False
+        with self._lock:
+            if not force and mtime == self._mtime:
+                return False
+            try:
+                with open(self.path, encoding="utf-8") as fh:
+                    data = yaml.safe_load(fh)
+                if not isinstance(data, dict):
+                    raise ValueError("el archivo no contiene un mapeo YAML")
+                compiled = compile_rules(data)
+                if not compiled.rules:
+                    raise ValueError("el archivo no contiene reglas")
+            except Exception as e:
+                logger.error(f"Error compilando reglas ({self.path}): {e}")
+                self._mtime = mtime
+                return False
+            self._compiled = compiled
+            self._mtime = mtime
+            logger.info(f"✅ Reglas compiladas: {len(compiled.rules)} ({self.path})")
+            return True
+
+    @property
+    def rules(self) -> List[Rule]:
+        return self._compiled.rules if self._compiled else []
+
+    def evaluate(self, features: Dict[str, Any], max_segments: int = 20,
+                 weights: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Evaluar la base de reglas
+
+        `features` mapea variable -> escalar (valor de toda la ruta) o arreglo
+        de longitud N (un valor por segmento). Los NaN/None no cumplen ninguna
+        condición. `weights` (p.ej. longitud de cada segmento) pondera el
+        impacto de la ruta; sin pesos todos los segmentos valen lo mismo.
+        Devuelve las reglas cumplidas, en cuántos segmentos, el impacto
+        agregado y el costo/score acumulado por segmento.
+        """
+        self.reload()
+        compiled = self._compiled
+        if compiled is None:
+            return {"matched": [], "n_segments": 0, "impacto": {}}
+
+        n = max([np.size(v) for v in features.values() if isinstance(v, (list, tuple, np.ndarray))] or [1])
+        n_rules = len(compiled.rules)
+        matches = np.zeros((n, n_rules), dtype=bool)
+
+        for variable, group in compiled.numeric.items():
+            if variable not in features or features[variable] is None:
+                continue
+            x = np.asarray(features[variable], dtype=float).reshape(-1)
+            x = np.broadcast_to(x, (n,))[:, None]
+            ok = ((x > group.lo) | (group.lo_incl & (x == group.lo))) & \
+                 ((x < group.hi) | (group.hi_incl & (x == group.hi)))
+            cols = [compiled.index[r.id] for r in group.rules]
+            matches[:, cols] |= ok
+
+        for variable, rules in compiled.categorical.items():
+            if variable not in features or features[variable] is None:
+                continue
+            x = np.broadcast_to(np.asarray(features[variable], dtype=object).reshape(-1), (n,))
+            for rule in rules:
+                matches[:, compiled.index[rule.id]] = np.isin(x, rule.condicion.get("valores", []))
+
+        for rule in compiled.general:
+            matches[:, compiled.index[rule.id]] = True
+
+        w = np.ones(n) if weights is None else np.broadcast_to(np.asarray(weights, dtype=float).reshape(-1), (n,))
+        w = w / w.sum() if w.sum() > 0 else np.full(n, 1.0 / n)
+
+        counts = matches.sum(axis=0)
+        hit = np.flatnonzero(counts)
+        matched = []
+        for i in hit:
+            rule = compiled.rules[i]
+            item = rule.summary()
+            item["segmentos"] = int(counts[i])
+            item["fraccion_segmentos"] = round(float(counts[i]) / n, 4)
+            if weights is not None:
+                item["fraccion_longitud"] = round(float(w[matches[:, i]].sum()), 4)
+            if n > 1:
+                item["indices_segmentos"] = np.flatnonzero(matches[:, i])[:max_segments].tolist()
+            matched.append(item)
+        matched.sort(key=lambda r: (-_LEVELS.get(r["nivel"], 0), r["id"]))
+
+        materiales: List[str] = []
+        for i in hit:
+            for m in compiled.rules[i].impacto.get("materiales_especiales", []) or []:
+                if m not in materiales:
+                    materiales.append(m)
+
+        seg_cost = matches @ compiled.costo
+        seg_score = matches @ compiled.score
+        levels = [compiled.rules[i].nivel for i in hit]
+        return {
+            "n_segments": int(n),
+            "matched": matched,
+            "skipped": [r.id for r in compiled.skipped],
+            "impacto": {
+                # promedio sobre la ruta: cada segmento aporta la suma de sus reglas según su peso
+                "incremento_costo_pct": round(float(seg_cost @ w), 4),
+                "score_complejidad": round(float(seg_score @ w), 4),
+                "nivel_maximo": max(levels, key=lambda l: _LEVELS.get(l, 0)) if levels else None,
+                "materiales_especiales": materiales,
+                "costo_pct_segmento_max": float(seg_cost.max()) if n else 0.0,
+                "score_segmento_max": float(seg_score.max()) if n else 0.0,
+            },
+            "segmentos": {
+                "costo_pct": seg_cost,
+                "score": seg_score,
+            },
+        }
+
+
+_rule_engine: Optional[RuleEngine] = None
+
+
+def get_rule_engine() -> RuleEngine:
+    global _rule_engine
+    if _rule_engine is None:
+        from app.core.config import get_settings
+        _rule_engine = RuleEngine(get_settings().RULES_PATH)
+    return _rule_engine
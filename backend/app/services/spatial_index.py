@@ -0,0 +1,260 @@
+# backend/app/services/spatial_index.py
+"""Índice espacial de collected_data (PostGIS o STRtree en memoria).
+
+El esquema PostGIS (extensión, columna geom, trigger, backfill e índice
+GIST) es una migración que se aplica una sola vez:
+    python -m app.services.spatial_index --migrate
+Al arrancar solo se detecta si esa migración está aplicada.
+"""
+import argparse
+import logging
+import itertools
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pyproj import Geod
+import shapely
+from shapely import STRtree
+from shapely.geometry import box, shape, Point
+
+from app.core.database import get_conn
+from app.services.route_sampling import project_coords_to_3857
+
+logger = logging.getLogger(__name__)
+
+_geod = Geod(ellps="WGS84")
+
+# Migración PostGIS: columna geom sincronizada por trigger desde geojson + índice GIST
+POSTGIS_SCHEMA_SQL = """
+CREATE EXTENSION IF NOT EXISTS postgis;
+
+ALTER TABLE collected_data ADD COLUMN IF NOT EXISTS geom geometry(Geometry, 4326);
+
+CREATE OR REPLACE FUNCTION collected_data_set_geom() RETURNS trigger AS $$
+BEGIN
+    NEW.geom := ST_SetSRID(ST_GeomFromGeoJSON(COALESCE(NEW.geojson->'geometry', NEW.geojson)::text), 4326);
+    RETURN NEW;
+EXCEPTION WHEN others THEN
+    NEW.geom := NULL;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS collected_data_geom_trg ON collected_data;
+CREATE TRIGGER collected_data_geom_trg
+    BEFORE INSERT OR UPDATE OF geojson ON collected_data
+    FOR EACH ROW EXECUTE FUNCTION collected_data_set_geom();
+
+UPDATE collected_data SET geojson = geojson WHERE geom IS NULL;
+
+CREATE INDEX IF NOT EXISTS collected_data_geom_gist ON collected_data USING GIST (geom);
+"""
+
+# Solo lectura de catálogos: ¿está aplicada la migración?
+POSTGIS_DETECT_SQL = """
+SELECT
+    EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'postgis'),
+    EXISTS (SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'collected_data' AND column_name = 'geom'),
+    EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'collected_data_geom_trg')
+"""
+
+# filas nuevas que se revisan sin árbol antes de reconstruirlo
+_TAIL_MIN = 256
+_TAIL_FRACTION = 0.1
+
+_SUMMARY_COLUMNS = """
+    id, config_id, step_m, created_at,
+    ROUND(ST_Length(geom::geography)::numeric, 2) AS length_m,
+    ST_NPoints(geom) AS n_points,
+    ST_XMin(geom) AS min_lon, ST_YMin(geom) AS min_lat,
+    ST_XMax(geom) AS max_lon, ST_YMax(geom) AS max_lat
+"""
+
+
+def _meters_to_degrees(distance_m: float, lat: float) -> float:
+    """Margen en grados que cubre distance_m en ambos ejes a esa latitud"""
+    return distance_m / (111_320.0 * max(math.cos(math.radians(lat)), 0.01))
+
+
+def _summary(route_id: int, config_id, step_m, created_at, geom) -> Dict:
+    lon, lat = np.asarray(geom.coords).T if geom.geom_type == "LineString" else (np.array([]), np.array([]))
+    length_m = float(_geod.line_length(lon, lat)) if len(lon) > 1 else 0.0
+    min_lon, min_lat, max_lon, max_lat = geom.bounds
+    return {
+        "id": route_id,
+        "config_id": config_id,
+        "step_m": step_m,
+        "created_at": created_at.isoformat() if created_at else None,
+        "length_m": round(length_m, 2),
+        "n_points": len(lon),
+        "bbox": [min_lon, min_lat, max_lon, max_lat],
+    }
+
+
+class RouteSpatialIndex:
+    """Consultas espaciales sobre collected_data
+
+    Usa PostGIS (columna geom + índice GIST) si la migración está aplicada;
+    si no, mantiene en memoria un STRtree de Shapely. Las filas nuevas (id
+    creciente) se agregan antes de cada consulta a una cola que se revisa
+    sin árbol; el árbol se reconstruye solo cuando esa cola crece demasiado.
+    """
+
+    def __init__(self):
+        self.backend: Optional[str] = None
+        self._lock = threading.Lock()
+        # respaldo en memoria
+        self._ids: List[int] = []
+        self._geoms: list = []
+        self._summaries: Dict[int, Dict] = {}
+        self._tree: Optional[STRtree] = None
+        self._tree_count = 0  # geometrías cubiertas por el árbol; el resto es la cola
+        self._last_id = 0
+
+    def initialize(self):
+        """Detectar si la migración PostGIS está aplicada; si no, construir el índice en memoria"""
+        with self._lock:
+            if self.backend is not None:
+                return
+            with get_conn() as conn, conn.cursor() as cur:
+                cur.execute(POSTGIS_DETECT_SQL)
+                extension, column, trigger = cur.fetchone()
+                conn.commit()
+            if extension and column and trigger:
+                self.backend = "postgis"
+                logger.info("✅ Índice espacial: PostGIS (GIST sobre collected_data.geom)")
+                return
+            if extension:
+                logger.warning("⚠️ PostGIS instalado pero sin migrar (python -m app.services.spatial_index --migrate); usando STRtree en memoria")
+            else:
+                logger.warning("⚠️ PostGIS no disponible; usando STRtree en memoria")
+            self._refresh_locked()
+            self.backend = "strtree"
+
+    def _refresh_locked(self):
+        """Cargar al índice en memoria las filas con id mayor al último visto"""
+        added = 0
+        with get_conn() as conn:
+            with conn.cursor(name="spatial_index_load") as cur:
+                cur.itersize = 500
+                cur.execute(
+                    "SELECT id, config_id, step_m, created_at, geojson FROM collected_data WHERE id > %s ORDER BY id",
+                    (self._last_id,),
+                )
+                for route_id, config_id, step_m, created_at, geojson in cur:
+                    self._last_id = max(self._last_id, route_id)
+                    try:
+                        geom = shape(geojson)
+                    except Exception:
+                        continue
+                    if geom.is_empty:
+                        continue
+                    self._ids.append(route_id)
+                    self._geoms.append(geom)
+                    self._summaries[route_id] = _summary(route_id, config_id, step_m, created_at, geom)
+                    added += 1
+            conn.commit()
+        tail = len(self._geoms) - self._tree_count
+        if self._tree is None or tail > max(_TAIL_MIN, _TAIL_FRACTION * self._tree_count):
+            self._tree = STRtree(self._geoms)
+            self._tree_count = len(self._geoms)
+
+    def _query_strtree(self, area, predicate) -> List[int]:
+        with self._lock:
+            self._refresh_locked()
+            # árbol para las filas indexadas + recorrido lineal de la cola reciente
+            candidates = itertools.chain(self._tree.query(area).tolist(), range(self._tree_count, len(self._geoms)))
+            return sorted(self._ids[i] for i in candidates if predicate(self._geoms[i]))
+
+    def query_bbox(self, bbox: Tuple[float, float, float, float], after_id: int = 0, limit: int = 50) -> List[Dict]:
+        """Rutas cuya geometría intersecta el bbox (min_lon, min_lat, max_lon, max_lat)"""
+        self.initialize()
+        if self.backend == "postgis":
+            with get_conn() as conn, conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    SELECT {_SUMMARY_COLUMNS} FROM collected_data
+                    WHERE geom && ST_MakeEnvelope(%s, %s, %s, %s, 4326)
+                      AND ST_Intersects(geom, ST_MakeEnvelope(%s, %s, %s, %s, 4326))
+                      AND id > %s
+                    ORDER BY id LIMIT %s
+                    """,
+                    (*bbox, *bbox, after_id, limit),
+                )
+                return [self._row_to_summary(r) for r in cur.fetchall()]
+
+        area = box(*bbox)
+        ids = self._query_strtree(area, area.intersects)
+        return [self._summaries[i] for i in ids if i > after_id][:limit]
+
+    def query_within(self, lon: float, lat: float, distance_m: float, after_id: int = 0, limit: int = 50) -> List[Dict]:
+        """Rutas a menos de distance_m metros del punto (lon, lat)"""
+        self.initialize()
+        margin = _meters_to_degrees(distance_m, lat)
+        if self.backend == "postgis":
+            with get_conn() as conn, conn.cursor() as cur:
+                # el && con ST_Expand usa el índice GIST; ST_DWithin en geography da la distancia exacta
+                cur.execute(
+                    f"""
+                    SELECT {_SUMMARY_COLUMNS} FROM collected_data
+                    WHERE geom && ST_Expand(ST_SetSRID(ST_MakePoint(%s, %s), 4326), %s)
+                      AND ST_DWithin(geom::geography, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography, %s)
+                      AND id > %s
+                    ORDER BY id LIMIT %s
+                    """,
+                    (lon, lat, margin, lon, lat, distance_m, after_id, limit),
+                )
+                return [self._row_to_summary(r) for r in cur.fetchall()]
+
+        # distancia en Web Mercator corregida por escala (cos lat) = metros reales aprox.
+        scale = math.cos(math.radians(lat))
+        center = Point(project_coords_to_3857([(lon, lat)])[0])
+
+        def within(geom) -> bool:
+            return shapely.transform(geom, project_coords_to_3857).distance(center) * scale <= distance_m
+
+        area = Point(lon, lat).buffer(margin)
+        ids = self._query_strtree(area, within)
+        return [self._summaries[i] for i in ids if i > after_id][:limit]
+
+    @staticmethod
+    def _row_to_summary(row) -> Dict:
+        route_id, config_id, step_m, created_at, length_m, n_points, min_lon, min_lat, max_lon, max_lat = row
+        return {
+            "id": route_id,
+            "config_id": config_id,
+            "step_m": step_m,
+            "created_at": created_at.isoformat() if created_at else None,
+            "length_m": float(length_m) if length_m is not None else None,
+            "n_points": n_points,
+            "bbox": [min_lon, min_lat, max_lon, max_lat],
+        }
+
+
+spatial_index = RouteSpatialIndex()
+
+
+def migrate():
+    """Aplicar la migración PostGIS (una sola vez, fuera del arranque del servidor)"""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(POSTGIS_SCHEMA_SQL)
+        conn.commit()
+    logger.info("✅ Migración PostGIS aplicada sobre collected_data")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice espacial de collected_data")
+    parser.add_argument("--migrate", action="store_true", help="crear extensión, columna geom, trigger e índice GIST")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.migrate:
+        migrate()
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# backend/app/services/terrain_features.py
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+from pyproj import Geod
+
+_geod = Geod(ellps="WGS84")
+
+# Ventana por defecto (m) para la pendiente móvil y el tramo más empinado
+DEFAULT_WINDOW_M = 100.0
+
+
+def geodesic_distances(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Distancia geodésica (m, elipsoide WGS84) entre pares de puntos, en una sola llamada a pyproj"""
+    if not len(lat1):
+        return np.zeros(0)
+    _, _, dist = _geod.inv(lon1, lat1, lon2, lat2)
+    return np.asarray(dist, dtype=float)
+
+
+def geodesic_segment_lengths(lat, lon) -> np.ndarray:
+    """Longitud geodésica de cada segmento de la polilínea"""
+    lat = np.asarray(lat, dtype=float).reshape(-1)
+    lon = np.asarray(lon, dtype=float).reshape(-1)
+    if len(lat) < 2:
+        return np.zeros(0)
+    return geodesic_distances(lat[:-1], lon[:-1], lat[1:], lon[1:])
+
+
+def geodesic_length_m(lat, lon) -> float:
+    return float(geodesic_segment_lengths(lat, lon).sum())
+
+
+def _fill_missing(cum: np.ndarray, z: np.ndarray) -> np.ndarray:
+    """Interpolar por distancia las elevaciones faltantes (NaN) entre vecinos válidos"""
+    valid = np.isfinite(z)
+    if valid.all() or not valid.any():
+        return z
+    return np.interp(cum, cum[valid], z[valid])
+
+
+@dataclass
+class TerrainFeatures:
+    """Features del perfil de elevación
+
+    Los arreglos por segmento tienen longitud N-1 (N = muestras); `cum_m` y
+    `climb_cum_m`/`descent_cum_m` tienen longitud N (valor en cada muestra).
+    """
+    seg_len_m: np.ndarray
+    cum_m: np.ndarray
+    elevation_m: np.ndarray
+    grade_pct: np.ndarray
+    rolling_slope_pct: np.ndarray
+    climb_cum_m: np.ndarray
+    descent_cum_m: np.ndarray
+    window_m: float
+    steepest_grade_pct: float
+    steepest_start_m: float
+    n_missing: int
+
+    @property
+    def length_m(self) -> float:
+        return float(self.cum_m[-1]) if len(self.cum_m) else 0.0
+
+    @property
+    def mean_slope_pct(self) -> float:
+        """Pendiente media ponderada por longitud (valor absoluto)"""
+        total = self.seg_len_m.sum()
+        return float((np.abs(self.grade_pct) * self.seg_len_m).sum() / total) if total > 0 else 0.0
+
+    def rule_features(self) -> Dict[str, Any]:
+        """Variables para el motor de reglas: pendiente por segmento y valores de toda la ruta"""
+        z = self.elevation_m
+        return {
+            "pendiente_promedio": np.abs(self.rolling_slope_pct),
+            "desnivel_total": float(np.nanmax(z) - np.nanmin(z)) if np.isfinite(z).any() else None,
+            "longitud_total_km": self.length_m / 1000.0,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        z = self.elevation_m
+        if not np.isfinite(z).any():
+            return {"longitud_m": round(self.length_m, 2)}
+        grade = np.abs(self.grade_pct)
+        return {
+            "longitud_m": round(self.length_m, 2),
+            "elevacion_promedio": round(float(np.nanmean(z)), 2),
+            "elevacion_max": round(float(np.nanmax(z)), 2),
+            "elevacion_min": round(float(np.nanmin(z)), 2),
+            "desnivel_total": round(float(np.nanmax(z) - np.nanmin(z)), 2),
+            "ascenso_total": round(float(self.climb_cum_m[-1]), 2),
+            "descenso_total": round(float(self.descent_cum_m[-1]), 2),
+            "pendiente_promedio": round(self.mean_slope_pct, 2),
+            "pendiente_max": round(float(grade.max()), 2) if len(grade) else 0.0,
+            "tramo_mas_empinado": {
+                "ventana_m": self.window_m,
+                "pendiente_pct": round(self.steepest_grade_pct, 2),
+                "inicio_m": round(self.steepest_start_m, 2),
+            },
+            "puntos_sin_elevacion": self.n_missing,
+        }
+
+
+def extract_terrain_features(lat, lon, elevations, window_m: float = DEFAULT_WINDOW_M,
+                             seg_len_m: Optional[np.ndarray] = None) -> TerrainFeatures:
+    """Calcular todas las features del perfil en una pasada vectorizada
+
+    `elevations` admite None/NaN (p.ej. lotes de ArcGIS fallidos): se
+    interpolan por distancia para las pendientes y se reportan en
+    `n_missing`. `seg_len_m` permite reutilizar longitudes ya calculadas.
+    """
+    z_raw = np.array([np.nan if e is None else e for e in elevations], dtype=float) \
+        if not isinstance(elevations, np.ndarray) else elevations.astype(float).reshape(-1)
+    if seg_len_m is None:
+        seg_len_m = geodesic_segment_lengths(lat, lon)
+    cum = np.concatenate(([0.0], np.cumsum(seg_len_m)))
+    n_missing = int((~np.isfinite(z_raw)).sum())
+    z = _fill_missing(cum, z_raw)
+
+    dz = np.diff(z)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        grade = np.where(seg_len_m > 0, 100.0 * dz / seg_len_m, 0.0)
+    grade = np.nan_to_num(grade, nan=0.0)
+    dz = np.nan_to_num(dz, nan=0.0)
+    climb = np.concatenate(([0.0], np.cumsum(np.clip(dz, 0, None))))
+    descent = np.concatenate(([0.0], np.cumsum(np.clip(-dz, 0, None))))
+
+    # Ventanas por distancia (no por número de muestras) usando np.interp sobre
+    # los acumulados: cada ventana cuesta O(log N) sin bucles en Python
+    length = cum[-1] if len(cum) else 0.0
+    win = min(window_m, length) if length > 0 else 0.0
+    if win > 0 and len(seg_len_m):
+        mid = (cum[:-1] + cum[1:]) / 2
+        lo = np.clip(mid - win / 2, 0.0, length - win)
+        abs_rise = np.concatenate(([0.0], np.cumsum(np.abs(dz))))
+        signed_rise = np.interp(lo + win, cum, z) - np.interp(lo, cum, z)
+        # pendiente móvil: |dz| acumulado dentro de la ventana, con el signo del cambio neto
+        rolling = np.sign(signed_rise) * 100.0 * (np.interp(lo + win, cum, abs_rise) - np.interp(lo, cum, abs_rise)) / win
+
+        # el máximo de una función lineal por tramos está donde el inicio o el fin de la ventana cae en un vértice
+        starts = np.unique(np.clip(np.concatenate((cum, cum - win)), 0.0, length - win))
+        net = 100.0 * (np.interp(starts + win, cum, z) - np.interp(starts, cum, z)) / win
+        k = int(np.nanargmax(np.abs(net))) if np.isfinite(net).any() else 0
+        steepest, steepest_start = float(np.nan_to_num(net[k])), float(starts[k])
+    else:
+        rolling = grade.copy()
+        steepest, steepest_start = 0.0, 0.0
+
+    return TerrainFeatures(
+        seg_len_m=seg_len_m,
+        cum_m=cum,
+        elevation_m=z_raw,
+        grade_pct=grade,
+        rolling_slope_pct=np.nan_to_num(rolling, nan=0.0),
+        climb_cum_m=climb,
+        descent_cum_m=descent,
+        window_m=float(win),
+        steepest_grade_pct=steepest,
+        steepest_start_m=steepest_start,
+        n_missing=n_missing,
+    )
@@ -0,0 +1,166 @@
+# backend/app/services/zone_index.py
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import shape
+
+from app.services.terrain_features import geodesic_segment_lengths
+
+logger = logging.getLogger(__name__)
+
+# Atributos que puede definir cada polígono; se clasifican por separado
+ZONE_ATTRIBUTES = ("zone_type", "tipo_cliente")
+
+
+class ZoneIndex:
+    """Índice de zonas (polígonos GeoJSON) sobre un STRtree de Shapely
+
+    Cada feature define `zone_type` (centro_urbano, urbano, suburbano, rural,
+    costero...) y/o `tipo_cliente` (ciudadela_pymes, edificio, empresa_campus,
+    residencial_densa, libre), más una `prioridad` para resolver solapes. Los
+    puntos se clasifican todos a la vez: una consulta del árbol por lote y la
+    selección de la zona de mayor prioridad con operaciones sobre arreglos.
+    """
+
+    def __init__(self, path: str, default_zone: str = "rural"):
+        self.path = Path(path)
+        self.default_zone = default_zone
+        self.names: List[str] = []
+        self.geoms: list = []
+        self.priority = np.zeros(0)
+        self.labels: Dict[str, np.ndarray] = {}
+        self.defines: Dict[str, np.ndarray] = {}
+        self.tree: Optional[STRtree] = None
+        self.load()
+
+    def load(self):
+        files = sorted(self.path.glob("*.geojson")) if self.path.is_dir() else [self.path]
+        names, geoms, priority = [], [], []
+        values: Dict[str, list] = {a: [] for a in ZONE_ATTRIBUTES}
+        for file in files:
+            try:
+                data = json.loads(file.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ No se pudo leer el archivo de zonas {file}: {e}")
+                continue
+            for feature in data.get("features", []):
+                props = feature.get("properties") or {}
+                try:
+                    geom = shape(feature["geometry"])
+                except Exception as e:
+                    logger.warning(f"⚠️ Zona inválida en {file.name} ({props.get('nombre')}): {e}")
+                    continue
+                if geom.is_empty or geom.geom_type not in ("Polygon", "MultiPolygon"):
+                    continue
+                shapely.prepare(geom)
+                names.append(props.get("nombre") or f"{file.stem}#{len(names)}")
+                geoms.append(geom)
+                priority.append(float(props.get("prioridad", 0) or 0))
+                for a in ZONE_ATTRIBUTES:
+                    values[a].append(props.get(a))
+
+        self.names = names
+        self.geoms = geoms
+        self.priority = np.asarray(priority, dtype=float)
+        self.labels = {a: np.asarray(v, dtype=object) for a, v in values.items()}
+        self.defines = {a: np.array([x is not None for x in v], dtype=bool) for a, v in values.items()}
+        self.tree = STRtree(geoms) if geoms else None
+        logger.info(f"✅ Zonas cargadas: {len(geoms)} polígonos ({self.path})")
+
+    def classify(self, lon, lat) -> Dict[str, np.ndarray]:
+        """Zona de cada punto: un arreglo por atributo (None si ninguna zona lo define)"""
+        lon = np.asarray(lon, dtype=float).reshape(-1)
+        lat = np.asarray(lat, dtype=float).reshape(-1)
+        n = len(lon)
+        out = {a: np.full(n, None, dtype=object) for a in ZONE_ATTRIBUTES}
+        out["zona"] = np.full(n, None, dtype=object)
+        if self.tree is None or n == 0:
+            out["zone_type"][:] = self.default_zone
+            return out
+
+        points = shapely.points(lon, lat)
+        pt_idx, poly_idx = self.tree.query(points, predicate="intersects")
+
+        for attr in (*ZONE_ATTRIBUTES, "zona"):
+            if attr == "zona":
+                labels = np.asarray(self.names, dtype=object)
+                mask = np.ones(len(poly_idx), dtype=bool)
+            else:
+                labels = self.labels[attr]
+                mask = self.defines[attr][poly_idx]
+            p, g = pt_idx[mask], poly_idx[mask]
+            if len(p):
+                # por punto, el polígono de mayor prioridad (ordenar y tomar el último de cada grupo)
+                order = np.lexsort((self.priority[g], p))
+                p, g = p[order], g[order]
+                last = np.append(p[1:] != p[:-1], True)
+                out[attr][p[last]] = labels[g[last]]
+
+        zone = out["zone_type"]
+        zone[np.equal(zone, None)] = self.default_zone
+        return out
+
+    def breakdown(self, lon, lat, max_tramos: int = 100) -> Dict[str, Any]:
+        """Reparto de la ruta por zona (m y %) y tramos consecutivos en la misma zona
+
+        Cada segmento entre muestras consecutivas se asigna a la zona de su
+        muestra inicial.
+        """
+        classes = self.classify(lon, lat)
+        seg_len = geodesic_segment_lengths(lat, lon)
+        total = float(seg_len.sum())
+        result: Dict[str, Any] = {"longitud_m": round(total, 2)}
+
+        for attr in ZONE_ATTRIBUTES:
+            labels = classes[attr][:-1] if len(seg_len) else classes[attr]
+            keys = np.array(["" if v is None else str(v) for v in labels])
+            uniq, inverse = np.unique(keys, return_inverse=True)
+            lengths = np.bincount(inverse, weights=seg_len, minlength=len(uniq)) if len(seg_len) else np.zeros(len(uniq))
+            # "" = puntos sin ese atributo (zone_type siempre tiene valor por defecto)
+            result[attr] = {
+                u: {"longitud_m": round(l, 2), "pct": round(100.0 * l / total, 2) if total > 0 else 0.0}
+                for u, l in zip(uniq.tolist(), lengths.tolist())
+                if u
+            }
+
+        zones = classes["zone_type"]
+        if len(seg_len):
+            cum = np.concatenate(([0.0], np.cumsum(seg_len)))
+            change = np.flatnonzero(zones[1:-1] != zones[:-2]) + 1
+            starts = np.concatenate(([0], change))
+            ends = np.append(change, len(seg_len))
+            result["tramos"] = [
+                {"zone_type": zones[s], "inicio_m": round(float(cum[s]), 2), "fin_m": round(float(cum[e]), 2)}
+                for s, e in zip(starts[:max_tramos].tolist(), ends[:max_tramos].tolist())
+            ]
+        else:
+            result["tramos"] = []
+        if total > 0:
+            dominant = max(result["zone_type"].items(), key=lambda kv: kv[1]["longitud_m"])[0]
+        else:
+            # sin longitud (un punto o puntos repetidos): la zona más frecuente entre los puntos
+            uniq, counts = np.unique(zones.astype(str), return_counts=True)
+            dominant = str(uniq[np.argmax(counts)]) if len(uniq) else self.default_zone
+        result["zona_dominante"] = dominant
+        return result
+
+
+_zone_index: Optional[ZoneIndex] = None
+_zone_lock = threading.Lock()
+
+
+def get_zone_index() -> ZoneIndex:
+    global _zone_index
+    if _zone_index is None:
+        with _zone_lock:
+            if _zone_index is None:
+                from app.core.config import get_settings
+                settings = get_settings()
+                _zone_index = ZoneIndex(settings.ZONES_PATH, default_zone=settings.ZONES_DEFAULT_TYPE)
+    return _zone_index
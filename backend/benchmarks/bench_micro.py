@@ -0,0 +1,95 @@
+# backend/benchmarks/bench_micro.py
+"""Micro-benchmarks de las funciones calientes sobre rutas sintéticas de 10 a 100k puntos.
+
+Mide sample_linestring_by_meters, analyze_route_basic, _calculate_stats y
+build_ai_prompt sin red ni BD, guarda el resultado en el historial
+(benchmarks/results) y marca las regresiones respecto a la corrida anterior.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_micro
+    python -m benchmarks.bench_micro --sizes 10 1000 --repeat 5 --no-save
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+from shapely.geometry import LineString
+
+from benchmarks import results
+from benchmarks.bench_sampling import synthetic_route
+
+DEFAULT_SIZES = (10, 100, 1_000, 10_000, 100_000)
+
+
+def synthetic_elevations(coords: np.ndarray, seed: int = 0) -> list:
+    """Perfil suave con ruido y algunos puntos faltantes (lotes fallidos)"""
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, 6 * np.pi, len(coords))
+    z = 20 + 15 * np.sin(t) + rng.normal(0, 0.5, len(coords))
+    z[rng.random(len(coords)) < 0.01] = np.nan
+    return [None if np.isnan(v) else float(v) for v in z]
+
+
+def _time(fn, repeat: int) -> float:
+    """Mejor tiempo (s) de `repeat` corridas"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(sizes, repeat: int):
+    # importar aquí: los módulos de la app leen la configuración al cargarse
+    from app.api.analyze import project_linestring_to_3857, sample_linestring_by_meters
+    from app.api.ai_recommendations import analyze_route_basic, build_ai_prompt, evaluate_route_rules
+    from app.services.arcgis_service import arcgis_service
+
+    metadata = {"arquitectura": "gpon", "split": "1:32", "enfoque": "aereo", "estudio_factibilidad": 64}
+    cases = {}
+    print(f"{'caso':<34} {'puntos':>8} {'tiempo (ms)':>12} {'puntos/s':>12}")
+    for n in sizes:
+        coords = synthetic_route(n)
+        geojson = {"type": "LineString", "coordinates": coords.tolist()}
+        line_3857 = project_linestring_to_3857(LineString(coords))
+        elevations = synthetic_elevations(coords)
+        latlon = coords[:, ::-1].tolist()
+        # paso tal que el muestreo produzca del orden de n muestras
+        step_m = max(line_3857.length / n, 0.5)
+
+        analysis = analyze_route_basic(geojson)
+        analysis = {**analysis, "reglas": evaluate_route_rules(analysis, metadata)}
+        route_data = {"geojson": geojson, "step_m": 20, "metadata": metadata, "created_at": None}
+
+        timings = {
+            "sample_linestring_by_meters": lambda: sample_linestring_by_meters(line_3857, step_m),
+            "analyze_route_basic": lambda: analyze_route_basic(geojson),
+            "_calculate_stats": lambda: arcgis_service._calculate_stats(elevations, latlon),
+            "build_ai_prompt": lambda: build_ai_prompt(route_data, metadata, analysis),
+        }
+        for name, fn in timings.items():
+            elapsed = _time(fn, repeat)
+            cases[f"{name}[{n}]"] = {"ms": round(1000 * elapsed, 4), "points_per_s": round(n / elapsed, 1)}
+            print(f"{name:<34} {n:>8} {1000 * elapsed:>12.3f} {n / elapsed:>12.0f}")
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold-pct", type=float, default=20.0, help="empeoramiento que cuenta como regresión")
+    parser.add_argument("--no-save", action="store_true", help="no escribir en el historial")
+    args = parser.parse_args()
+
+    cases = run(args.sizes, args.repeat)
+    if args.no_save:
+        return
+    regressions = results.record("micro", cases, {"repeat": args.repeat}, threshold_pct=args.threshold_pct)
+    sys.exit(1 if results.report_regressions(regressions) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# backend/benchmarks/bench_sampling.py
+"""Benchmark: muestreo por bucle (implementación original) vs motor vectorizado.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_sampling
+"""
+import math
+import time
+
+import numpy as np
+from shapely.geometry import LineString
+
+from app.services.route_sampling import (
+    _to_3857,
+    _to_4326,
+    project_coords_to_3857,
+    reproject_coords_to_latlon,
+    sample_coords_by_meters,
+)
+
+
+def synthetic_route(n_vertices: int, seed: int = 0) -> np.ndarray:
+    """Ruta aleatoria tipo calle alrededor del centro de Guayaquil (lon, lat)"""
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 0.0004, size=(n_vertices, 2))
+    return np.array([-79.9224, -2.1709]) + np.cumsum(steps, axis=0)
+
+
+def legacy_pipeline(coords, step_m):
+    """Réplica del bucle original de analyze.py"""
+    line = LineString([_to_3857.transform(x, y) for x, y in coords])
+    length = line.length
+    n = max(2, int(math.ceil(length / step_m)) + 1)
+    samples = []
+    for i in range(n):
+        p = line.interpolate(min(i * step_m, length))
+        samples.append((p.x, p.y))
+    end = line.coords[-1]
+    if samples[-1] != end:
+        samples.append(end)
+    out = []
+    for x, y in samples:
+        lon, lat = _to_4326.transform(x, y)
+        out.append((lat, lon))
+    return out
+
+
+def vectorized_pipeline(coords, step_m):
+    xy = project_coords_to_3857(coords)
+    samples = sample_coords_by_meters(xy, step_m)
+    lat, lon = reproject_coords_to_latlon(samples)
+    return np.column_stack((lat, lon))
+
+
+def _best_of(fn, *args, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    print(f"{'vertices':>8} {'step_m':>6} {'muestras':>9} {'bucle (s)':>10} {'numpy (s)':>10} {'x':>7} {'max err (deg)':>14}")
+    for n_vertices, step_m in [(20, 20.0), (200, 5.0), (200, 1.0), (2000, 1.0)]:
+        coords = synthetic_route(n_vertices)
+        t_loop, legacy = _best_of(legacy_pipeline, coords, step_m)
+        t_vec, vec = _best_of(vectorized_pipeline, coords, step_m)
+        legacy = np.asarray(legacy)
+        # la versión original puede duplicar el punto final por redondeo
+        if len(legacy) == len(vec) + 1:
+            legacy = legacy[:-1]
+        err = float(np.abs(legacy - vec).max()) if len(legacy) == len(vec) else float("nan")
+        print(f"{n_vertices:>8} {step_m:>6} {len(vec):>9} {t_loop:>10.4f} {t_vec:>10.4f} {t_loop / t_vec:>7.1f} {err:>14.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# backend/benchmarks/bench_startup.py
+"""Benchmark: tiempo de arranque en frío (import de app.main + lifespan).
+
+Cada corrida usa un intérprete nuevo, así se mide el import real y no el
+de módulos ya cacheados. Falla (código 1) si la mediana supera los límites,
+para detectar regresiones en CI.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_startup --runs 5 --max-import-ms 1500 --max-startup-ms 3000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks import results
+
+# Módulos que no deben cargarse al importar la app (se cargan al primer uso)
+LAZY_MODULES = ("arcgis", "cohere")
+
+_PROBE = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+from app.main import app
+t1 = time.perf_counter()
+imported = [m for m in %(lazy)r if m in sys.modules]
+
+async def run_lifespan():
+    async with app.router.lifespan_context(app):
+        t2 = time.perf_counter()
+    return t2, time.perf_counter()
+
+t2, t3 = asyncio.run(run_lifespan())
+from app.core.readiness import readiness
+components = {k: v["elapsed_ms"] for k, v in readiness.report()["components"].items()}
+print(json.dumps({
+    "import_ms": 1000 * (t1 - t0),
+    "startup_ms": 1000 * (t2 - t1),
+    "shutdown_ms": 1000 * (t3 - t2),
+    "eager_heavy_modules": imported,
+    "components_ms": components,
+}))
+"""
+
+
+def run_once(env_overrides=None) -> dict:
+    env = {**os.environ, **(env_overrides or {})}
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE % {"lazy": LAZY_MODULES}],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-startup-ms", type=float, default=None)
+    parser.add_argument("--no-warmup", action="store_true", help="STARTUP_WARMUP_CLIENTS=false")
+    parser.add_argument("--no-save", action="store_true", help="no escribir en el historial")
+    args = parser.parse_args()
+
+    env = {"STARTUP_WARMUP_CLIENTS": "false"} if args.no_warmup else {}
+    runs = [run_once(env) for _ in range(args.runs)]
+    import_ms = statistics.median(r["import_ms"] for r in runs)
+    startup_ms = statistics.median(r["startup_ms"] for r in runs)
+    shutdown_ms = statistics.median(r["shutdown_ms"] for r in runs)
+
+    print(f"{'corridas':>8} {'import (ms)':>12} {'lifespan (ms)':>14} {'apagado (ms)':>13}")
+    print(f"{len(runs):>8} {import_ms:>12.1f} {startup_ms:>14.1f} {shutdown_ms:>13.1f}")
+    print("componentes (última corrida, ms):", runs[-1]["components_ms"])
+
+    failures = []
+    eager = sorted({m for r in runs for m in r["eager_heavy_modules"]})
+    if eager:
+        failures.append(f"módulos pesados importados al cargar app.main: {', '.join(eager)}")
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failures.append(f"import {import_ms:.1f} ms > {args.max_import_ms} ms")
+    if args.max_startup_ms is not None and startup_ms > args.max_startup_ms:
+        failures.append(f"lifespan {startup_ms:.1f} ms > {args.max_startup_ms} ms")
+    for f in failures:
+        print(f"REGRESIÓN: {f}")
+    if not args.no_save:
+        case = "no_warmup" if args.no_warmup else "warmup"
+        metrics = {"import_ms": round(import_ms, 2), "startup_ms": round(startup_ms, 2)}
+        if results.report_regressions(results.record("startup", {case: metrics}, {"runs": args.runs})):
+            failures.append("historial")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
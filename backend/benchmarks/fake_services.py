@@ -0,0 +1,148 @@
+# backend/benchmarks/fake_services.py
+"""Servidores locales que imitan la API de elevación de ArcGIS y el chat de Cohere.
+
+Responden con el mismo formato que los servicios reales, con latencia y tasa
+de errores configurables, para medir la app sin red ni cuotas. La app se
+apunta a ellos con ARCGIS_ELEVATION_URL y COHERE_BASE_URL.
+
+Uso (desde backend/):
+    python -m benchmarks.fake_services elevation --port 8101 --latency-ms 120 --error-rate 0.02
+    python -m benchmarks.fake_services chat --port 8102 --latency-ms 800 --tokens 300
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import uuid
+from dataclasses import dataclass
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ELEVATION_PATH = "/arcgis/rest/services/elevation-service/v1/elevation/at-many-points"
+
+
+@dataclass
+class FakeBehavior:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0  # fracción de peticiones que responden error_status
+    error_status: int = 503
+    per_point_us: float = 0.0  # costo extra por punto (elevación) o por token (chat)
+
+    async def delay(self, units: int = 0):
+        ms = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms) + units * self.per_point_us / 1000
+        if ms > 0:
+            await asyncio.sleep(ms / 1000)
+
+    def fail(self) -> bool:
+        return random.random() < self.error_rate
+
+
+def terrain_z(lon: float, lat: float) -> float:
+    """Relieve sintético determinista (colinas de ~1 km, 0-60 m)"""
+    return round(30 + 18 * math.sin(lon * 900) * math.cos(lat * 700) + 10 * math.sin((lon + lat) * 2500), 2)
+
+
+def create_elevation_app(behavior: FakeBehavior) -> FastAPI:
+    app = FastAPI(title="Fake ArcGIS elevation")
+    app.state.requests = 0
+
+    @app.post(ELEVATION_PATH)
+    async def at_many_points(request: Request):
+        app.state.requests += 1
+        # cuerpo application/x-www-form-urlencoded (sin depender de python-multipart)
+        form = parse_qs((await request.body()).decode())
+        points = json.loads((form.get("geometry") or ["{}"])[0]).get("points", [])
+        await behavior.delay(len(points))
+        if behavior.fail():
+            return JSONResponse({"error": {"code": behavior.error_status, "message": "fake error"}},
+                                status_code=behavior.error_status)
+        return {"result": {"points": [
+            {"x": p["x"], "y": p["y"], "z": terrain_z(p["x"], p["y"])} for p in points
+        ]}}
+
+    @app.get("/stats")
+    def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+def _fake_text(tokens: int) -> list:
+    words = ["Recomendación:", "usar", "vanos", "de", "40", "m,", "tensores", "en", "pendientes", "y",
+             "reutilizar", "postes", "existentes", "donde", "sea", "posible."]
+    return [words[i % len(words)] + " " for i in range(tokens)]
+
+
+def create_chat_app(behavior: FakeBehavior, tokens: int = 200) -> FastAPI:
+    """Endpoint /v1/chat de Cohere: respuesta completa o eventos NDJSON si stream=true"""
+    app = FastAPI(title="Fake Cohere chat")
+    app.state.requests = 0
+
+    @app.post("/v1/chat")
+    async def chat(request: Request):
+        app.state.requests += 1
+        body = await request.json()
+        max_tokens = min(int(body.get("max_tokens") or tokens), tokens)
+        parts = _fake_text(max_tokens)
+        generation_id = uuid.uuid4().hex
+        if behavior.fail():
+            return JSONResponse({"message": "fake error"}, status_code=behavior.error_status)
+
+        if not body.get("stream"):
+            await behavior.delay(max_tokens)
+            return {
+                "response_id": uuid.uuid4().hex,
+                "generation_id": generation_id,
+                "text": "".join(parts).strip(),
+                "finish_reason": "COMPLETE",
+                "meta": {"billed_units": {"input_tokens": len(body.get("message", "")) // 4, "output_tokens": max_tokens}},
+            }
+
+        async def events():
+            # latencia hasta el primer token; después per_unit_us entre tokens
+            await behavior.delay()
+            yield json.dumps({"is_finished": False, "event_type": "stream-start", "generation_id": generation_id}) + "\n"
+            for part in parts:
+                if behavior.per_point_us:
+                    await asyncio.sleep(behavior.per_point_us / 1e6)
+                yield json.dumps({"is_finished": False, "event_type": "text-generation", "text": part}) + "\n"
+            yield json.dumps({
+                "is_finished": True, "event_type": "stream-end", "finish_reason": "COMPLETE",
+                "response": {"generation_id": generation_id, "text": "".join(parts).strip(), "finish_reason": "COMPLETE"},
+            }) + "\n"
+
+        return StreamingResponse(events(), media_type="application/stream+json")
+
+    @app.get("/stats")
+    def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("service", choices=("elevation", "chat"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--per-unit-us", type=float, default=0.0, help="µs extra por punto (elevación) o por token (chat)")
+    parser.add_argument("--tokens", type=int, default=200, help="tokens de la respuesta del chat")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    behavior = FakeBehavior(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.per_unit_us)
+    app = create_elevation_app(behavior) if args.service == "elevation" else create_chat_app(behavior, args.tokens)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
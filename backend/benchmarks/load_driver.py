@@ -0,0 +1,266 @@
+# backend/benchmarks/load_driver.py
+"""Prueba de carga: req/s y latencias p50/p99 de la app bajo uvicorn con N workers.
+
+Levanta los servidores falsos de ArcGIS y Cohere (benchmarks.fake_services),
+arranca la app con uvicorn apuntando a ellos y a un Postgres local, y lanza
+`--concurrency` clientes en lazo cerrado contra cada escenario durante
+`--duration` segundos. Los resultados se guardan en el historial
+(benchmarks/results) y se comparan con la corrida anterior.
+
+Postgres local (solo para los escenarios con BD), p.ej.:
+    docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=ftth -e POSTGRES_DB=ftth postgis/postgis:16-3.4
+
+Uso (desde backend/):
+    POSTGRES_HOST=127.0.0.1 POSTGRES_USER=postgres POSTGRES_PASSWORD=ftth POSTGRES_SSLMODE=disable \\
+        python -m benchmarks.load_driver --workers 4 --concurrency 32 --duration 20
+    python -m benchmarks.load_driver --scenarios submit adaptive poles --workers 2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks import results
+from benchmarks.bench_sampling import synthetic_route
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS user_configs (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER,
+    name VARCHAR(255),
+    config JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS collected_data (
+    id SERIAL PRIMARY KEY,
+    config_id INTEGER REFERENCES user_configs(id),
+    geojson JSONB NOT NULL,
+    step_m INTEGER DEFAULT 20,
+    metadata JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+METADATA = {"arquitectura": "gpon", "split": "1:32", "enfoque": "aereo", "estudio_factibilidad": 64}
+
+
+def _route(n_vertices: int, seed: int) -> dict:
+    return {"type": "LineString", "coordinates": synthetic_route(n_vertices, seed).round(6).tolist()}
+
+
+@dataclass
+class Scenario:
+    method: str
+    path: str
+    body: Callable[[int], Optional[dict]]  # i -> cuerpo JSON de la i-ésima petición
+    needs_db: bool = False
+    stream: bool = False  # leer la respuesta completa (SSE) antes de parar el reloj
+
+
+def build_scenarios(seed_ids: List[int]) -> Dict[str, Scenario]:
+    routes = [_route(200, s) for s in range(16)]
+    lon, lat = synthetic_route(1)[0]
+    return {
+        # CPU: proyección y muestreo
+        "submit": Scenario("POST", "/api/analyze/submit", lambda i: {"geojson": routes[i % 16], "step_m": 10}),
+        # elevación remota (servidor falso de ArcGIS)
+        "adaptive": Scenario("POST", "/api/analyze/submit/adaptive",
+                             lambda i: {"geojson": routes[i % 16], "step_m": 10, "tolerance_m": 1.0}),
+        "poles": Scenario("POST", "/api/analyze/poles", lambda i: {"geojson": routes[i % 16], "step_m": 1.0}),
+        # BD: escritura y consulta espacial
+        "collect": Scenario("POST", "/api/data/collect",
+                            lambda i: {"geojson": routes[i % 16], "step_m": 20, "meta": METADATA}, needs_db=True),
+        "routes_near": Scenario("GET", f"/api/data/routes?lon={lon}&lat={lat}&distance_m=2000&limit=50",
+                                lambda i: None, needs_db=True),
+        # BD + análisis + chat en streaming (servidor falso de Cohere), sin caché
+        "ai_stream": Scenario("POST", "/api/ai/generate/stream",
+                              lambda i: {"data_id": seed_ids[i % len(seed_ids)], "no_cache": True},
+                              needs_db=True, stream=True),
+    }
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(pct / 100.0 * (len(values) - 1)))))
+    return values[k]
+
+
+async def run_scenario(base_url: str, scenario: Scenario, concurrency: int, duration_s: float, warmup_s: float,
+                       transport: Optional[httpx.AsyncBaseTransport] = None) -> Dict:
+    """Clientes en lazo cerrado; solo cuentan las peticiones que empiezan después del calentamiento
+
+    `transport` permite medir una app ASGI en el mismo proceso (sin uvicorn).
+    """
+    latencies: List[float] = []
+    errors = 0
+    counter = 0
+    start = time.perf_counter()
+    measure_from = start + warmup_s
+    stop_at = measure_from + duration_s
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits, transport=transport) as client:
+        async def worker():
+            nonlocal errors, counter
+            while True:
+                t0 = time.perf_counter()
+                if t0 >= stop_at:
+                    return
+                i = counter
+                counter += 1
+                ok = False
+                try:
+                    body = scenario.body(i)
+                    if scenario.stream:
+                        async with client.stream(scenario.method, scenario.path, json=body) as r:
+                            text = "".join([chunk async for chunk in r.aiter_text()])
+                            ok = r.status_code < 400 and "event: error" not in text
+                    else:
+                        r = await client.request(scenario.method, scenario.path, json=body)
+                        ok = r.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                t1 = time.perf_counter()
+                if t0 >= measure_from and t1 <= stop_at:
+                    latencies.append(t1 - t0)
+                    errors += not ok
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    n = len(latencies)
+    return {
+        "requests": n,
+        "rps": round(n / duration_s, 2),
+        "p50_ms": round(1000 * _percentile(latencies, 50), 2),
+        "p90_ms": round(1000 * _percentile(latencies, 90), 2),
+        "p99_ms": round(1000 * _percentile(latencies, 99), 2),
+        "mean_ms": round(1000 * statistics.fmean(latencies), 2) if n else 0.0,
+        "error_pct": round(100.0 * errors / n, 2) if n else 0.0,
+    }
+
+
+def _spawn(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], cwd=BACKEND_DIR, env=env)
+
+
+def _wait_http(url: str, timeout_s: float, expect_status: int = 200):
+    deadline = time.time() + timeout_s
+    last = None
+    while time.time() < deadline:
+        try:
+            r = httpx.get(url, timeout=2.0)
+            if r.status_code == expect_status:
+                return
+            last = f"HTTP {r.status_code}"
+        except httpx.HTTPError as e:
+            last = str(e)
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} no respondió a tiempo ({last})")
+
+
+def prepare_database(n_routes: int, base_url: str) -> List[int]:
+    """Crear las tablas si faltan y cargar rutas de prueba a través de la propia API"""
+    import psycopg2
+    from app.core.config import get_settings
+
+    s = get_settings()
+    with psycopg2.connect(host=s.POSTGRES_HOST, port=s.POSTGRES_PORT, dbname=s.POSTGRES_DB,
+                          user=s.POSTGRES_USER, password=s.POSTGRES_PASSWORD, sslmode=s.POSTGRES_SSLMODE) as conn:
+        with conn.cursor() as cur:
+            cur.execute(SCHEMA_SQL)
+    ids = []
+    with httpx.Client(base_url=base_url, timeout=30.0) as client:
+        for k in range(n_routes):
+            r = client.post("/api/data/collect", json={"geojson": _route(120, 1000 + k), "step_m": 20, "meta": METADATA})
+            r.raise_for_status()
+            ids.append(r.json()["id"])
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", default=["submit", "adaptive", "poles", "collect", "routes_near", "ai_stream"])
+    parser.add_argument("--workers", type=int, default=2, help="procesos de uvicorn")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--elevation-latency-ms", type=float, default=80.0)
+    parser.add_argument("--chat-latency-ms", type=float, default=300.0)
+    parser.add_argument("--chat-token-us", type=float, default=2000.0, help="µs entre tokens del stream falso")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="tasa de errores de los servidores falsos")
+    parser.add_argument("--seed-routes", type=int, default=20)
+    parser.add_argument("--threshold-pct", type=float, default=20.0)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    elev_port, chat_port = args.port + 1, args.port + 2
+    base_url = f"http://127.0.0.1:{args.port}"
+    with_db = any(build_scenarios([0])[name].needs_db for name in args.scenarios)
+    tmp = tempfile.mkdtemp(prefix="ftth-bench-")
+
+    env = {
+        **os.environ,
+        "ARCGIS_ELEVATION_URL": f"http://127.0.0.1:{elev_port}/arcgis/rest/services/elevation-service/v1/elevation/at-many-points",
+        "ARCGIS_API_KEY": "",
+        "COHERE_BASE_URL": f"http://127.0.0.1:{chat_port}",
+        "COHERE_API_KEY": os.environ.get("COHERE_API_KEY") or "fake-key",
+        "COHERE_CALLS_PER_MINUTE": "1000000",
+        # medir el proveedor, no la caché local
+        "ELEVATION_CACHE_ENABLED": "false",
+        "ROUTE_JOBS_DB_PATH": str(Path(tmp) / "route_jobs.sqlite3"),
+    }
+    fake_common = ["--error-rate", str(args.error_rate)]
+    procs = [
+        _spawn(["-m", "benchmarks.fake_services", "elevation", "--port", str(elev_port),
+                "--latency-ms", str(args.elevation_latency_ms), *fake_common], env),
+        _spawn(["-m", "benchmarks.fake_services", "chat", "--port", str(chat_port),
+                "--latency-ms", str(args.chat_latency_ms), "--per-unit-us", str(args.chat_token_us), *fake_common], env),
+        _spawn(["-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.port),
+                "--workers", str(args.workers), "--log-level", "warning"], env),
+    ]
+    try:
+        _wait_http(f"http://127.0.0.1:{elev_port}/stats", 30)
+        _wait_http(f"http://127.0.0.1:{chat_port}/stats", 30)
+        _wait_http(f"{base_url}/ready", 90)
+        seed_ids = prepare_database(args.seed_routes, base_url) if with_db else [0]
+        scenarios = build_scenarios(seed_ids)
+
+        cases = {}
+        print(f"{'escenario':<12} {'req':>7} {'req/s':>9} {'p50 (ms)':>9} {'p90 (ms)':>9} {'p99 (ms)':>9} {'error %':>8}")
+        for name in args.scenarios:
+            m = asyncio.run(run_scenario(base_url, scenarios[name], args.concurrency, args.duration, args.warmup))
+            cases[f"{name}[w{args.workers},c{args.concurrency}]"] = m
+            print(f"{name:<12} {m['requests']:>7} {m['rps']:>9.1f} {m['p50_ms']:>9.1f} {m['p90_ms']:>9.1f} "
+                  f"{m['p99_ms']:>9.1f} {m['error_pct']:>8.2f}")
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    if args.no_save:
+        return
+    params = {k: v for k, v in vars(args).items() if k not in ("scenarios", "no_save")}
+    regressions = results.record("load", cases, params, threshold_pct=args.threshold_pct)
+    sys.exit(1 if results.report_regressions(regressions) else 0)
+
+
+if __name__ == "__main__":
+    main()
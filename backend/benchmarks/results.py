@@ -0,0 +1,97 @@
+# backend/benchmarks/results.py
+"""Historial de resultados de benchmarks (JSONL) y comparación con la corrida anterior.
+
+Cada corrida agrega una línea por caso con el commit, la máquina y las
+métricas; al guardar se compara con la última corrida del mismo caso en la
+misma máquina y se marcan las regresiones. El historial es local de cada
+máquina y no se versiona (benchmarks/results/ está en .gitignore).
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_PATH = Path(__file__).resolve().parent / "results" / "history.jsonl"
+
+# Métricas donde más es mejor; en el resto (tiempos, latencias) menos es mejor
+HIGHER_IS_BETTER = {"rps", "points_per_s"}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).resolve().parent, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def machine_id() -> str:
+    return f"{platform.node()}/{platform.machine()}/{os.cpu_count()}cpu/py{platform.python_version()}"
+
+
+def load_history(path: Path = DEFAULT_PATH) -> List[Dict]:
+    if not path.exists():
+        return []
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous(history: List[Dict], suite: str, case: str, machine: str) -> Optional[Dict]:
+    for entry in reversed(history):
+        if entry["suite"] == suite and entry["case"] == case and entry["machine"] == machine:
+            return entry
+    return None
+
+
+def compare(old: Dict[str, float], new: Dict[str, float], threshold_pct: float) -> Dict[str, float]:
+    """Métricas que empeoraron más de threshold_pct (valor = % de empeoramiento)"""
+    worse = {}
+    for key, value in new.items():
+        before = old.get(key)
+        if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or before <= 0:
+            continue
+        change = 100.0 * (value - before) / before
+        if key in HIGHER_IS_BETTER:
+            change = -change
+        if change > threshold_pct:
+            worse[key] = round(change, 1)
+    return worse
+
+
+def record(suite: str, cases: Dict[str, Dict[str, float]], params: Optional[Dict] = None,
+           path: Path = DEFAULT_PATH, threshold_pct: float = 20.0) -> Dict[str, Dict[str, float]]:
+    """Guardar una corrida (caso -> métricas) y devolver las regresiones por caso"""
+    history = load_history(path)
+    machine = machine_id()
+    commit = _git_commit()
+    regressions = {}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        for case, metrics in cases.items():
+            prev = previous(history, suite, case, machine)
+            if prev is not None:
+                worse = compare(prev["metrics"], metrics, threshold_pct)
+                if worse:
+                    regressions[case] = {**worse, "_vs": prev.get("commit")}
+            f.write(json.dumps({
+                "suite": suite,
+                "case": case,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "commit": commit,
+                "machine": machine,
+                "params": params or {},
+                "metrics": metrics,
+            }, ensure_ascii=False) + "\n")
+    return regressions
+
+
+def report_regressions(regressions: Dict[str, Dict[str, float]]) -> bool:
+    for case, worse in regressions.items():
+        vs = worse.pop("_vs", None)
+        detail = ", ".join(f"{k} +{v}%" for k, v in worse.items())
+        print(f"REGRESIÓN {case} (vs {vs}): {detail}")
+    return bool(regressions)
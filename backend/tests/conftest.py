@@ -0,0 +1,6 @@
+# backend/tests/conftest.py
+import sys
+from pathlib import Path
+
+# los tests importan `app` igual que uvicorn: desde backend/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,43 @@
+# backend/tests/test_adaptive_sampling.py
+import asyncio
+import math
+
+import numpy as np
+
+from app.services.adaptive_sampling import adaptive_elevation_profile
+from app.services.route_sampling import sample_route_lonlat
+
+ROUTE = [[-79.9000, -2.1700], [-79.8800, -2.1650]]  # ~2.3 km en línea recta
+
+
+def _z(lat, lon):
+    # lomas de ~350 m de largo y una pendiente suave de fondo
+    return 20 * math.sin(lon * 2000) + 8 * math.cos(lat * 3000) + (lon + 79.9) * 2000
+
+
+class FakeElevation:
+    def __init__(self):
+        self.points = 0
+
+    async def get_elevation_profile(self, points, with_stats=False):
+        self.points += len(points)
+        return {"elevations": [_z(lat, lon) for lat, lon in points]}
+
+
+def test_adaptive_profile_saves_points_within_tolerance():
+    step_m, tolerance_m = 5.0, 1.0
+    service = FakeElevation()
+    profile = asyncio.run(adaptive_elevation_profile(ROUTE, step_m, tolerance_m, service))
+    stats = profile["stats"]
+    assert stats["saved_points"] > 0
+    assert stats["unverified_intervals"] == 0
+    assert service.points < stats["n_uniform"]
+
+    # error contra el terreno real en un muestreo denso (cada metro) interpolando el perfil adaptativo
+    dist = np.array([s["dist_m"] for s in profile["samples"]])
+    elev = np.array([s["elevation"] for s in profile["samples"]])
+    _, _, lat, lon = sample_route_lonlat(ROUTE, 1.0)
+    dense = np.minimum(np.arange(len(lat)) * 1.0, dist[-1])
+    truth = np.array([_z(la, lo) for la, lo in zip(lat.tolist(), lon.tolist())])
+    worst = np.max(np.abs(np.interp(dense, dist, elev) - truth))
+    assert worst <= tolerance_m
@@ -0,0 +1,68 @@
+# backend/tests/test_ai_stream.py
+import asyncio
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.api import ai_recommendations as ai
+
+WORDS = ["Usar ", "postes ", "de ", "concreto."]
+
+
+class FakeCohere:
+    def __init__(self):
+        self.calls = 0
+
+    def chat_stream(self, **kwargs):
+        self.calls += 1
+        for word in WORDS:
+            time.sleep(0.01)
+            yield SimpleNamespace(event_type="text-generation", text=word)
+        yield SimpleNamespace(event_type="stream-end", finish_reason="COMPLETE")
+
+
+def _setup(monkeypatch):
+    client = FakeCohere()
+    route_data = {"metadata": {}, "created_at": datetime(2026, 1, 1), "geojson": {"type": "LineString"}}
+
+    async def prepare(data_id, no_cache=False):
+        return route_data, {"length_km": 1.0}, f"prompt {data_id}"
+
+    monkeypatch.setattr(ai, "get_cohere_client", lambda: client)
+    monkeypatch.setattr(ai, "prepare_ai_request", prepare)
+    monkeypatch.setattr(ai, "cohere_limiter", None)
+    ai.ai_cache.clear()
+    return client
+
+
+def test_leader_disconnect_does_not_fail_followers(monkeypatch):
+    client = _setup(monkeypatch)
+
+    async def run():
+        leader = ai.stream_ai_generation(1)
+        await leader.__anext__()  # analysis
+        first_chunk = await leader.__anext__()
+
+        follower = asyncio.create_task(_collect(ai.stream_ai_generation(1)))
+        await asyncio.sleep(0)
+        await leader.aclose()  # el cliente del líder se desconecta
+        return first_chunk, await asyncio.wait_for(follower, 5.0)
+
+    first_chunk, events = asyncio.run(run())
+    assert '"Usar "' in first_chunk
+    assert events[-1].startswith("event: done") and '"SHARED"' in events[-1]
+    assert "Usar postes de concreto." in events[-2]
+    assert ai.ai_cache.get(ai.route_cache_keys(
+        {"metadata": {}, "geojson": {"type": "LineString"}}, "prompt 1")[1]) == "Usar postes de concreto."
+    assert client.calls == 1
+
+
+def test_stream_sends_chunks_and_done(monkeypatch):
+    _setup(monkeypatch)
+    events = asyncio.run(_collect(ai.stream_ai_generation(2)))
+    assert [e.split("\n")[0] for e in events] == ["event: analysis"] + ["event: chunk"] * len(WORDS) + ["event: done"]
+    assert '"COMPLETE"' in events[-1]
+
+
+async def _collect(gen):
+    return [event async for event in gen]
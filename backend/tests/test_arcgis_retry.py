@@ -0,0 +1,23 @@
+# backend/tests/test_arcgis_retry.py
+import httpx
+
+from app.services.arcgis_service import ArcGISService
+
+
+def _delay(service, retry_after, attempt=1):
+    return service._retry_delay(attempt, httpx.Response(429, headers={"Retry-After": retry_after}))
+
+
+def test_retry_after_is_clamped_and_bad_values_fall_back_to_backoff():
+    service = ArcGISService()
+    service.retry_backoff = 0.5
+    service.max_retry_after = 30.0
+    backoff = 0.5 * 2
+
+    assert _delay(service, "2") == 2.0
+    assert _delay(service, "86400") == 30.0
+    assert _delay(service, "inf") == backoff
+    assert _delay(service, "-5") == backoff
+    assert _delay(service, "nan") == backoff
+    assert _delay(service, "Wed, 21 Oct 2026 07:28:00 GMT") == backoff
+    assert service._retry_delay(1) == backoff
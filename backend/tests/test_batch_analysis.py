@@ -0,0 +1,21 @@
+# backend/tests/test_batch_analysis.py
+from app.services.batch_analysis import split_routes
+
+LINE = {"type": "LineString", "coordinates": [[-79.88, -2.17], [-79.87, -2.16]]}
+
+
+def test_non_object_features_are_reported_per_row():
+    routes = split_routes({
+        "type": "FeatureCollection",
+        "features": [
+            1,
+            {"type": "Feature", "id": "ok", "geometry": LINE},
+            {"type": "Feature", "properties": [1, 2], "geometry": None},
+            "calle",
+        ],
+    })
+    assert len(routes) == 4
+    assert isinstance(routes[0][1], ValueError)
+    assert routes[1] == ("ok", [(-79.88, -2.17), (-79.87, -2.16)])
+    assert routes[2][0] is None and isinstance(routes[2][1], ValueError)
+    assert isinstance(routes[3][1], ValueError)
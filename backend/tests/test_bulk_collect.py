@@ -0,0 +1,100 @@
+# backend/tests/test_bulk_collect.py
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import data
+
+LINE = {"type": "LineString", "coordinates": [[-70.6, -33.4], [-70.5, -33.3]]}
+
+
+class _FakeConn:
+    def __init__(self):
+        self.rows = []
+        self.committed = False
+
+    def commit(self):
+        self.committed = True
+
+
+@pytest.fixture
+def client(monkeypatch):
+    conn = _FakeConn()
+
+    @asynccontextmanager
+    async def fake_conn():
+        yield conn
+
+    def fake_insert(_, rows):
+        start = len(conn.rows)
+        conn.rows.extend(rows)
+        return list(range(start + 1, start + 1 + len(rows)))
+
+    monkeypatch.setattr(data, "get_async_conn", fake_conn)
+    monkeypatch.setattr(data, "_insert_batch", fake_insert)
+    app = FastAPI()
+    app.include_router(data.router, prefix="/api/data")
+    with TestClient(app) as c:
+        c.conn = conn
+        yield c
+
+
+def test_bulk_invalid_rows_are_reported_per_row(client):
+    items = [
+        {"geojson": LINE, "step_m": 10},
+        {"geojson": {"type": "LineString"}, "step_m": 10},  # sin coordinates: KeyError
+        {"geojson": {"type": "Hexagon", "coordinates": []}},  # tipo desconocido: GeometryTypeError
+        {"geojson": {"type": "LineString", "coordinates": [[0, 0]]}},  # un solo punto: GEOSException
+        {"geojson": {"type": "Point", "coordinates": [0, 0]}},
+        {"geojson": LINE, "step_m": 0},
+        [1, 2],
+        {"type": "Feature", "geometry": LINE, "properties": {"step_m": 5}},
+    ]
+    body = "\n".join(json.dumps(i) for i in items) + "\n{no es json\n"
+
+    response = client.post("/api/data/collect/bulk", content=body,
+                           headers={"content-type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    out = response.json()
+    assert out["inserted"] == 2
+    assert out["failed"] == 7
+    assert [r["row"] for r in out["results"]] == list(range(9))
+    ok_rows = [r["row"] for r in out["results"] if "error" not in r]
+    assert ok_rows == [0, 7]
+    assert [r["id"] for r in out["results"] if "error" not in r] == [1, 2]
+    assert client.conn.committed
+
+
+def test_bulk_feature_collection(client):
+    body = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "geometry": LINE, "properties": {}},
+        {"type": "Feature", "geometry": {"type": "Polygon"}, "properties": {}},
+    ]}
+    out = client.post("/api/data/collect/bulk", json=body).json()
+    assert out["inserted"] == 1
+    assert out["failed"] == 1
+    assert "error" in out["results"][1]
+
+
+def test_feature_collection_over_the_limit_is_413(client, monkeypatch):
+    monkeypatch.setattr(data.settings, "BULK_MAX_JSON_BYTES", 1000)
+    features = [{"type": "Feature", "geometry": LINE, "properties": {}} for _ in range(20)]
+    body = json.dumps({"type": "FeatureCollection", "features": features}).encode()
+
+    response = client.post("/api/data/collect/bulk", content=body, headers={"content-type": "application/json"})
+    assert response.status_code == 413
+    assert "NDJSON" in response.json()["detail"]
+
+    # sin Content-Length (chunked) también se corta al superar el límite
+    chunked = client.post("/api/data/collect/bulk", content=iter([body[:600], body[600:]]),
+                          headers={"content-type": "application/json"})
+    assert chunked.status_code == 413
+    assert client.conn.rows == []
+
+    small = json.dumps({"type": "FeatureCollection", "features": features[:2]})
+    assert client.post("/api/data/collect/bulk", content=small,
+                       headers={"content-type": "application/json"}).json()["inserted"] == 2
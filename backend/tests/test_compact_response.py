@@ -0,0 +1,78 @@
+# backend/tests/test_compact_response.py
+import asyncio
+import gzip
+import json
+
+import numpy as np
+from starlette.requests import Request
+
+from app.services import compact_response
+from app.services.compact_response import compact_samples, render, render_async
+
+PAYLOAD = {"samples": {"lat": [-2.170001 + i * 1e-5 for i in range(8000)]}}
+
+
+def _request(accept_encoding):
+    return Request({"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]})
+
+
+def test_encodings_with_q_zero_are_not_used(monkeypatch):
+    monkeypatch.setattr(compact_response, "brotli", None)
+    assert "Content-Encoding" not in render(_request("gzip;q=0, identity"), PAYLOAD).headers
+    assert render(_request("br;q=0, gzip"), PAYLOAD).headers["Content-Encoding"] == "gzip"
+
+
+def test_async_render_compresses_large_bodies_in_the_threadpool(monkeypatch):
+    monkeypatch.setattr(compact_response, "brotli", None)
+    offloaded = []
+
+    async def fake_threadpool(fn, *args):
+        offloaded.append(len(args[0]))
+        return fn(*args)
+
+    monkeypatch.setattr(compact_response, "run_in_threadpool", fake_threadpool)
+    response = asyncio.run(render_async(_request("gzip"), PAYLOAD))
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.body)) == PAYLOAD
+    assert offloaded and offloaded[0] >= compact_response.COMPRESS_THREADPOOL_BYTES
+
+    small = asyncio.run(render_async(_request("gzip"), {"samples": PAYLOAD["samples"]["lat"][:200]}))
+    assert small.headers["Content-Encoding"] == "gzip"
+    assert len(offloaded) == 1
+
+
+def _decode_polyline(text, precision):
+    values, shift, result = [], 0, 0
+    for char in text:
+        b = ord(char) - 63
+        result |= (b & 0x1F) << shift
+        shift += 5
+        if b < 0x20:
+            values.append(~(result >> 1) if result & 1 else result >> 1)
+            shift, result = 0, 0
+    pts = np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0)
+    return pts[:, 0] / 10 ** precision, pts[:, 1] / 10 ** precision
+
+
+def _route(n=500, seed=3):
+    rng = np.random.default_rng(seed)
+    lat = -2.17 + np.cumsum(rng.normal(0, 2e-4, n))
+    lon = -79.88 + np.cumsum(rng.normal(0, 2e-4, n))
+    return lat, lon
+
+
+def test_polyline_round_trip_within_1e6():
+    lat, lon = _route()
+    out = compact_samples(lat, lon, fmt="polyline")
+    dlat, dlon = _decode_polyline(out["polyline"], out["precision"])
+    assert out["n"] == len(dlat) == len(lat)
+    assert np.max(np.abs(dlat - lat)) <= 1e-6
+    assert np.max(np.abs(dlon - lon)) <= 1e-6
+
+
+def test_delta_round_trip_within_1e6():
+    lat, lon = _route()
+    out = compact_samples(lat, lon, [100.123, None] * 250, fmt="delta")
+    assert np.max(np.abs(np.cumsum(out["lat"]) / out["scale"] - lat)) <= 1e-6
+    assert np.max(np.abs(np.cumsum(out["lon"]) / out["scale"] - lon)) <= 1e-6
+    assert out["elevation"][:2] == [100.12, None]
@@ -0,0 +1,79 @@
+# backend/tests/test_elevation_coalescer.py
+import asyncio
+
+import pytest
+
+from app.services.arcgis_service import ArcGISService, ElevationBatchError
+from app.services.elevation_coalescer import ElevationCoalescer
+
+BAD_LAT = 9.0  # un lote que contiene esta latitud falla
+
+
+class FakeUpstream:
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, batch):
+        self.batches.append(list(batch))
+        await asyncio.sleep(0.001)
+        if any(lat == BAD_LAT for lat, _ in batch):
+            raise ElevationBatchError("lote rechazado", status_code=500, attempts=3)
+        return [lat * 10 + lon for lat, lon in batch]
+
+
+def _z(lat, lon):
+    return lat * 10 + lon
+
+
+def test_concurrent_calls_share_points_and_get_their_own_order():
+    upstream = FakeUpstream()
+
+    async def run():
+        coalescer = ElevationCoalescer(upstream, batch_size=4, window_s=0.01)
+        a = [(1.0, 0.1), (2.0, 0.2), (3.0, 0.3), (1.0, 0.1)]
+        b = [(3.0, 0.3), (4.0, 0.4), (2.0, 0.2), (5.0, 0.5), (6.0, 0.6)]
+        return coalescer, await asyncio.gather(coalescer.fetch(a), coalescer.fetch(b)), a, b
+
+    coalescer, ((za, fa), (zb, fb)), a, b = asyncio.run(run())
+    assert za == [_z(*p) for p in a]
+    assert zb == [_z(*p) for p in b]
+    assert fa == fb == []
+    sent = [p for batch in upstream.batches for p in batch]
+    assert sorted(sent) == sorted(set(a) | set(b))  # cada punto una sola vez
+    assert all(len(batch) <= 4 for batch in upstream.batches)
+    assert coalescer.shared_points == 2
+
+
+def test_failed_batch_reports_caller_indices_to_every_waiter():
+    upstream = FakeUpstream()
+
+    async def run():
+        coalescer = ElevationCoalescer(upstream, batch_size=2, window_s=0.01)
+        a = [(1.0, 0.1), (BAD_LAT, 0.9)]  # primer lote: falla
+        b = [(7.0, 0.7), (1.0, 0.1), (8.0, 0.8)]  # comparte el punto del lote fallido
+        return await asyncio.gather(coalescer.fetch(a), coalescer.fetch(b))
+
+    (za, fa), (zb, fb) = asyncio.run(run())
+    assert za == [None, None]
+    assert [(e["indices"], e["status_code"], e["attempts"]) for e in fa] == [([0, 1], 500, 3)]
+    assert zb[0] is not None and zb[1] is None and zb[2] is not None
+    assert [e["indices"] for e in fb] == [[1]]
+    assert fa[0]["batch"] == fb[0]["batch"]
+
+
+@pytest.mark.parametrize("coalesce", [True, False])
+def test_profile_failed_batches_have_the_same_shape_on_both_paths(coalesce):
+    upstream = FakeUpstream()
+    service = ArcGISService()
+    service._cache_loaded, service._cache = True, None
+    service.batch_size = 2
+    service._fetch_batch = upstream
+    service.coalescer = ElevationCoalescer(upstream, batch_size=2, window_s=0) if coalesce else None
+
+    coords = [(1.0, 0.1), (BAD_LAT, 0.9), (2.0, 0.2), (1.0, 0.1), (3.0, 0.3)]
+    profile = asyncio.run(service.get_elevation_profile(coords, with_stats=False))
+
+    assert profile["elevations"] == [None, None, _z(2.0, 0.2), None, _z(3.0, 0.3)]
+    assert [sorted(e) for e in profile["failed_batches"]] == [["attempts", "batch", "error", "indices", "status_code"]]
+    # el punto repetido (posición 3) se reporta junto a su original
+    assert profile["failed_batches"][0]["indices"] == [0, 1, 3]
@@ -0,0 +1,76 @@
+# backend/tests/test_pole_placement.py
+import math
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.pole_placement import DEFAULT_SPAN_TABLE, _span_limit, solve_pole_positions
+
+
+def _valid_span(cum, slope, i, j, limit, min_span_m):
+    length = cum[j] - cum[i]
+    return min_span_m <= length <= limit(float(np.max(slope[i:j])))
+
+
+def _brute_force(cum, slope, cost, span_table, min_span_m):
+    limit = _span_limit(span_table)
+    n = len(cum)
+    dp = [math.inf] * n
+    dp[0] = cost[0]
+    for j in range(1, n):
+        if not np.isfinite(cost[j]):
+            continue
+        for i in range(j):
+            if dp[i] < math.inf and _valid_span(cum, slope, i, j, limit, min_span_m):
+                dp[j] = min(dp[j], dp[i] + cost[j])
+    return dp[-1]
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_solver_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(2, 60))
+    cum = np.concatenate(([0.0], np.cumsum(rng.uniform(0.5, 12.0, n - 1))))
+    # tramos planos y empinados mezclados: el límite de vano cambia dentro de la ventana
+    slope = np.where(rng.random(n - 1) < 0.3, rng.uniform(15, 40, n - 1), rng.uniform(0, 12, n - 1))
+    cost = rng.choice([1.0, 0.3, np.inf], size=n, p=[0.75, 0.15, 0.1])
+    cost[0] = cost[-1] = 1.0
+    if seed % 2:
+        table = DEFAULT_SPAN_TABLE
+    else:
+        bounds = np.sort(rng.uniform(0, 30, 3))
+        table = [(float(b), float(v)) for b, v in zip(bounds, np.sort(rng.uniform(10, 60, 3))[::-1])] + [(math.inf, 8.0)]
+    min_span_m = float(rng.uniform(0, min(v for _, v in table)))
+
+    expected = _brute_force(cum, slope, cost, table, min_span_m)
+    if expected == math.inf:
+        with pytest.raises(ValueError):
+            solve_pole_positions(cum, slope, cost, table, min_span_m)
+        return
+
+    index, total = solve_pole_positions(cum, slope, cost, table, min_span_m)
+    assert total == pytest.approx(expected)
+    assert index[0] == 0 and index[-1] == n - 1
+    limit = _span_limit(table)
+    for i, j in zip(index[:-1], index[1:]):
+        assert _valid_span(cum, slope, i, j, limit, min_span_m)
+
+
+def test_min_span_above_table_is_rejected():
+    # pendiente severa (límite 28 m) con vano mínimo de 30 m: antes salía un vano de ~49 m
+    cum = np.arange(0.0, 200.0, 1.0)
+    slope = np.full(len(cum) - 1, 25.0)
+    with pytest.raises(ValueError):
+        solve_pole_positions(cum, slope, np.ones(len(cum)), DEFAULT_SPAN_TABLE, min_span_m=30.0)
+
+
+def test_zero_length_route_is_a_bad_request():
+    client = TestClient(app)
+    point = [-79.8824, -2.1709]
+    response = client.post("/api/analyze/poles", json={
+        "geojson": {"type": "LineString", "coordinates": [point, point]}, "with_elevation": False,
+    })
+    assert response.status_code == 400
+    assert "longitud" in response.json()["detail"]
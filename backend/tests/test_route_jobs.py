@@ -0,0 +1,79 @@
+# backend/tests/test_route_jobs.py
+import asyncio
+
+from app.services.route_jobs import RouteJobScheduler
+
+ROUTE = [[-79.8800, -2.1700], [-79.8800, -2.1655]]  # ~500 m: 52 muestras cada 10 m
+
+
+def _z(lat):
+    return lat * 1e5  # ~9 m de diferencia entre muestras vecinas: un bloque corrido se nota
+
+
+class FakeElevation:
+    def __init__(self, stall_after=None):
+        self.calls = 0
+        self.stall_after = stall_after
+
+    async def get_elevation_profile(self, points, with_stats=False):
+        self.calls += 1
+        if self.stall_after is not None and self.calls > self.stall_after:
+            await asyncio.Event().wait()
+        return {"elevations": [_z(lat) for lat, _ in points]}
+
+
+async def _wait_for(predicate, timeout=5.0):
+    async def poll():
+        while not predicate():
+            await asyncio.sleep(0.005)
+    await asyncio.wait_for(poll(), timeout)
+
+
+def test_resume_keeps_the_chunking_of_the_job(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+
+    async def run():
+        first = RouteJobScheduler(path, chunk_points=4)
+        await first.start(FakeElevation(stall_after=2))
+        job_id = await first.submit(ROUTE, 10.0)
+        await _wait_for(lambda: first.jobs[job_id]["progress"].get("batches_done") == 2)
+        await first.shutdown()
+
+        # reinicio con otro tamaño de bloque: los bloques guardados siguen en su lugar
+        service = FakeElevation()
+        second = RouteJobScheduler(path, chunk_points=7)
+        await second.start(service)
+        await _wait_for(lambda: second.jobs[job_id]["status"] == "done")
+        job = second.get(job_id)
+        await second.shutdown()
+        return job, service
+
+    job, service = asyncio.run(run())
+    samples = job["result"]["samples"]
+    assert len(samples["lat"]) == 52
+    for lat, z in zip(samples["lat"], samples["elevation"]):
+        assert abs(z - _z(lat)) < 0.2
+    assert service.calls == 11  # 13 bloques de 4 puntos, 2 ya persistidos
+
+
+def test_watchers_do_not_steal_each_other_updates(tmp_path):
+    async def run():
+        scheduler = RouteJobScheduler(str(tmp_path / "jobs.sqlite3"))
+        job_id = "j1"
+        scheduler.jobs[job_id] = {"job_id": job_id, "status": "running", "progress": {"stage": "elevation"}}
+        scheduler._changed[job_id] = asyncio.Event()
+        a = scheduler.watch(job_id, interval_s=5.0)
+        b = scheduler.watch(job_id, interval_s=5.0)
+        await a.__anext__()
+        await b.__anext__()
+
+        scheduler._update(job_id, batches_done=1)
+        # "a" despierta primero; "b" no estaba esperando todavía y aun así ve el cambio
+        first = await asyncio.wait_for(a.__anext__(), 1.0)
+        second = await asyncio.wait_for(b.__anext__(), 1.0)
+        await a.aclose()
+        await b.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first["progress"]["batches_done"] == second["progress"]["batches_done"] == 1
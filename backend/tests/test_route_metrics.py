@@ -0,0 +1,26 @@
+# backend/tests/test_route_metrics.py
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.main import app
+
+
+def _route_labels():
+    return {
+        line.split('route="')[1].split('"')[0]
+        for line in metrics.registry.render().splitlines()
+        if line.startswith("ftth_http_requests_total{")
+    }
+
+
+def test_metrics_use_route_templates():
+    client = TestClient(app)  # sin lifespan: no abre la BD ni arranca colas
+    # un id que coincide con otro segmento de la ruta no debe reescribirla
+    client.get("/api/ai/jobs/api")
+    client.get("/api/ai/jobs/jobs")
+    client.get("/no-existe")
+
+    labels = _route_labels()
+    assert "/api/ai/jobs/{job_id}" in labels
+    assert "unmatched" in labels
+    assert not any(label.endswith("/api") or label.count("{") > 1 for label in labels)
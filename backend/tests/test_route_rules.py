@@ -0,0 +1,33 @@
+# backend/tests/test_route_rules.py
+import numpy as np
+
+from app.api.ai_recommendations import evaluate_route_rules
+from app.services.terrain_features import extract_terrain_features
+
+
+def _terrain(grades_pct, step_m=20.0):
+    """Perfil sintético hacia el este con la pendiente indicada en cada tramo"""
+    n = len(grades_pct) + 1
+    lat = np.full(n, -2.17)
+    lon = -79.9 + np.arange(n) * step_m / 111_320.0
+    z = np.concatenate(([0.0], np.cumsum(np.asarray(grades_pct) * step_m / 100.0)))
+    return extract_terrain_features(lat, lon, z, window_m=step_m)
+
+
+def test_slope_rules_fire_per_segment():
+    terrain = _terrain([2.0] * 40 + [25.0] * 10)
+    rules = evaluate_route_rules({"length_km": 1.0}, {"split": "1:8"}, terrain)
+
+    matched = {r["id"]: r for r in rules["matched"]}
+    assert {"R001", "R005"} <= set(matched)
+    assert matched["R005"]["fraccion_longitud"] < matched["R001"]["fraccion_longitud"]
+    assert "segmentos" not in rules
+    # el impacto de la ruta es un promedio por longitud, no la suma de todas las reglas
+    assert rules["impacto"]["incremento_costo_pct"] <= rules["impacto"]["costo_pct_segmento_max"]
+
+
+def test_without_profile_only_route_rules():
+    rules = evaluate_route_rules({"length_km": 1.0}, {"split": "1:8"})
+    ids = {r["id"] for r in rules["matched"]}
+    assert not ids & {"R001", "R002", "R003", "R004", "R005"}
+    assert "R030" in ids
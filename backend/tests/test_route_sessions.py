@@ -0,0 +1,64 @@
+# backend/tests/test_route_sessions.py
+import asyncio
+import math
+
+import numpy as np
+import pytest
+
+from app.services.route_sessions import RouteSessionStore
+
+ROUTE = [[-79.8900, -2.1700], [-79.8880, -2.1690], [-79.8860, -2.1695], [-79.8840, -2.1680], [-79.8820, -2.1685]]
+
+
+class FakeElevation:
+    def __init__(self):
+        self.points = 0
+
+    async def get_elevation_profile(self, points, with_stats=False):
+        self.points += len(points)
+        return {"elevations": [20 * math.sin(lon * 3000) + 10 * math.cos(lat * 2000) for lat, lon in points]}
+
+
+EDITS = {
+    "append": ROUTE + [[-79.8800, -2.1670]],
+    "prepend": [[-79.8920, -2.1710]] + ROUTE,
+    "move_interior": ROUTE[:2] + [[-79.8858, -2.1705]] + ROUTE[3:],
+    "delete_interior": ROUTE[:2] + ROUTE[3:],
+    "move_last": ROUTE[:-1] + [[-79.8815, -2.1690]],
+}
+
+
+@pytest.mark.parametrize("edit", sorted(EDITS))
+def test_edited_session_matches_full_recompute(edit):
+    async def run():
+        store = RouteSessionStore(elevation_service=FakeElevation())
+        created = await store.create(ROUTE, 10.0)
+        edited = await store.update(created["session_id"], EDITS[edit])
+        fresh = await RouteSessionStore(elevation_service=FakeElevation()).create(EDITS[edit], 10.0)
+        return edited, fresh
+
+    edited, fresh = asyncio.run(run())
+    assert edited["incremental"]["segments_reused"] > 0
+    assert edited["n_samples"] == fresh["n_samples"]
+    for key in ("lat", "lon", "elevation"):
+        np.testing.assert_allclose(edited["samples"][key], fresh["samples"][key], atol=1e-6)
+    assert edited["statistics"].keys() == fresh["statistics"].keys()
+    for key, value in fresh["statistics"].items():
+        if isinstance(value, float):
+            assert edited["statistics"][key] == pytest.approx(value, abs=1e-6), key
+
+
+def test_update_only_fetches_changed_segments():
+    async def run():
+        service = FakeElevation()
+        store = RouteSessionStore(elevation_service=service)
+        created = await store.create(ROUTE, 10.0)
+        before = service.points
+        edited = await store.update(created["session_id"], EDITS["move_interior"])
+        return created, edited, service.points - before
+
+    created, edited, fetched = asyncio.run(run())
+    # se mueve el vértice 2: solo se vuelven a muestrear sus dos segmentos
+    assert edited["incremental"]["segments_recomputed"] == 2
+    assert edited["incremental"]["segments_reused"] == 2
+    assert fetched == edited["incremental"]["points_fetched"] < created["n_samples"]
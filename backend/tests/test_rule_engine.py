@@ -0,0 +1,87 @@
+# backend/tests/test_rule_engine.py
+import numpy as np
+import pytest
+
+from app.services.rule_engine import RuleEngine
+
+RULES = """
+metadata:
+  region: "Ecuador - Guayaquil"
+topografia:
+  - id: "P1"
+    nivel: "INFO"
+    condicion: {variable: "pendiente_promedio", operador: "BETWEEN", valores: [0, 10]}
+    impacto: {incremento_costo_pct: 0, score_complejidad: 0}
+  - id: "P2"
+    nivel: "WARNING"
+    condicion: {variable: "pendiente_promedio", operador: ">", valores: [10]}
+    impacto: {incremento_costo_pct: 40, score_complejidad: 6}
+  - id: "P3"
+    nivel: "CRITICAL"
+    condicion: {variable: "pendiente_promedio", operador: ">", valores: [20]}
+    impacto: {incremento_costo_pct: 60, score_complejidad: 4}
+longitud:
+  - id: "L1"
+    nivel: "INFO"
+    condicion: {variable: "longitud_total_km", operador: "<", valores: [3]}
+    impacto: {incremento_costo_pct: 5, score_complejidad: 1}
+"""
+
+
+@pytest.fixture
+def engine(tmp_path):
+    path = tmp_path / "reglas.yaml"
+    path.write_text(RULES, encoding="utf-8")
+    return RuleEngine(str(path))
+
+
+def test_cost_is_weighted_by_segment_length(engine):
+    slope = np.array([2.0, 15.0, 25.0, 5.0])
+    lengths = np.array([100.0, 50.0, 25.0, 25.0])
+    result = engine.evaluate({"pendiente_promedio": slope, "longitud_total_km": 0.2}, weights=lengths)
+
+    # costo por segmento: L1 siempre + P2/P3 donde aplica
+    seg_cost = np.array([5.0, 45.0, 105.0, 5.0])
+    assert result["segmentos"]["costo_pct"].tolist() == seg_cost.tolist()
+    expected = float((seg_cost * lengths).sum() / lengths.sum())
+    assert result["impacto"]["incremento_costo_pct"] == pytest.approx(expected)
+    # nunca más que el peor segmento (antes se sumaban las reglas de segmentos distintos)
+    assert result["impacto"]["incremento_costo_pct"] <= result["impacto"]["costo_pct_segmento_max"]
+    assert result["impacto"]["costo_pct_segmento_max"] == 105.0
+
+    matched = {r["id"]: r for r in result["matched"]}
+    assert set(matched) == {"P1", "P2", "P3", "L1"}
+    assert matched["P1"]["fraccion_longitud"] == pytest.approx(0.625)
+    assert matched["P3"]["segmentos"] == 1
+
+
+def test_unweighted_mean_and_route_scalars(engine):
+    result = engine.evaluate({"pendiente_promedio": np.array([0.0, 30.0]), "longitud_total_km": 10.0})
+    assert result["impacto"]["incremento_costo_pct"] == pytest.approx(50.0)
+    assert result["impacto"]["score_complejidad"] == pytest.approx(5.0)
+    assert result["impacto"]["nivel_maximo"] == "CRITICAL"
+
+    flat = engine.evaluate({"longitud_total_km": 1.0})
+    assert [r["id"] for r in flat["matched"]] == ["L1"]
+    assert flat["impacto"]["incremento_costo_pct"] == pytest.approx(5.0)
+
+
+def test_touching_ranges_match_a_single_rule_on_the_boundary():
+    from app.services.rule_engine import get_rule_engine
+
+    engine = get_rule_engine()
+    slope = np.array([0.0, 5.0, 10.0, 15.0, 20.0, 20.5])
+    result = engine.evaluate({"pendiente_promedio": slope}, max_segments=10)
+    hits = {r["id"]: r.get("indices_segmentos") for r in result["matched"]}
+    assert hits["R001"] == [0]
+    assert hits["R002"] == [1]
+    assert hits["R003"] == [2]
+    assert hits["R004"] == [3, 4]  # 20 no cumple "> 20": se queda en el último rango
+    assert hits["R005"] == [5]
+
+    for km, expected in ((3.0, "R027"), (8.0, "R028")):
+        ids = {r["id"] for r in engine.evaluate({"longitud_total_km": km})["matched"]}
+        assert expected in ids and len(ids & {"R026", "R027", "R028", "R029"}) == 1
+    ids = {r["id"] for r in engine.evaluate({"vegetacion_pct": 20.0})["matched"]}
+    # "<= 20" toca a BETWEEN [20, 40]: el borde también pasa al rango de arriba
+    assert ids & {"R015", "R016", "R017"} == {"R016"}
@@ -0,0 +1,22 @@
+# backend/tests/test_zone_index.py
+from app.api.ai_recommendations import analyze_route_basic
+
+GYE_CENTER = [-79.8824, -2.1709]
+
+
+def test_point_and_zero_length_routes_use_their_vertices():
+    for geojson in (
+        {"type": "Point", "coordinates": GYE_CENTER},
+        {"type": "LineString", "coordinates": [GYE_CENTER, GYE_CENTER]},
+    ):
+        analysis = analyze_route_basic(geojson)
+        assert analysis["zone_type"] == "centro_urbano"
+        assert analysis["zonas"]["zona_dominante"] == "centro_urbano"
+
+
+def test_seed_zones_cover_other_cities():
+    quito = analyze_route_basic({"type": "LineString", "coordinates": [[-78.5125, -0.2000], [-78.5100, -0.1980]]})
+    assert quito["zone_type"] == "centro_urbano"
+
+    kennedy = analyze_route_basic({"type": "LineString", "coordinates": [[-79.910, -2.170], [-79.900, -2.160]]})
+    assert "residencial_densa" in kennedy["zonas"]["tipo_cliente"]
@@ -276,6 +276,51 @@ function showAnalysisLoading(isLoading) {
   }
 }
 
+/**
+ * Consultar un trabajo de IA encolado hasta que termine
+ */
+async function waitForAIJob(statusUrl, intervalMs = 1000) {
+  while (true) {
+    const res = await fetch(statusUrl);
+    if (!res.ok) throw new Error(`Error ${res.status}`);
+
+    const job = await res.json();
+    if (job.status === 'done') return job.result;
+    if (job.status === 'error') throw new Error(job.error || 'Error en el trabajo de IA');
+
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+  }
+}
+
+/**
+ * Leer una respuesta text/event-stream y llamar onEvent(evento, datos) por cada mensaje
+ */
+async function readServerSentEvents(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const message = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      const dataLines = [];
+      message.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+      });
+      if (dataLines.length) onEvent(event, JSON.parse(dataLines.join('\n')));
+    }
+  }
+}
+
 /**
  * Mostrar resultados del análisis con animación
  */
@@ -425,7 +470,15 @@ if (btnAnalizar) {
     setTimeout(() => scrollToRecommendations(), 300);
 
     try {
-      const response = await fetch('/api/ai/generate', {
+      // 4. Pedir las recomendaciones en streaming y pintar cada fragmento al llegar
+      let analysisData = null;
+      let renderPending = false;
+      const render = () => {
+        renderPending = false;
+        if (analysisData) displayResults(analysisData);
+      };
+
+      const response = await fetch('/api/ai/generate/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ data_id: ultimoDataId })
@@ -433,12 +486,38 @@ if (btnAnalizar) {
 
       if (!response.ok) throw new Error(`Error ${response.status}`);
 
-      const analysisData = await response.json();
+      if (response.body) {
+        await readServerSentEvents(response, (event, data) => {
+          if (event === 'analysis') {
+            analysisData = { ...data, ai_recommendations: '' };
+            render();
+          } else if (event === 'chunk' && analysisData) {
+            analysisData.ai_recommendations += data.text;
+            if (!renderPending) {
+              renderPending = true;
+              requestAnimationFrame(render);
+            }
+          } else if (event === 'done' && analysisData) {
+            Object.assign(analysisData, data);
+          } else if (event === 'error') {
+            analysisData = data;
+          }
+        });
+      } else {
+        // Navegador sin streams: usar la cola de trabajos
+        const queued = await fetch('/api/ai/generate', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ data_id: ultimoDataId })
+        });
+        if (!queued.ok) throw new Error(`Error ${queued.status}`);
+        const job = await queued.json();
+        analysisData = await waitForAIJob(job.status_url);
+      }
+
+      if (!analysisData) throw new Error('Respuesta vacía del servidor');
       console.log('Análisis con IA completado:', analysisData);
-      
-      // 4. Pequeño delay para que se vea el skeleton (opcional, mejora UX)
-      await new Promise(resolve => setTimeout(resolve, 800));
-      
+
       // 5. Mostrar resultados
       displayResults(analysisData);
 